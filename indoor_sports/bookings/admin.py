@@ -6,7 +6,9 @@
 
 
 from django.contrib import admin,messages
-from .models import Slot, Booking, BookingReport, Confirmation
+from .models import Slot, SlotTemplate, Booking, BookingCart, BookingReport, Confirmation, WaitlistEntry
+from .availability import refresh_slot_keys, slot_booked, slot_released
+from .waitlist import schedule_promotion
 from .forms import BookingAdminForm ,BookingAdminUpdateForm
 
 @admin.register(Slot)
@@ -17,6 +19,43 @@ class SlotAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
     ordering = ('slot_id', 'date', 'time')
 
+    # Keep the SlotAvailability summary in step, as the admin slot views do
+    def save_model(self, request, obj, form, change):
+        previous = Slot.objects.filter(pk=obj.pk).only('location_id', 'sport_id', 'date').first() if change else None
+        super().save_model(request, obj, form, change)
+        refresh_slot_keys(previous, obj)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_slot_keys(obj)
+
+    def delete_queryset(self, request, queryset):
+        slots = list(queryset.only('location_id', 'sport_id', 'date'))
+        super().delete_queryset(request, queryset)
+        refresh_slot_keys(*slots)
+
+@admin.register(SlotTemplate)
+class SlotTemplateAdmin(admin.ModelAdmin):
+    list_display = ('id', 'location', 'sport', 'weekday', 'time', 'is_active')
+    list_filter = ('location', 'sport', 'weekday', 'is_active')
+    search_fields = ('location__name', 'sport__name')
+    ordering = ('location', 'sport', 'weekday', 'time')
+
+@admin.register(BookingCart)
+class BookingCartAdmin(admin.ModelAdmin):
+    list_display = ('cart_id', 'user', 'status', 'total_amount', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('user__username', 'stripe_session_id')
+    ordering = ('-created_at',)
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'slot', 'user', 'status', 'created_at', 'promoted_at')
+    list_filter = ('status',)
+    search_fields = ('user__username', 'slot__slot_id')
+    raw_id_fields = ('slot', 'user', 'booking')
+    ordering = ('-created_at',)
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     form = BookingAdminForm
@@ -53,6 +92,7 @@ class BookingAdmin(admin.ModelAdmin):
             if selected_slot and not selected_slot.is_booked:
                 selected_slot.is_booked = True
                 selected_slot.save()
+                slot_booked(selected_slot)
                 obj.location = selected_slot.location
                 obj.sport = selected_slot.sport
                 obj.date = selected_slot.date
@@ -70,9 +110,11 @@ class BookingAdmin(admin.ModelAdmin):
 
     def delete_model(self, request, obj):
         # Free up the slot when a booking is deleted
-        if obj.slot:
+        if obj.slot and obj.slot.is_booked:
             obj.slot.is_booked = False
             obj.slot.save()
+            slot_released(obj.slot)
+            schedule_promotion(obj.slot_id)
 
         super().delete_model(request, obj)
 
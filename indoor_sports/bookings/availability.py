@@ -0,0 +1,183 @@
+import calendar
+from datetime import date
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from bookings.calendar_cache import bump_all_calendars, bump_calendar_version, bump_slot_feed
+from bookings.models import Slot, SlotAvailability
+
+
+# ------------------------------------------------------------------------------
+# Month availability engine: free/total slot counts for every day of a month.
+# ------------------------------------------------------------------------------
+def month_availability(location_id, sport_id, year, month, today=None):
+    """
+    Returns a dict mapping "YYYY-MM-DD" to {"free": int, "total": int} for every day
+    of the given month at a (location, sport).
+
+    Counts are read from the SlotAvailability summary table, one row per day, so the
+    cost does not grow with the number of slots. Days before `today` are reported
+    with zero free slots so the calendar never links to a past date.
+    """
+    today = today or date.today()
+    _, num_days = calendar.monthrange(year, month)
+    first_day = date(year, month, 1)
+    last_day = date(year, month, num_days)
+
+    availability = {
+        date(year, month, day).strftime("%Y-%m-%d"): {"free": 0, "total": 0}
+        for day in range(1, num_days + 1)
+    }
+    if last_day < today:
+        return availability
+
+    rows = SlotAvailability.objects.filter(
+        location_id=location_id,
+        sport_id=sport_id,
+        date__range=(max(first_day, today), last_day),
+    ).values("date", "free_slots", "total_slots")
+    for row in rows:
+        availability[row["date"].strftime("%Y-%m-%d")] = {"free": row["free_slots"], "total": row["total_slots"]}
+    return availability
+
+
+def day_slot_counts(location_id, sport_id, day):
+    """Returns (free, total) slot counts for one day, read from the summary table."""
+    return (
+        SlotAvailability.objects.filter(location_id=location_id, sport_id=sport_id, date=day)
+        .values_list("free_slots", "total_slots")
+        .first()
+    ) or (0, 0)
+
+
+# ------------------------------------------------------------------------------
+# Maintenance: callers run these inside the transaction that changes the slots.
+# Each one also invalidates the cached calendars it affects once that transaction commits.
+# ------------------------------------------------------------------------------
+def _slot_counts(slots):
+    """Groups a Slot queryset by (location, sport, date) with total and free counts."""
+    return (
+        slots.values("location_id", "sport_id", "date")
+        .annotate(total=Count("slot_id"), free=Count("slot_id", filter=Q(is_booked=False)))
+        .order_by()
+    )
+
+
+def adjust_availability(location_id, sport_id, day, free_delta):
+    """
+    Shifts the free count of one day by `free_delta` with an atomic F() update.
+    Falls back to a full recount when the summary row does not exist yet.
+    """
+    updated = SlotAvailability.objects.filter(
+        location_id=location_id, sport_id=sport_id, date=day
+    ).update(free_slots=F("free_slots") + free_delta, updated_at=timezone.now())
+    if not updated:
+        refresh_availability(location_id, sport_id, day)
+        return
+    bump_calendar_version(location_id, sport_id)
+
+
+def slot_booked(slot):
+    """Records that `slot` moved from free to booked."""
+    adjust_availability(slot.location_id, slot.sport_id, slot.date, -1)
+
+
+def slot_released(slot):
+    """Records that `slot` moved from booked to free."""
+    adjust_availability(slot.location_id, slot.sport_id, slot.date, 1)
+
+
+def refresh_availability(location_id, sport_id, day):
+    """Recounts one (location, sport, date) summary row from the slot table."""
+    bump_calendar_version(location_id, sport_id)
+    bump_slot_feed(day)
+    counts = _slot_counts(Slot.objects.filter(location_id=location_id, sport_id=sport_id, date=day)).order_by("date").first()
+    if not counts:
+        SlotAvailability.objects.filter(location_id=location_id, sport_id=sport_id, date=day).delete()
+        return
+    SlotAvailability.objects.update_or_create(
+        location_id=location_id,
+        sport_id=sport_id,
+        date=day,
+        defaults={"total_slots": counts["total"], "free_slots": counts["free"]},
+    )
+
+
+def refresh_slot_keys(*slots):
+    """Recounts the summary rows touched by the given slots (e.g. after create, edit or delete)."""
+    for key in {(slot.location_id, slot.sport_id, slot.date) for slot in slots if slot is not None}:
+        refresh_availability(*key)
+
+
+def rebuild_availability(batch_size=1000):
+    """Rebuilds the whole summary table from the slot table. Returns the number of rows written."""
+    bump_all_calendars()
+    SlotAvailability.objects.all().delete()
+    rows = [
+        SlotAvailability(
+            location_id=counts["location_id"],
+            sport_id=counts["sport_id"],
+            date=counts["date"],
+            total_slots=counts["total"],
+            free_slots=counts["free"],
+        )
+        for counts in _slot_counts(Slot.objects.all()).iterator()
+    ]
+    SlotAvailability.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def availability_drift():
+    """
+    Compares the summary table with a fresh count of the slot table.
+    Returns a list of (location_id, sport_id, date, stored, actual) tuples, where stored
+    and actual are (free, total) pairs or None when the row is missing on that side.
+    """
+    actual = {
+        (c["location_id"], c["sport_id"], c["date"]): (c["free"], c["total"])
+        for c in _slot_counts(Slot.objects.all()).iterator()
+    }
+    stored = {
+        (row["location_id"], row["sport_id"], row["date"]): (row["free_slots"], row["total_slots"])
+        for row in SlotAvailability.objects.values(
+            "location_id", "sport_id", "date", "free_slots", "total_slots"
+        ).iterator()
+    }
+    return [
+        (*key, stored.get(key), actual.get(key))
+        for key in sorted(actual.keys() | stored.keys())
+        if stored.get(key) != actual.get(key)
+    ]
+
+
+def refresh_availability_range(start, end, location_ids=None, sport_ids=None, batch_size=1000):
+    """
+    Recounts every summary row between `start` and `end` (inclusive) with one grouped
+    query and an upsert, for use after bulk slot inserts that bypass the per-slot hooks.
+    Returns the number of rows written.
+    """
+    bump_all_calendars()
+    slots = Slot.objects.filter(date__range=(start, end))
+    if location_ids is not None:
+        slots = slots.filter(location_id__in=location_ids)
+    if sport_ids is not None:
+        slots = slots.filter(sport_id__in=sport_ids)
+    rows = [
+        SlotAvailability(
+            location_id=counts["location_id"],
+            sport_id=counts["sport_id"],
+            date=counts["date"],
+            total_slots=counts["total"],
+            free_slots=counts["free"],
+        )
+        for counts in _slot_counts(slots).iterator()
+    ]
+    SlotAvailability.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["location", "sport", "date"],
+        update_fields=["total_slots", "free_slots", "updated_at"],
+    )
+    return len(rows)
@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+GENERATION_KEY = "calendar:generation"
+FEED_CHANGED_KEY = "slots:feed:changed"
+HITS_KEY = "calendar:hits"
+MISSES_KEY = "calendar:misses"
+
+
+# ------------------------------------------------------------------------------
+# Version keys: bumping a version orphans every fragment rendered under the old one.
+# ------------------------------------------------------------------------------
+def _version_key(location_id, sport_id):
+    return f"calendar:version:{location_id}:{sport_id}"
+
+
+def _incr(key):
+    """Increments a cache counter, creating it on first use."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+        return 1
+
+
+def bump_calendar_version(location_id, sport_id):
+    """
+    Invalidates the cached calendars of one (location, sport) once the current
+    transaction commits, so no reader can cache pre-commit counts under the new version.
+    """
+    transaction.on_commit(lambda: _incr(_version_key(location_id, sport_id)))
+
+
+def bump_all_calendars():
+    """Invalidates every cached calendar, e.g. after a bulk availability refresh."""
+    transaction.on_commit(lambda: _incr(GENERATION_KEY))
+
+
+# ------------------------------------------------------------------------------
+# Slot feed stamps: when the slots of a month last changed, deletions included.
+# ------------------------------------------------------------------------------
+def _feed_key(month=None):
+    return f"{FEED_CHANGED_KEY}:{month:%Y-%m}" if month else FEED_CHANGED_KEY
+
+
+def _months(start, end):
+    month = start.replace(day=1)
+    while month < end:
+        yield month
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def bump_slot_feed(day):
+    """Stamps the month of `day` (and the whole feed) as changed once the transaction commits."""
+    def stamp():
+        now = timezone.now()
+        cache.set_many({_feed_key(day): now, _feed_key(): now}, timeout=None)
+    transaction.on_commit(stamp)
+
+
+def slot_feed_changed_at(start=None, end=None):
+    """
+    Latest bump_slot_feed() stamp of the months overlapping [start, end), or of the
+    whole feed when the window is open. A stamp lost from the cache restarts at now,
+    so clients refetch once rather than keep a stale feed.
+    """
+    keys = [_feed_key(month) for month in _months(start, end)] if start and end else [_feed_key()]
+    stamps = cache.get_many(keys)
+    missing = {key: timezone.now() for key in keys if key not in stamps}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        stamps.update(missing)
+    return max(stamps.values(), default=None)
+
+
+# ------------------------------------------------------------------------------
+# Fragment cache
+# ------------------------------------------------------------------------------
+def cached_calendar(location_id, sport_id, year, month, today, render):
+    """
+    Returns the availability calendar HTML for a month, calling `render()` only when
+    the (location, sport) changed since the fragment was last cached.
+    `today` is part of the key because days before it render as unavailable.
+    """
+    version_key = _version_key(location_id, sport_id)
+    versions = cache.get_many([GENERATION_KEY, version_key])
+    key = "calendar:html:{}:{}:{}:{}:{}-{:02d}:{}".format(
+        versions.get(GENERATION_KEY, 0),
+        location_id,
+        sport_id,
+        versions.get(version_key, 0),
+        year,
+        month,
+        today.isoformat(),
+    )
+    html = cache.get(key)
+    if html is not None:
+        _incr(HITS_KEY)
+        return html
+
+    _incr(MISSES_KEY)
+    html = render()
+    cache.set(key, html, timeout=settings.CALENDAR_CACHE_TIMEOUT)
+    return html
+
+
+def calendar_cache_stats():
+    """Returns the hit/miss counters of the fragment cache since the cache was last cleared."""
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / lookups, 4) if lookups else None,
+    }
@@ -16,8 +16,12 @@
 #         }
 
 
+import datetime
 from django import forms
-from bookings.models import Slot, Booking
+from django.db import transaction
+from bookings.models import Slot, SlotTemplate, Booking
+from bookings.services import MAX_SERIES_OCCURRENCES
+from bookings.availability import slot_booked
 from equipment.models import Equipment
 from django.contrib.auth import get_user_model
 
@@ -81,7 +85,35 @@ class BookingAdminForm(forms.ModelForm):
         booking.date = selected_slot.date
         booking.time_slot = selected_slot.time
         if commit:
-            booking.save()
-            selected_slot.is_booked = True
-            selected_slot.save()
+            with transaction.atomic():
+                booking.save()
+                selected_slot.is_booked = True
+                selected_slot.save()
+                slot_booked(selected_slot)
         return booking
+
+
+class BookingSeriesForm(forms.Form):
+    """A weekly recurring booking rule: the same weekday and time for several weeks."""
+    weekday = forms.TypedChoiceField(
+        choices=SlotTemplate.WEEKDAY_CHOICES,
+        coerce=int,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    time = forms.TimeField(widget=forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}))
+    start_date = forms.DateField(
+        initial=datetime.date.today,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+    )
+    occurrences = forms.IntegerField(
+        min_value=1,
+        max_value=MAX_SERIES_OCCURRENCES,
+        initial=12,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+
+    def clean_start_date(self):
+        start_date = self.cleaned_data['start_date']
+        if start_date < datetime.date.today():
+            raise forms.ValidationError("The series cannot start in the past.")
+        return start_date
@@ -0,0 +1,78 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+
+from bookings.availability import refresh_availability_range
+from bookings.models import Slot, SlotTemplate
+
+
+# ------------------------------------------------------------------------------
+# Slot generation: expands weekly SlotTemplates into concrete Slot rows.
+# ------------------------------------------------------------------------------
+def slot_type_for(sport, slot_time):
+    """Tags a slot as Peak when its time falls inside the sport's peak hours."""
+    return "Peak" if sport.is_peak(slot_time) else "Non-Peak"
+
+
+def _date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def generate_slots(start, end, location_id=None, batch_size=1000):
+    """
+    Creates a Slot for every active template occurrence between `start` and `end`
+    (inclusive) using bulk_create in batches.
+
+    Idempotent: slots that already exist for (location, sport, date, time) are
+    skipped, so re-running over the same range inserts nothing.
+    Returns the number of slots inserted.
+    """
+    templates = SlotTemplate.objects.filter(is_active=True).select_related("sport")
+    if location_id is not None:
+        templates = templates.filter(location_id=location_id)
+
+    by_weekday = defaultdict(list)
+    for template in templates:
+        by_weekday[template.weekday].append(template)
+    if not by_weekday:
+        return 0
+
+    location_ids = {t.location_id for ts in by_weekday.values() for t in ts}
+    sport_ids = {t.sport_id for ts in by_weekday.values() for t in ts}
+    existing = set(
+        Slot.objects.filter(
+            date__range=(start, end), location_id__in=location_ids, sport_id__in=sport_ids
+        ).values_list("location_id", "sport_id", "date", "time").iterator()
+    )
+
+    inserted = 0
+    batch = []
+    with transaction.atomic():
+        for day in _date_range(start, end):
+            for template in by_weekday.get(day.weekday(), ()):
+                key = (template.location_id, template.sport_id, day, template.time)
+                if key in existing:
+                    continue
+                existing.add(key)
+                batch.append(Slot(
+                    location_id=template.location_id,
+                    sport_id=template.sport_id,
+                    date=day,
+                    time=template.time,
+                    slot_type=slot_type_for(template.sport, template.time),
+                ))
+                if len(batch) >= batch_size:
+                    Slot.objects.bulk_create(batch, batch_size=batch_size)
+                    inserted += len(batch)
+                    batch = []
+        if batch:
+            Slot.objects.bulk_create(batch, batch_size=batch_size)
+            inserted += len(batch)
+
+        if inserted:
+            refresh_availability_range(start, end, location_ids=location_ids, sport_ids=sport_ids)
+    return inserted
@@ -0,0 +1,138 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta, time as dtime
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from bookings.availability import month_availability, refresh_availability_range
+from bookings.models import Slot
+from sports.models import Location, Sport
+
+BENCHMARK_LOCATION = "Slot Benchmark"
+BENCHMARK_SPORTS = 20
+HOURS = range(6, 24)
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the slot lookup hot paths and prints their query plans. "
+        "Run it before and after `migrate bookings` to compare plans with and without the slot indexes; "
+        "--seed fills a dedicated benchmark location with synthetic slots first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Insert this many synthetic slots (e.g. 1000000).")
+        parser.add_argument("--runs", type=int, default=20, help="Timed runs per query.")
+        parser.add_argument("--cleanup", action="store_true", help="Delete the benchmark location and its slots, then exit.")
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            deleted, _ = Location.objects.filter(name=BENCHMARK_LOCATION).delete()
+            self.stdout.write(self.style.SUCCESS(f"Removed {deleted} benchmark row(s)."))
+            return
+
+        if options["seed"]:
+            self.seed(options["seed"])
+
+        location = Location.objects.filter(name=BENCHMARK_LOCATION).first()
+        if location is None:
+            self.stderr.write("No benchmark data found; run with --seed N first.")
+            return
+        sport = Sport.objects.filter(location=location).order_by("sport_id").first()
+        today = date.today()
+        probe_day = today + timedelta(days=7)
+
+        self.stdout.write(f"Database: {connection.vendor}, slots: {Slot.objects.count()}")
+        self.stdout.write(f"Slot indexes: {', '.join(sorted(self.slot_indexes()))}\n")
+
+        queries = {
+            "list_slots (one day)": Slot.objects.filter(
+                date=probe_day, location=location, sport=sport, is_booked=False
+            ).order_by("time"),
+            "select_equipment (location free slots)": Slot.objects.filter(
+                location=location, is_booked=False, date__gte=today
+            ),
+            "admin_add_booking (next 100 free)": Slot.objects.filter(
+                is_booked=False, date__gte=today
+            ).order_by("date", "time")[:100],
+        }
+        for label, queryset in queries.items():
+            self.report(label, lambda qs=queryset: list(qs.values_list("slot_id", flat=True)), options["runs"], queryset)
+
+        def per_day_exists():
+            for offset in range(31):
+                Slot.objects.filter(
+                    date=probe_day + timedelta(days=offset), location=location, sport=sport, is_booked=False
+                ).exists()
+
+        self.report("choose_date, legacy per-day exists() x31", per_day_exists, options["runs"])
+        self.report(
+            "choose_date, summary table",
+            lambda: month_availability(location.pk, sport.pk, probe_day.year, probe_day.month, today=today),
+            options["runs"],
+        )
+
+    def seed(self, rows):
+        rng = random.Random(42)
+        with transaction.atomic():
+            location, _ = Location.objects.get_or_create(
+                name=BENCHMARK_LOCATION, defaults={"city": "Bench", "state": "TX", "zip_code": "00000"}
+            )
+            sports = [
+                Sport.objects.get_or_create(location=location, name=f"Benchmark Sport {i}", defaults={"price": 10})[0]
+                for i in range(BENCHMARK_SPORTS)
+            ]
+        start = date.today() - timedelta(days=30)
+        per_day = len(sports) * len(HOURS)
+        days = -(-rows // per_day)
+        self.stdout.write(f"Seeding {rows} slots over {days} days...")
+
+        Slot.objects.filter(location=location).delete()
+        batch, inserted, started = [], 0, time.perf_counter()
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            for sport in sports:
+                for hour in HOURS:
+                    if inserted + len(batch) >= rows:
+                        break
+                    batch.append(Slot(
+                        location=location, sport=sport, date=day, time=dtime(hour),
+                        is_booked=rng.random() < 0.3,
+                    ))
+            if len(batch) >= 10000:
+                Slot.objects.bulk_create(batch, batch_size=10000)
+                inserted += len(batch)
+                batch = []
+        Slot.objects.bulk_create(batch, batch_size=10000)
+        inserted += len(batch)
+        refresh_availability_range(start, start + timedelta(days=days), location_ids=[location.pk])
+        self.stdout.write(f"Seeded {inserted} slots in {time.perf_counter() - started:.1f}s.")
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("ANALYZE bookings_slot")
+
+    def slot_indexes(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Slot._meta.db_table)
+        return [name for name, info in constraints.items() if info["index"] or info["unique"]]
+
+    def report(self, label, run, runs, queryset=None):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(
+            f"  median {statistics.median(timings):.2f} ms, "
+            f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:.2f} ms over {runs} runs"
+        )
+        if queryset is not None:
+            analyze = connection.vendor == "postgresql"
+            plan = queryset.explain(analyze=True) if analyze else queryset.explain()
+            for line in plan.splitlines():
+                self.stdout.write(f"    {line}")
+        self.stdout.write("")
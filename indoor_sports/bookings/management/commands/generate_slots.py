@@ -0,0 +1,41 @@
+import time
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.generation import generate_slots
+
+
+class Command(BaseCommand):
+    help = "Expands the weekly slot templates into Slot rows for a date range. Safe to re-run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First date to generate (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument("--end", help="Last date to generate (YYYY-MM-DD). Defaults to start + --days - 1.")
+        parser.add_argument("--days", type=int, default=90, help="Number of days to generate when --end is not given.")
+        parser.add_argument("--location", type=int, help="Only generate slots for this location ID.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per bulk_create batch.")
+
+    def _parse_date(self, value, option):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError(f"{option} must be a date in YYYY-MM-DD format, got {value!r}.")
+
+    def handle(self, *args, **options):
+        start = self._parse_date(options["start"], "--start") if options["start"] else date.today()
+        if options["end"]:
+            end = self._parse_date(options["end"], "--end")
+        else:
+            end = start + timedelta(days=options["days"] - 1)
+        if end < start:
+            raise CommandError("--end must not be before --start.")
+
+        started = time.perf_counter()
+        inserted = generate_slots(start, end, location_id=options["location"], batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+
+        rate = inserted / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserted {inserted} slot(s) for {start} to {end} in {elapsed:.2f}s ({rate:.0f} rows/s)."
+        ))
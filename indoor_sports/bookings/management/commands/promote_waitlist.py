@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from bookings.waitlist import promote_waiting
+
+
+class Command(BaseCommand):
+    help = (
+        "Offers every free upcoming slot to the head of its waitlist. Catches up on "
+        "promotions the background workers missed, e.g. after a restart."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=500, help="Slots processed per run.")
+
+    def handle(self, *args, **options):
+        promoted = promote_waiting(limit=options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"Promoted {promoted} waitlisted user(s)."))
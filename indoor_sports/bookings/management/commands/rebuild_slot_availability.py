@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from bookings.availability import availability_drift, rebuild_availability
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the bookings_slot_availability summary table from bookings_slot, or checks it for drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only compare the summary table with the slot table and report mismatches.",
+        )
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            drift = availability_drift()
+            for location_id, sport_id, day, stored, actual in drift:
+                self.stdout.write(
+                    f"location={location_id} sport={sport_id} date={day} "
+                    f"stored(free,total)={stored} actual(free,total)={actual}"
+                )
+            if drift:
+                raise CommandError(f"{len(drift)} availability row(s) drifted from the slot table.")
+            self.stdout.write(self.style.SUCCESS("Slot availability summary matches the slot table."))
+            return
+
+        with transaction.atomic():
+            written = rebuild_availability()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt slot availability: {written} row(s) written."))
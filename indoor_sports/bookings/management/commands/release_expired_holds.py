@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from bookings.services import release_expired_holds
+from bookings.waitlist import promote_waiting
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancels unpaid bookings whose slot hold has expired, frees their slots and offers "
+        "them to their waitlists. Meant to run periodically, e.g. every minute from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Holds released per transaction.")
+
+    def handle(self, *args, **options):
+        released = release_expired_holds(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired slot hold(s)."))
+        promoted = promote_waiting()
+        self.stdout.write(self.style.SUCCESS(f"Promoted {promoted} waitlisted user(s)."))
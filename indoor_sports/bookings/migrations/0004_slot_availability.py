@@ -0,0 +1,56 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_slot_availability(apps, schema_editor):
+    Slot = apps.get_model('bookings', 'Slot')
+    SlotAvailability = apps.get_model('bookings', 'SlotAvailability')
+    counts = (
+        Slot.objects.values('location_id', 'sport_id', 'date')
+        .annotate(total=Count('slot_id'), free=Count('slot_id', filter=Q(is_booked=False)))
+        .order_by()
+    )
+    SlotAvailability.objects.bulk_create(
+        [
+            SlotAvailability(
+                location_id=row['location_id'],
+                sport_id=row['sport_id'],
+                date=row['date'],
+                total_slots=row['total'],
+                free_slots=row['free'],
+            )
+            for row in counts
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_alter_booking_options_booking_cancellation_time_and_more'),
+        ('sports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_slots', models.IntegerField(default=0)),
+                ('free_slots', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_availability', to='sports.location')),
+                ('sport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_availability', to='sports.sport')),
+            ],
+            options={
+                'db_table': 'bookings_slot_availability',
+                'constraints': [models.UniqueConstraint(fields=('location', 'sport', 'date'), name='unique_slot_availability_day')],
+            },
+        ),
+        migrations.RunPython(backfill_slot_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_slot_availability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='hold_token',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+    ]
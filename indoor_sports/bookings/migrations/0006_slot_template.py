@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_booking_hold'),
+        ('sports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('time', models.TimeField()),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_templates', to='sports.location')),
+                ('sport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_templates', to='sports.sport')),
+            ],
+            options={
+                'db_table': 'bookings_slot_template',
+                'ordering': ['location', 'sport', 'weekday', 'time'],
+                'constraints': [models.UniqueConstraint(fields=('location', 'sport', 'weekday', 'time'), name='unique_slot_template')],
+            },
+        ),
+    ]
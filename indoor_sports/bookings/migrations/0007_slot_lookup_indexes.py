@@ -0,0 +1,47 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:19
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_slots(apps, schema_editor):
+    """Fails early with the offending keys instead of an opaque IntegrityError from AddConstraint."""
+    Slot = apps.get_model('bookings', 'Slot')
+    duplicates = list(
+        Slot.objects.values('location_id', 'sport_id', 'date', 'time')
+        .annotate(copies=Count('slot_id'))
+        .filter(copies__gt=1)
+        .order_by()[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Duplicate slots must be merged before unique_slot_time can be added: "
+            + "; ".join(
+                f"location={d['location_id']} sport={d['sport_id']} {d['date']} {d['time']} x{d['copies']}"
+                for d in duplicates
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_slot_template'),
+        ('sports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_slots, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='slot',
+            index=models.Index(condition=models.Q(('is_booked', False)), fields=['location', 'sport', 'date', 'time'], name='slot_free_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='slot',
+            index=models.Index(condition=models.Q(('is_booked', False)), fields=['date', 'time'], name='slot_free_by_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='slot',
+            constraint=models.UniqueConstraint(fields=('location', 'sport', 'date', 'time'), name='unique_slot_time'),
+        ),
+    ]
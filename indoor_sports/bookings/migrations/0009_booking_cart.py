@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_slot_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingCart',
+            fields=[
+                ('cart_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('Held', 'Held'), ('Paid', 'Paid'), ('Cancelled', 'Cancelled')], default='Held', max_length=20)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('stripe_session_id', models.CharField(blank=True, max_length=255, null=True, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_carts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'bookings_booking_cart',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='cart',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='bookings.bookingcart'),
+        ),
+    ]
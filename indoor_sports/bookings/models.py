@@ -3,6 +3,7 @@ from django.db import models
 from django.conf import settings
 from equipment.models import Equipment
 from payments.models import Payment
+from payments.pricing import slot_type_of, unit_price
 from django.core.validators import MinValueValidator
 
 # ------------------------------------------------------------------------------
@@ -25,20 +26,160 @@ class Slot(models.Model):
     location = models.ForeignKey("sports.Location", on_delete=models.CASCADE, related_name="slots")
     sport = models.ForeignKey("sports.Sport", on_delete=models.CASCADE, related_name="slots")
     is_active = models.BooleanField(default=True)  # Add this field
+    # Bumped on every write, including queryset updates in bookings.services; drives conditional GETs.
+    updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # One slot per court time; the unique index also serves (location, sport, date) lookups ordered by time.
+            models.UniqueConstraint(fields=['location', 'sport', 'date', 'time'], name='unique_slot_time'),
+        ]
+        indexes = [
+            # list_slots / choose_date / select_equipment: free slots of a location and sport on a day.
+            models.Index(
+                fields=['location', 'sport', 'date', 'time'],
+                name='slot_free_lookup_idx',
+                condition=models.Q(is_booked=False),
+            ),
+            # admin_add_booking: upcoming free slots across all locations ordered by date and time.
+            models.Index(
+                fields=['date', 'time'],
+                name='slot_free_by_date_idx',
+                condition=models.Q(is_booked=False),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.date} {self.time} ({self.slot_type}) at {self.location.name}"
 
     def get_price(self):
         """
-        Returns the slot price based on its type.
+        Returns the slot price based on its time (see payments.pricing).
         If the slot is during peak hours and the sport defines a peak_price, that price is used;
         otherwise, the standard price is returned.
         """
-        if self.slot_type == "Peak":
-            return self.sport.peak_price if self.sport.peak_price is not None else self.sport.price
-        return self.sport.price
+        return unit_price(self.sport, slot_type_of(self))[0]
+
+
+
+
+# ------------------------------------------------------------------------------
+# SlotTemplate Model: A weekly recurring slot that generate_slots expands into Slot rows.
+# ------------------------------------------------------------------------------
+class SlotTemplate(models.Model):
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+    location = models.ForeignKey("sports.Location", on_delete=models.CASCADE, related_name="slot_templates")
+    sport = models.ForeignKey("sports.Sport", on_delete=models.CASCADE, related_name="slot_templates")
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    time = models.TimeField()
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'bookings_slot_template'
+        ordering = ['location', 'sport', 'weekday', 'time']
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'sport', 'weekday', 'time'], name='unique_slot_template'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_weekday_display()} {self.time} - {self.sport.name} at {self.location.name}"
+
+
+
+
+# ------------------------------------------------------------------------------
+# SlotAvailability Model: Denormalized per-day slot counts for a location and sport.
+# Kept in step with Slot.is_booked by bookings.availability in the same transaction.
+# ------------------------------------------------------------------------------
+class SlotAvailability(models.Model):
+    location = models.ForeignKey("sports.Location", on_delete=models.CASCADE, related_name="slot_availability")
+    sport = models.ForeignKey("sports.Sport", on_delete=models.CASCADE, related_name="slot_availability")
+    date = models.DateField()
+    total_slots = models.IntegerField(default=0)
+    free_slots = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'bookings_slot_availability'
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'sport', 'date'], name='unique_slot_availability_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.date}: {self.free_slots}/{self.total_slots} free at location {self.location_id}"
+
+
+
+
+# ------------------------------------------------------------------------------
+# BookingCart Model: Several slots reserved together and paid for with one checkout.
+# ------------------------------------------------------------------------------
+class BookingCart(models.Model):
+    STATUS_CHOICES = [
+        ('Held', 'Held'),
+        ('Paid', 'Paid'),
+        ('Cancelled', 'Cancelled'),
+    ]
+    cart_id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="booking_carts"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Held")
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    stripe_session_id = models.CharField(max_length=255, unique=True, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'bookings_booking_cart'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Cart {self.cart_id} ({self.status}) for user {self.user_id}"
+
+
+
+
+# ------------------------------------------------------------------------------
+# BookingSeries Model: A recurring weekly booking (e.g. a league's court for a season).
+# ------------------------------------------------------------------------------
+class BookingSeries(models.Model):
+    STATUS_CHOICES = [
+        ('Active', 'Active'),
+        ('Cancelled', 'Cancelled'),
+    ]
+    series_id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="booking_series"
+    )
+    location = models.ForeignKey("sports.Location", on_delete=models.CASCADE, related_name="booking_series")
+    sport = models.ForeignKey("sports.Sport", on_delete=models.CASCADE, related_name="booking_series")
+    weekday = models.PositiveSmallIntegerField(choices=SlotTemplate.WEEKDAY_CHOICES)
+    time = models.TimeField()
+    start_date = models.DateField()
+    occurrences = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Active")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'bookings_booking_series'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Series {self.series_id}: {self.get_weekday_display()} {self.time} x{self.occurrences} at {self.location_id}"
 
 
 
@@ -85,13 +226,95 @@ class Booking(models.Model):
     cancellation_time = models.DateTimeField(null=True, blank=True)
     location = models.ForeignKey("sports.Location", on_delete=models.CASCADE, related_name="bookings")
     submitted_review = models.BooleanField(default=False)
+    # Unpaid bookings hold their slot until hold_expires_at; cleared once payment succeeds.
+    hold_token = models.UUIDField(null=True, blank=True, unique=True)
+    hold_expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Set when the booking was reserved as part of a multi-slot cart.
+    cart = models.ForeignKey(
+        BookingCart,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="bookings"
+    )
+    # Set when the booking is one occurrence of a recurring series.
+    series = models.ForeignKey(
+        BookingSeries,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="bookings"
+    )
+    # Bumped on every write (bulk UPDATEs set it explicitly); the report ETL reads changes by it.
+    updated_at = models.DateTimeField(auto_now=True)
     def __str__(self):
         full_name = getattr(self.user, "get_full_name", lambda: self.user.username)()
         return f"Booking {self.booking_id} by {full_name} for {self.sport.name}"
-    
+
+    @property
+    def is_held(self):
+        """True while the booking is an unpaid hold on its slot."""
+        return self.hold_expires_at is not None
+
     class Meta:
         db_table = 'bookings_booking'
         ordering = ['sport']
+        indexes = [
+            models.Index(fields=['updated_at', 'booking_id'], name='booking_changed_idx'),
+        ]
+
+
+
+
+# ------------------------------------------------------------------------------
+# WaitlistEntry Model: A user queued for a booked slot, promoted first-in first-out
+# into a held booking when the slot is freed.
+# ------------------------------------------------------------------------------
+class WaitlistEntry(models.Model):
+    STATUS_CHOICES = [
+        ('Waiting', 'Waiting'),
+        ('Promoted', 'Promoted'),
+        ('Cancelled', 'Cancelled'),
+    ]
+    slot = models.ForeignKey(Slot, on_delete=models.CASCADE, related_name="waitlist")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="waitlist_entries"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Waiting")
+    booking = models.ForeignKey(
+        Booking,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="waitlist_entries"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    promoted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'bookings_waitlist_entry'
+        ordering = ['slot', 'created_at', 'id']
+        constraints = [
+            # A user waits at most once per slot.
+            models.UniqueConstraint(
+                fields=['slot', 'user'],
+                condition=models.Q(status='Waiting'),
+                name='unique_waiting_entry',
+            ),
+        ]
+        indexes = [
+            # promote_next: oldest waiting entry of a slot.
+            models.Index(
+                fields=['slot', 'created_at', 'id'],
+                name='waitlist_queue_idx',
+                condition=models.Q(status='Waiting'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Waitlist {self.id}: user {self.user_id} for slot {self.slot_id} ({self.status})"
 
 
 
@@ -116,6 +339,14 @@ class BookingReport(models.Model):
         ('Female', 'Female'),
     ]
     
+    # The booking this row was derived from by the report ETL; null for rows entered by hand.
+    booking = models.OneToOneField(
+        Booking,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="report_row"
+    )
     userid = models.IntegerField()
     sport = models.CharField(max_length=100, choices=SPORT_CHOICES)
     location = models.CharField(max_length=255)
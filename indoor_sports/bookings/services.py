@@ -0,0 +1,397 @@
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from bookings.availability import adjust_availability, slot_booked
+from bookings.models import Booking, BookingCart, BookingSeries, Slot
+from equipment.models import Equipment
+from memberships.discounts import active_plan_name
+from payments.pricing import equipment_discount, quote_slots
+
+
+# ------------------------------------------------------------------------------
+# Booking service: the one place that turns a free slot into a booking.
+# ------------------------------------------------------------------------------
+class BookingConflict(Exception):
+    """Base class for reservations that lost a race or ran out of inventory."""
+
+
+class SlotUnavailable(BookingConflict):
+    def __init__(self, slot):
+        self.slot = slot
+        super().__init__(f"Slot {slot.pk} is no longer available.")
+
+
+class SlotsUnavailable(BookingConflict):
+    def __init__(self, slot_ids):
+        self.slot_ids = sorted(slot_ids)
+        super().__init__(f"Slots {', '.join(map(str, self.slot_ids))} are no longer available.")
+
+
+class EquipmentUnavailable(BookingConflict):
+    def __init__(self, equipment, quantity):
+        self.equipment = equipment
+        self.quantity = quantity
+        super().__init__(f"Not enough {equipment.name} in stock for {quantity} item(s).")
+
+
+def claim_slot(slot_id):
+    """
+    Atomically flips a slot from free to booked with a conditional UPDATE.
+    Returns True only for the caller whose UPDATE matched the free row.
+    """
+    return Slot.objects.filter(pk=slot_id, is_booked=False).update(is_booked=True, updated_at=timezone.now()) == 1
+
+
+def take_equipment(equipment_id, quantity):
+    """Atomically deducts `quantity` items from stock; returns False when stock is short."""
+    return Equipment.objects.filter(pk=equipment_id, quantity__gte=quantity).update(
+        quantity=F("quantity") - quantity
+    ) == 1
+
+
+def reserve_slot(user, slot, status="Pending", equipment=None, quantity=None, hold=False):
+    """
+    Claims `slot` for `user` and creates the Booking in one transaction.
+
+    With hold=True the booking only holds the slot for SLOT_HOLD_TTL_MINUTES; it
+    becomes firm through confirm_hold() once payment succeeds, otherwise
+    release_expired_holds() frees the slot again.
+
+    Raises SlotUnavailable when another request already booked the slot and
+    EquipmentUnavailable when the requested equipment is out of stock; in both
+    cases nothing is written.
+    """
+    with transaction.atomic():
+        if not claim_slot(slot.pk):
+            raise SlotUnavailable(slot)
+        if equipment is not None and quantity:
+            if not take_equipment(equipment.pk, quantity):
+                raise EquipmentUnavailable(equipment, quantity)
+
+        slot.is_booked = True
+        slot_booked(slot)
+        hold_fields = new_hold() if hold else {}
+        return Booking.objects.create(
+            user=user,
+            sport_id=slot.sport_id,
+            slot=slot,
+            location_id=slot.location_id,
+            status=status,
+            date=slot.date,
+            time_slot=slot.time,
+            equipment=equipment,
+            quantity=quantity,
+            **hold_fields,
+        )
+
+
+# ------------------------------------------------------------------------------
+# Slot holds: unpaid bookings keep their slot only for a limited time.
+# ------------------------------------------------------------------------------
+def new_hold():
+    """Returns the Booking field values for a fresh hold."""
+    return {
+        "hold_token": uuid.uuid4(),
+        "hold_expires_at": timezone.now() + timedelta(minutes=settings.SLOT_HOLD_TTL_MINUTES),
+    }
+
+
+def confirm_hold(booking):
+    """
+    Turns a held booking into a firm one once it has been paid for.
+
+    Returns False only when the hold had already expired and the slot has since
+    been taken by someone else; the caller then has a payment without a slot.
+    """
+    with transaction.atomic():
+        if Booking.objects.filter(pk=booking.pk, hold_expires_at__isnull=False).update(
+            status="Booked", hold_expires_at=None, updated_at=timezone.now()
+        ):
+            booking.status, booking.hold_expires_at = "Booked", None
+            return True
+
+        booking.refresh_from_db(fields=["status", "hold_token", "hold_expires_at"])
+        if booking.hold_token is None or booking.status != "Cancelled":
+            return True  # never held, or already confirmed by an earlier call
+
+        # The sweeper released this hold; take the slot back if it is still free.
+        if not claim_slot(booking.slot_id):
+            return False
+        slot_booked(booking.slot)
+        Booking.objects.filter(pk=booking.pk).update(status="Booked", cancellation_time=None, updated_at=timezone.now())
+        booking.status, booking.cancellation_time = "Booked", None
+        return True
+
+
+def release_expired_holds(now=None, batch_size=500):
+    """
+    Cancels every booking whose hold has expired and frees its slot, in batches.
+    Returns the number of holds released.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            expired = list(
+                Booking.objects.select_for_update(skip_locked=True)
+                .filter(hold_expires_at__lt=now)
+                .values_list("booking_id", "slot_id")[:batch_size]
+            )
+            if not expired:
+                return released
+
+            booking_ids = [booking_id for booking_id, _ in expired]
+            Booking.objects.filter(pk__in=booking_ids).update(
+                status="Cancelled", cancellation_time=now, hold_expires_at=None, updated_at=now
+            )
+            free_slots([slot_id for _, slot_id in expired], now)
+            released += len(expired)
+
+
+def cancel_reservation(booking, now=None):
+    """
+    Cancels one booking and frees its slot in one transaction.
+    Returns False when the booking was already cancelled.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        if not Booking.objects.filter(pk=booking.pk).exclude(status="Cancelled").update(
+            status="Cancelled", cancellation_time=now, hold_expires_at=None, updated_at=now
+        ):
+            return False
+        free_slots([booking.slot_id], now)
+    booking.status, booking.cancellation_time, booking.hold_expires_at = "Cancelled", now, None
+    return True
+
+
+def free_slots(slot_ids, now=None):
+    """
+    Marks the given slots free again with one UPDATE and adjusts the availability
+    summary per day. Slots that are already free are skipped. Returns the number freed.
+    """
+    now = now or timezone.now()
+    freed = list(
+        Slot.objects.filter(pk__in=slot_ids, is_booked=True)
+        .values_list("slot_id", "location_id", "sport_id", "date")
+    )
+    Slot.objects.filter(pk__in=[row[0] for row in freed]).update(is_booked=False, updated_at=now)
+    for (location_id, sport_id, day), count in Counter(row[1:] for row in freed).items():
+        adjust_availability(location_id, sport_id, day, count)
+    return len(freed)
+
+
+# ------------------------------------------------------------------------------
+# Carts: several slots claimed in one transaction and paid for with one checkout.
+# ------------------------------------------------------------------------------
+MAX_CART_SLOTS = 8
+
+
+def cart_line_items(slots, equipment=None, quantity=None, plan_name=None):
+    """
+    Prices a cart in one pass. Returns (line_items, total) where each line item is
+    a (description, amount) pair: one per slot, plus one for the equipment rental,
+    each net of the membership discount for `plan_name`.
+    Slots must have their sport loaded (select_related("sport")).
+    """
+    prices = quote_slots(slots, plan_name)
+    line_items = [
+        (f"{slot.sport.name} - {slot.date} {slot.time:%H:%M}", prices[slot.pk])
+        for slot in slots
+    ]
+    if equipment is not None and quantity:
+        rental = Decimal(equipment.price) * quantity
+        line_items.append((f"Equipment: {equipment.name} x {quantity}", rental - equipment_discount(rental, plan_name)))
+    return line_items, sum((amount for _, amount in line_items), Decimal(0))
+
+
+def reserve_slots(user, slot_ids, equipment=None, quantity=None):
+    """
+    Claims every slot in `slot_ids` for `user` and creates one held Booking per slot
+    under a new BookingCart, all in one transaction. The equipment rental, if any,
+    is attached to the earliest booking and covers the whole block.
+
+    Raises SlotsUnavailable listing the slots someone else booked first and
+    EquipmentUnavailable when stock is short; in both cases nothing is written.
+    """
+    slot_ids = set(map(int, slot_ids))
+    if not slot_ids or len(slot_ids) > MAX_CART_SLOTS:
+        raise ValueError(f"A cart holds between 1 and {MAX_CART_SLOTS} slots.")
+
+    with transaction.atomic():
+        # Lock in primary-key order so concurrent carts cannot deadlock each other.
+        slots = list(
+            Slot.objects.select_for_update(of=("self",))
+            .select_related("sport")
+            .filter(pk__in=slot_ids)
+            .order_by("pk")
+        )
+        taken = slot_ids - {slot.pk for slot in slots if not slot.is_booked}
+        if taken:
+            raise SlotsUnavailable(taken)
+        claimed = Slot.objects.filter(pk__in=slot_ids, is_booked=False).update(
+            is_booked=True, updated_at=timezone.now()
+        )
+        if claimed != len(slot_ids):
+            raise SlotsUnavailable(slot_ids - set(
+                Slot.objects.filter(pk__in=slot_ids, is_booked=False).values_list("pk", flat=True)
+            ))
+        if equipment is not None and quantity:
+            if not take_equipment(equipment.pk, quantity):
+                raise EquipmentUnavailable(equipment, quantity)
+
+        return _hold_in_cart(user, slots, equipment, quantity)
+
+
+def _hold_in_cart(user, slots, equipment=None, quantity=None, series=None):
+    """
+    Creates a cart with one held Booking per already-claimed slot and books the slots
+    in the availability summary. Must run inside the transaction that claimed them.
+    """
+    slots = sorted(slots, key=lambda slot: (slot.date, slot.time))
+    _, total = cart_line_items(slots, equipment, quantity, active_plan_name(user))
+    cart = BookingCart.objects.create(user=user, total_amount=total)
+    expires_at = new_hold()["hold_expires_at"]
+    bookings = []
+    for index, slot in enumerate(slots):
+        slot.is_booked = True
+        first = index == 0
+        bookings.append(Booking(
+            user=user,
+            sport_id=slot.sport_id,
+            slot=slot,
+            location_id=slot.location_id,
+            status="Booked",
+            date=slot.date,
+            time_slot=slot.time,
+            equipment=equipment if first else None,
+            quantity=quantity if first else None,
+            hold_token=uuid.uuid4(),
+            hold_expires_at=expires_at,
+            cart=cart,
+            series=series,
+        ))
+    Booking.objects.bulk_create(bookings)
+    for (location_id, sport_id, day), count in Counter(
+        (slot.location_id, slot.sport_id, slot.date) for slot in slots
+    ).items():
+        adjust_availability(location_id, sport_id, day, -count)
+    return cart
+
+
+def confirm_cart(cart):
+    """
+    Turns every held booking of a paid cart into a firm one.
+
+    Returns the bookings whose slot was lost because their hold expired before
+    payment, or None when the cart had already been confirmed by an earlier call.
+    """
+    with transaction.atomic():
+        if not BookingCart.objects.filter(pk=cart.pk, status="Held").update(status="Paid", updated_at=timezone.now()):
+            return None
+        cart.status = "Paid"
+        return [booking for booking in cart.bookings.select_related("slot") if not confirm_hold(booking)]
+
+
+# ------------------------------------------------------------------------------
+# Series: the same weekday and time booked for several weeks in a row.
+# ------------------------------------------------------------------------------
+MAX_SERIES_OCCURRENCES = 26
+
+
+def series_dates(start_date, weekday, occurrences):
+    """Returns the first `occurrences` dates on `weekday` (0 = Monday) from `start_date` onward."""
+    first = start_date + timedelta(days=(weekday - start_date.weekday()) % 7)
+    return [first + timedelta(weeks=week) for week in range(occurrences)]
+
+
+def plan_series(location_id, sport_id, weekday, time, occurrences, start_date=None, lock=False):
+    """
+    Matches every date of a weekly rule against the slot table with one query.
+
+    Returns (free, conflicts): `free` is the list of bookable Slots in date order and
+    `conflicts` maps each unbookable date to "booked" or "no slot". With lock=True
+    the matched slots are locked for the rest of the caller's transaction.
+    """
+    if not 1 <= occurrences <= MAX_SERIES_OCCURRENCES:
+        raise ValueError(f"A series has between 1 and {MAX_SERIES_OCCURRENCES} occurrences.")
+    dates = series_dates(start_date or date.today(), weekday, occurrences)
+    slots = Slot.objects.select_related("sport").filter(
+        location_id=location_id, sport_id=sport_id, time=time, date__in=dates
+    ).order_by("pk")
+    if lock:
+        slots = slots.select_for_update(of=("self",))
+    by_date = {slot.date: slot for slot in slots}
+
+    free, conflicts = [], {}
+    for day in dates:
+        slot = by_date.get(day)
+        if slot is None:
+            conflicts[day] = "no slot"
+        elif slot.is_booked:
+            conflicts[day] = "booked"
+        else:
+            free.append(slot)
+    return free, conflicts
+
+
+def reserve_series(user, location_id, sport_id, weekday, time, occurrences, start_date=None):
+    """
+    Books every free occurrence of a weekly rule in one transaction and links the
+    bookings under a new BookingSeries and one cart, so the season is paid in one checkout.
+
+    Returns (series, cart, conflicts). Occurrences that were already booked or have
+    no slot are reported in `conflicts` and skipped. Raises BookingConflict when
+    no occurrence is free.
+    """
+    start_date = start_date or date.today()
+    with transaction.atomic():
+        free, conflicts = plan_series(
+            location_id, sport_id, weekday, time, occurrences, start_date, lock=True
+        )
+        if not free:
+            raise BookingConflict("None of the occurrences in this series are available.")
+        slot_ids = [slot.pk for slot in free]
+        if Slot.objects.filter(pk__in=slot_ids, is_booked=False).update(
+            is_booked=True, updated_at=timezone.now()
+        ) != len(slot_ids):
+            # Only reachable without row locks (e.g. SQLite): a slot was claimed after planning.
+            raise SlotsUnavailable(slot_ids)
+
+        series = BookingSeries.objects.create(
+            user=user, location_id=location_id, sport_id=sport_id, weekday=weekday,
+            time=time, start_date=start_date, occurrences=occurrences,
+        )
+        cart = _hold_in_cart(user, free, series=series)
+        return series, cart, conflicts
+
+
+def cancel_series(series, now=None):
+    """
+    Cancels every upcoming booking of a series in bulk and frees their slots.
+    Returns the number of bookings cancelled.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        upcoming = list(
+            series.bookings.select_for_update()
+            .exclude(status="Cancelled")
+            .filter(date__gte=now.date())
+            .values_list("booking_id", "slot_id")
+        )
+        Booking.objects.filter(pk__in=[booking_id for booking_id, _ in upcoming]).update(
+            status="Cancelled", cancellation_time=now, hold_expires_at=None, updated_at=now
+        )
+        free_slots([slot_id for _, slot_id in upcoming], now)
+        BookingCart.objects.filter(bookings__series=series, status="Held").update(
+            status="Cancelled", updated_at=now
+        )
+        BookingSeries.objects.filter(pk=series.pk).update(status="Cancelled")
+        series.status = "Cancelled"
+        return len(upcoming)
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .calendar_cache import bump_calendar_version
+from .models import Booking, Slot
+
+
+@receiver(post_save, sender=Slot)
+@receiver(post_delete, sender=Slot)
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_calendar(sender, instance, **kwargs):
+    """
+    Invalidates the cached availability calendar of the slot's (location, sport).
+    Queryset updates skip these signals; bookings.availability bumps the version for those.
+    """
+    bump_calendar_version(instance.location_id, instance.sport_id)
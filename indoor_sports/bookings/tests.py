@@ -1,3 +1,455 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from bookings.availability import (
+    availability_drift, month_availability, rebuild_availability, refresh_slot_keys, slot_released,
+)
+from bookings.calendar_cache import calendar_cache_stats
+from bookings.generation import generate_slots
+from bookings.models import Booking, BookingCart, Slot, SlotTemplate, WaitlistEntry
+from bookings.services import (
+    SlotsUnavailable, SlotUnavailable, cancel_reservation, cancel_series, confirm_cart, confirm_hold, free_slots,
+    plan_series, release_expired_holds, reserve_series, reserve_slot, reserve_slots, series_dates,
+)
+from bookings.waitlist import join_waitlist, promote_waiting, schedule_promotion
+from sports.models import Location, Sport
+
+
+class BookingTestData:
+    """Shared fixtures for booking tests: one user, location and sport."""
+
+    @classmethod
+    def create_fixtures(cls):
+        cls.user = User.objects.create_user(
+            username="player", emailid="player@example.com",
+            firstname="Pat", lastname="Player", password="password123",
+            gender="Female",
+        )
+        cls.location = Location.objects.create(
+            name="Denton Downtown", city="Denton", state="TX", zip_code="76201"
+        )
+        cls.sport = Sport.objects.create(
+            name="Badminton", location=cls.location, price="20.00", peak_price="30.00"
+        )
+
+
+class MonthAvailabilityTests(BookingTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.today = date.today()
+        cls.tomorrow = cls.today + timedelta(days=1)
+        for hour in (9, 10, 11):
+            Slot.objects.create(
+                date=cls.tomorrow, time=time(hour), location=cls.location,
+                sport=cls.sport, is_booked=(hour == 9),
+            )
+        rebuild_availability()
+
+    def test_reads_free_and_total_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            availability = month_availability(
+                self.location.pk, self.sport.pk, self.tomorrow.year, self.tomorrow.month, today=self.today
+            )
+        self.assertEqual(availability[self.tomorrow.strftime("%Y-%m-%d")], {"free": 2, "total": 3})
+
+    def test_past_months_are_empty_without_querying(self):
+        past = self.today.replace(day=1) - timedelta(days=1)
+        with self.assertNumQueries(0):
+            availability = month_availability(self.location.pk, self.sport.pk, past.year, past.month, today=self.today)
+        self.assertFalse(any(day["free"] for day in availability.values()))
+
+
+class SlotAvailabilitySummaryTests(BookingTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.day = date.today() + timedelta(days=2)
+        cls.slot = Slot.objects.create(
+            date=cls.day, time=time(18), location=cls.location, sport=cls.sport, is_booked=True
+        )
+        rebuild_availability()
+
+    def test_release_updates_summary_without_drift(self):
+        Slot.objects.filter(pk=self.slot.pk).update(is_booked=False)
+        slot_released(self.slot)
+        self.assertEqual(availability_drift(), [])
+
+    def test_check_command_reports_drift(self):
+        Slot.objects.filter(pk=self.slot.pk).update(is_booked=False)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_slot_availability", "--check", stdout=StringIO())
+        call_command("rebuild_slot_availability", stdout=StringIO())
+        self.assertEqual(availability_drift(), [])
+
+    def test_refresh_slot_keys_recounts_created_and_deleted_slots(self):
+        added = Slot.objects.create(date=self.day, time=time(19), location=self.location, sport=self.sport)
+        self.assertNotEqual(availability_drift(), [])
+        refresh_slot_keys(added, self.slot)
+        self.assertEqual(availability_drift(), [])
+
+        next_day = self.day + timedelta(days=1)
+        lone = Slot.objects.create(date=next_day, time=time(18), location=self.location, sport=self.sport)
+        refresh_slot_keys(lone)
+        lone.delete()
+        refresh_slot_keys(lone)
+        availability = month_availability(self.location.pk, self.sport.pk, next_day.year, next_day.month)
+        self.assertEqual(availability[next_day.strftime("%Y-%m-%d")], {"free": 0, "total": 0})
+        self.assertEqual(availability_drift(), [])
+
+    def test_admin_site_slot_changes_refresh_the_summary(self):
+        slot_admin = admin.site._registry[Slot]
+        request = RequestFactory().post("/")
+        added = Slot(date=self.day, time=time(19), location=self.location, sport=self.sport)
+        slot_admin.save_model(request, added, None, False)
+        self.assertEqual(availability_drift(), [])
+
+        added.date = self.day + timedelta(days=1)
+        slot_admin.save_model(request, added, None, True)
+        self.assertEqual(availability_drift(), [])
+
+        slot_admin.delete_queryset(request, Slot.objects.filter(pk=added.pk))
+        self.assertEqual(availability_drift(), [])
+
+        other = Slot.objects.create(date=self.day, time=time(20), location=self.location, sport=self.sport)
+        slot_admin.delete_model(request, other)
+        self.assertEqual(availability_drift(), [])
+
+
+class ReserveSlotConcurrencyTests(BookingTestData, TransactionTestCase):
+    """Fires parallel reservations at one slot; exactly one may win."""
+    workers = 8
+
+    def setUp(self):
+        self.create_fixtures()
+        self.slot = Slot.objects.create(
+            date=date.today() + timedelta(days=3), time=time(19), location=self.location, sport=self.sport
+        )
+        rebuild_availability()
+
+    @skipUnlessDBFeature("has_select_for_update")  # needs a server database with row-level locking
+    def test_parallel_claims_produce_a_single_booking(self):
+        barrier = threading.Barrier(self.workers)
+        outcomes = []
+
+        def attempt():
+            try:
+                barrier.wait()
+                slot = Slot.objects.get(pk=self.slot.pk)
+                reserve_slot(self.user, slot)
+                outcomes.append("booked")
+            except SlotUnavailable:
+                outcomes.append("conflict")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes.count("booked"), 1)
+        self.assertEqual(outcomes.count("conflict"), self.workers - 1)
+        self.assertEqual(Booking.objects.filter(slot=self.slot).count(), 1)
+        self.assertEqual(availability_drift(), [])
+
+    def test_conflict_leaves_no_booking_behind(self):
+        reserve_slot(self.user, self.slot)
+        with self.assertRaises(SlotUnavailable):
+            reserve_slot(self.user, Slot.objects.get(pk=self.slot.pk))
+        self.assertEqual(Booking.objects.filter(slot=self.slot).count(), 1)
+
+
+class SlotHoldTests(BookingTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.slot = Slot.objects.create(
+            date=date.today() + timedelta(days=4), time=time(10), location=cls.location, sport=cls.sport
+        )
+        rebuild_availability()
+
+    def test_expired_hold_is_released(self):
+        booking = reserve_slot(self.user, self.slot, hold=True)
+        self.assertIsNotNone(booking.hold_token)
+
+        released = release_expired_holds(now=booking.hold_expires_at + timedelta(seconds=1))
+
+        self.assertEqual(released, 1)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, "Cancelled")
+        self.assertFalse(Slot.objects.get(pk=self.slot.pk).is_booked)
+        self.assertEqual(availability_drift(), [])
+
+    def test_confirmed_hold_survives_the_sweeper(self):
+        booking = reserve_slot(self.user, self.slot, hold=True)
+        self.assertTrue(confirm_hold(booking))
+
+        self.assertEqual(release_expired_holds(now=timezone.now() + timedelta(days=1)), 0)
+        self.assertTrue(Slot.objects.get(pk=self.slot.pk).is_booked)
+
+
+class GenerateSlotsTests(BookingTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.sport.peak_hours_start, cls.sport.peak_hours_end = time(18), time(22)
+        cls.sport.save()
+        cls.start = date.today() + timedelta(days=7)
+        cls.end = cls.start + timedelta(days=13)
+        for slot_time in (time(9), time(19)):
+            SlotTemplate.objects.create(
+                location=cls.location, sport=cls.sport, weekday=cls.start.weekday(), time=slot_time
+            )
+
+    def test_generates_tagged_slots_and_is_idempotent(self):
+        self.assertEqual(generate_slots(self.start, self.end), 4)
+        self.assertEqual(generate_slots(self.start, self.end), 0)
+
+        slots = Slot.objects.filter(location=self.location, sport=self.sport)
+        self.assertEqual(slots.filter(slot_type="Peak").count(), 2)
+        self.assertEqual(set(slots.values_list("time", flat=True)), {time(9), time(19)})
+        self.assertEqual(availability_drift(), [])
+
+
+class SlotFeedTests(BookingTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.day = date.today() + timedelta(days=5)
+        cls.inside = Slot.objects.create(date=cls.day, time=time(8), location=cls.location, sport=cls.sport)
+        Slot.objects.create(date=cls.day + timedelta(days=40), time=time(8), location=cls.location, sport=cls.sport)
+
+    def test_streams_only_the_requested_window(self):
+        response = self.client.get(reverse("get_slot_data"), {
+            "start": f"{self.day.isoformat()}T00:00:00-05:00",
+            "end": (self.day + timedelta(days=1)).isoformat(),
+        })
+        events = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(events, [{
+            "title": "Denton Downtown - Badminton",
+            "start": self.day.isoformat(),
+            "url": f"/bookings/admin/slots/update/{self.inside.slot_id}/",
+        }])
+
+    def test_unchanged_slots_answer_not_modified(self):
+        response = self.client.get(reverse("get_slot_data"))
+        self.assertIn("Last-Modified", response)
+        response = self.client.get(reverse("get_slot_data"), HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_deleting_the_only_slot_of_a_day_changes_the_window(self):
+        Slot.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        window = {"start": self.day.isoformat(), "end": (self.day + timedelta(days=1)).isoformat()}
+        last_modified = self.client.get(reverse("get_slot_data"), window)["Last-Modified"]
+
+        later = timezone.now() + timedelta(minutes=1)
+        with mock.patch("bookings.calendar_cache.timezone.now", return_value=later), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.inside.delete()
+            refresh_slot_keys(self.inside)
+
+        response = self.client.get(reverse("get_slot_data"), window, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), [])
+
+
+class AdminListingTests(BookingTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.day = date.today() + timedelta(days=2)
+        cls.slots = [
+            Slot.objects.create(date=cls.day, time=time(hour), location=cls.location, sport=cls.sport)
+            for hour in range(6, 18)
+        ]
+        for slot in cls.slots[:8]:
+            reserve_slot(cls.user, slot, status="Booked")
+
+    def test_booking_page_costs_two_queries_however_many_rows(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("admin_list_bookings"))
+        self.assertEqual(len(response.context["bookings"]), 8)
+
+    def test_slot_page_costs_two_queries_however_many_rows(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("admin_list_slots"), {"status": "available"})
+        self.assertEqual(len(response.context["slots"]), 4)
+
+    def test_keyset_pages_walk_every_row_once(self):
+        url = reverse("admin_list_slots")
+        first = self.client.get(url, {"per_page": 5}).context
+        second = self.client.get(url, {"per_page": 5, "after": first["next_after"]}).context
+        back = self.client.get(url, {"per_page": 5, "before": second["prev_before"]}).context
+
+        ids = [slot.slot_id for slot in first["slots"]] + [slot.slot_id for slot in second["slots"]]
+        self.assertEqual(ids, sorted((slot.slot_id for slot in self.slots), reverse=True)[:10])
+        self.assertIsNone(first["prev_before"])
+        self.assertEqual([slot.slot_id for slot in back["slots"]], ids[:5])
+
+
+class CalendarCacheTests(BookingTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.day = date.today() + timedelta(days=1)
+        cls.slot = Slot.objects.create(date=cls.day, time=time(20), location=cls.location, sport=cls.sport)
+        rebuild_availability()
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("choose_date", args=[self.location.pk, self.sport.pk])
+        self.params = {"year": self.day.year, "month": self.day.month}
+
+    def test_repeat_view_skips_the_availability_query(self):
+        self.client.get(self.url, self.params)
+        # Only the location and sport lookups remain on a cache hit.
+        with self.assertNumQueries(2):
+            self.client.get(self.url, self.params)
+        stats = self.client.get(reverse("calendar_cache_status")).json()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_booking_invalidates_the_cached_month(self):
+        self.client.get(self.url, self.params)
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_slot(self.user, self.slot)
+        response = self.client.get(self.url, self.params)
+        self.assertNotContains(response, 'data-free="1"')
+        self.assertEqual(calendar_cache_stats()["misses"], 2)
+
+
+class BookingCartTests(BookingTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.day = date.today() + timedelta(days=3)
+        cls.slots = [
+            Slot.objects.create(
+                date=cls.day, time=time(hour), location=cls.location, sport=cls.sport,
+                slot_type="Peak" if hour == 18 else "Non-Peak",
+            )
+            for hour in (16, 17, 18)
+        ]
+        rebuild_availability()
+
+    def test_claims_every_slot_and_prices_them_in_one_cart(self):
+        cart = reserve_slots(self.user, [slot.pk for slot in self.slots])
+
+        bookings = list(cart.bookings.order_by("time_slot"))
+        self.assertEqual([booking.slot_id for booking in bookings], [slot.pk for slot in self.slots])
+        self.assertTrue(all(booking.is_held for booking in bookings))
+        self.assertEqual(cart.total_amount, Decimal("70.00"))
+        self.assertEqual(Slot.objects.filter(pk__in=[slot.pk for slot in self.slots], is_booked=True).count(), 3)
+        self.assertEqual(availability_drift(), [])
+
+    def test_one_taken_slot_rolls_back_the_whole_cart(self):
+        reserve_slot(self.user, self.slots[1])
+
+        with self.assertRaises(SlotsUnavailable) as raised:
+            reserve_slots(self.user, [slot.pk for slot in self.slots])
+
+        self.assertEqual(raised.exception.slot_ids, [self.slots[1].pk])
+        self.assertFalse(BookingCart.objects.exists())
+        self.assertEqual(Slot.objects.filter(is_booked=True).count(), 1)
+
+    def test_confirm_cart_runs_once(self):
+        cart = reserve_slots(self.user, [slot.pk for slot in self.slots[:2]])
+
+        self.assertEqual(confirm_cart(cart), [])
+        self.assertIsNone(confirm_cart(cart))
+        self.assertFalse(cart.bookings.filter(hold_expires_at__isnull=False).exists())
+
+
+class BookingSeriesTests(BookingTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.dates = series_dates(date.today() + timedelta(days=1), 2, 4)
+        cls.slots = {
+            day: Slot.objects.create(date=day, time=time(19), location=cls.location, sport=cls.sport)
+            for day in cls.dates[:3]  # the fourth week has no slot
+        }
+        rebuild_availability()
+
+    def plan(self, **kwargs):
+        return plan_series(self.location.pk, self.sport.pk, 2, time(19), 4, self.dates[0], **kwargs)
+
+    def test_plans_the_whole_series_in_one_query(self):
+        reserve_slot(self.user, self.slots[self.dates[1]])
+
+        with self.assertNumQueries(1):
+            free, conflicts = self.plan()
+
+        self.assertEqual([slot.date for slot in free], [self.dates[0], self.dates[2]])
+        self.assertEqual(conflicts, {self.dates[1]: "booked", self.dates[3]: "no slot"})
+
+    def test_reserves_free_occurrences_and_cancels_them_in_bulk(self):
+        series, cart, conflicts = reserve_series(
+            self.user, self.location.pk, self.sport.pk, 2, time(19), 4, self.dates[0]
+        )
+        self.assertEqual(set(conflicts), {self.dates[3]})
+        self.assertEqual(series.bookings.count(), 3)
+        self.assertEqual(cart.bookings.count(), 3)
+
+        self.assertEqual(cancel_series(series), 3)
+        self.assertFalse(Slot.objects.filter(is_booked=True).exists())
+        self.assertEqual(BookingCart.objects.get().status, "Cancelled")
+        self.assertEqual(availability_drift(), [])
+
+
+@override_settings(WAITLIST_PROMOTE_ASYNC=False)
+class WaitlistTests(BookingTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+        cls.slot = Slot.objects.create(
+            date=date.today() + timedelta(days=1), time=time(18), slot_type="Peak",
+            location=cls.location, sport=cls.sport,
+        )
+        rebuild_availability()
+        cls.booking = reserve_slot(cls.user, cls.slot, status="Booked")
+        cls.first, cls.second = (
+            User.objects.create_user(
+                username=name, emailid=f"{name}@example.com", firstname=name, lastname="Waiting",
+                password="password123", gender="Male",
+            )
+            for name in ("first", "second")
+        )
+
+    def test_cancellation_promotes_the_head_of_the_queue(self):
+        join_waitlist(self.first, self.slot)
+        join_waitlist(self.second, self.slot)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_reservation(self.booking)
+            schedule_promotion(self.slot.pk)
+
+        promoted = Booking.objects.exclude(pk=self.booking.pk).get()
+        self.assertEqual(promoted.user, self.first)
+        self.assertTrue(promoted.is_held)
+        self.assertTrue(self.first.notifications.filter(subject="A waitlisted slot is now yours").exists())
+        self.assertEqual(WaitlistEntry.objects.get(user=self.second).status, "Waiting")
+        self.assertEqual(availability_drift(), [])
+
+    def test_catch_up_skips_slots_that_are_still_booked(self):
+        join_waitlist(self.first, self.slot)
+        self.assertEqual(promote_waiting(), 0)
+
+        Booking.objects.filter(pk=self.booking.pk).update(status="Cancelled")
+        free_slots([self.slot.pk])
+        self.assertEqual(promote_waiting(), 1)
@@ -6,6 +6,10 @@ urlpatterns = [
     path("choose-date/<int:location_id>/<int:sport_id>/", views.choose_date, name="choose_date"),
     path("slots/<int:location_id>/<int:sport_id>/<date>/", views.list_slots, name="list_slots"),
     path("confirm/<int:slot_id>/", views.confirm_booking, name="confirm_booking"),
+    path("cart/confirm/", views.confirm_cart, name="confirm_cart"),
+    path("waitlist/<int:slot_id>/", views.join_slot_waitlist, name="join_slot_waitlist"),
+    path("series/<int:location_id>/<int:sport_id>/", views.book_series, name="book_series"),
+    path("series/<int:series_id>/cancel/", views.cancel_booking_series, name="cancel_booking_series"),
     path("booking-success/", views.booking_success, name="booking_success"),
     path("my-bookings/", views.my_bookings, name="my_bookings"),
     path("booking/<int:booking_id>/", views.booking_detail, name="booking_detail"),
@@ -29,6 +33,7 @@ urlpatterns = [
     path('admin/slots/delete/<int:slot_id>/', views.admin_delete_slot, name='admin_delete_slot'),
     path("admin/slot_calendar/", views.admin_slot_calendar, name="admin_slot_calendar"),
     path("get_slot_data/", views.get_slot_data, name="get_slot_data"),
+    path("admin/calendar-cache/", views.calendar_cache_status, name="calendar_cache_status"),
 ]
 
 
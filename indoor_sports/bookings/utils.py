@@ -1,7 +1,12 @@
 from calendar import HTMLCalendar
-from datetime import date
+
 
 class AvailabilityHTMLCalendar(HTMLCalendar):
+    """
+    Renders a month as an HTML table where each day links to its slot list.
+    `availability` maps "YYYY-MM-DD" to {"free": int, "total": int} as returned by
+    bookings.availability.month_availability.
+    """
     def __init__(self, availability, location_id, sport_id):
         super().__init__()
         self.availability = availability
@@ -11,15 +16,21 @@ class AvailabilityHTMLCalendar(HTMLCalendar):
     def formatday(self, day, weekday):
         """ Format a day inside the calendar table """
         if day == 0:
-            return '<td class="noday"></td>'  # Empty cell
+            return '<td class="noday">&nbsp;</td>'  # Empty cell
 
         day_str = f"{self.year}-{self.month:02d}-{day:02d}"
-        available = self.availability.get(day_str, False)
+        counts = self.availability.get(day_str) or {"free": 0, "total": 0}
+        free, total = counts["free"], counts["total"]
 
-        if available:
-            return f'<td class="available" data-date="{day_str}"><a href="#" onclick="selectDate(\'{day_str}\')">{day}</a></td>'
-        else:
-            return f'<td class="unavailable">{day}</td>'
+        if free:
+            return (
+                f'<td class="available" data-date="{day_str}" data-free="{free}" data-total="{total}" '
+                f'title="{free} of {total} slots free">'
+                f'<a href="/bookings/slots/{self.location_id}/{self.sport_id}/{day_str}/">{day}</a>'
+                f'<small class="d-block slot-count">{free} free</small>'
+                f'</td>'
+            )
+        return f'<td class="unavailable">{day}</td>'
 
     def formatmonth(self, year, month, withyear=True):
         """ Override formatmonth to properly set the year and month """
@@ -27,3 +38,30 @@ class AvailabilityHTMLCalendar(HTMLCalendar):
         self.month = month
         return super().formatmonth(year, month, withyear)
 
+
+def keyset_page(queryset, key, after=None, before=None, per_page=50):
+    """
+    Keyset (seek) pagination on a unique integer column, newest first.
+
+    Pages are addressed by the `key` value of their edge rows instead of an OFFSET,
+    so every page costs one indexed range scan however deep it is. Returns
+    (rows, next_after, prev_before); a cursor is None when there is no such page.
+    """
+    if before is not None:
+        rows = list(queryset.filter(**{f"{key}__gt": before}).order_by(key)[:per_page + 1])
+        has_newer = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_older = True
+    else:
+        if after is not None:
+            queryset = queryset.filter(**{f"{key}__lt": after})
+        rows = list(queryset.order_by(f"-{key}")[:per_page + 1])
+        has_older = len(rows) > per_page
+        rows = rows[:per_page]
+        has_newer = after is not None
+
+    if not rows:
+        return rows, None, None
+    next_after = getattr(rows[-1], key) if has_older else None
+    prev_before = getattr(rows[0], key) if has_newer else None
+    return rows, next_after, prev_before
@@ -1,24 +1,39 @@
-import calendar
 from datetime import date, datetime
 from django.db import IntegrityError
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from .models import Slot, Booking
+from .models import Slot, Booking, BookingSeries
+from equipment.models import Equipment
 from sports.models import Location, Sport
 from bookings.models import Slot, Booking
 from bookings.forms import SlotForm
-from .utils import AvailabilityHTMLCalendar
+from .utils import AvailabilityHTMLCalendar, keyset_page
+from .availability import month_availability, day_slot_counts, refresh_slot_keys
+from .services import (
+    BookingConflict, MAX_CART_SLOTS, cancel_reservation, cancel_series, cart_line_items, plan_series, reserve_series,
+    reserve_slot, reserve_slots,
+)
+from .waitlist import join_waitlist, schedule_promotion, waitlist_position
+from payments.pricing import quote_slots, venue_now
+from memberships.discounts import active_plan_name
+from .calendar_cache import cached_calendar, calendar_cache_stats, slot_feed_changed_at
 from accounts.models import User, Admin
 from django.utils.timezone import now
 import logging
-from django.db import connection, IntegrityError
+from django.db import connection, IntegrityError, transaction
 
 from django.utils import timezone 
 
-from bookings.forms import SlotForm, BookingAdminForm, BookingAdminUpdateForm
+from bookings.forms import SlotForm, BookingAdminForm, BookingAdminUpdateForm, BookingSeriesForm
 
-from django.http import JsonResponse
+import json
+from urllib.parse import urlencode
+from django.db.models import Max
+from django.urls import reverse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import condition
 
 
 
@@ -45,7 +60,7 @@ def choose_sport(request, location_id):
         if sport_id:
             logger.info("Sport %s chosen at location %s by user %s", sport_id, location.name, request.user.username)
 
-            current_time = datetime.now().time()  # Use server's current time in the right timezone
+            current_time = venue_now().time()  # Peak hours are venue wall-clock times
             current_price = sport.get_current_price(current_time)
 
             return render(request, sport.name + ".html", {
@@ -63,30 +78,6 @@ def choose_sport(request, location_id):
     return render(request, "choose_sport.html", {"location": location, "sports": sports})
 
 
-class AvailabilityHTMLCalendar(calendar.HTMLCalendar):
-    def __init__(self, availability, location_id, sport_id):
-        super().__init__()
-        self.availability = availability
-        self.location_id = location_id
-        self.sport_id = sport_id
-
-    def formatday(self, day, weekday):
-        if day == 0:
-            return '<td class="noday">&nbsp;</td>'
-        day_str = f"{self.year}-{self.month:02d}-{day:02d}"
-        if self.availability.get(day_str):
-            return (
-                f'<td class="available" data-date="{day_str}">'
-                f'<a href="/bookings/slots/{self.location_id}/{self.sport_id}/{day_str}/">{day}</a>'
-                f'</td>'
-            )
-        return f'<td class="unavailable">{day}</td>'
-
-    def formatmonth(self, theyear, themonth, withyear=True):
-        self.year, self.month = theyear, themonth
-        return super().formatmonth(theyear, themonth, withyear)
-
-
 def choose_date(request, location_id, sport_id):
     """Displays a calendar for users to choose a booking date. Only present and future dates are available."""
     location = get_object_or_404(Location, pk=location_id)
@@ -110,24 +101,11 @@ def choose_date(request, location_id, sport_id):
     except (ValueError, TypeError):
         year, month = today.year, today.month
 
-    availability = {}
-    _, num_days = calendar.monthrange(year, month)
-
-    for day in range(1, num_days + 1):
-        current_date = date(year, month, day)
-        if current_date >= today:
-            day_str = current_date.strftime("%Y-%m-%d")
-            slots_available = Slot.objects.filter(
-                date=current_date, location=location, sport=sport, is_booked=False
-            ).exists()
-            availability[day_str] = slots_available
-        else:
-            availability[current_date.strftime("%Y-%m-%d")] = False
-
-    logger.info("Availability Data for %d-%02d: %s", year, month, availability)
+    def render_calendar():
+        availability = month_availability(location.pk, sport.pk, year, month, today=today)
+        return AvailabilityHTMLCalendar(availability, location.pk, sport.pk).formatmonth(year, month)
 
-    cal = AvailabilityHTMLCalendar(availability, location_id, sport_id)
-    calendar_html = cal.formatmonth(year, month)
+    calendar_html = cached_calendar(location.pk, sport.pk, year, month, today, render_calendar)
 
     context = {
         "calendar_html": calendar_html,
@@ -161,43 +139,59 @@ def list_slots(request, location_id, sport_id, date):
     current_date = current_datetime.date()
     current_time = current_datetime.time()
 
+    # Skip the slot scan entirely when the summary table says the day has no slots at all
+    _, total_count = day_slot_counts(location.pk, sport.pk, selected_date)
+    if selected_date >= current_date and not total_count:
+        messages.info(request, f"No slots available on {selected_date}. Please choose another date.")
+        return redirect("choose_date", location_id=location_id, sport_id=sport_id)
+
     # Filter slots to exclude past times for today
     if selected_date > current_date:
-        # For future dates, show all available slots (no time restriction)
-        slots = Slot.objects.filter(
+        # For future dates, show all slots (no time restriction)
+        day_slots = Slot.objects.filter(
             date=selected_date,
             location=location,
             sport=sport,
-            is_booked=False
         )
     elif selected_date == current_date:
         # For the current date, only show slots with time greater than or equal to the current time (e.g., 6:00 PM)
-        slots = Slot.objects.filter(
+        day_slots = Slot.objects.filter(
             date=selected_date,
             location=location,
             sport=sport,
-            is_booked=False,
             time__gte=current_time  # Exclude past times for today
         )
     else:
         # For past dates, no slots should be displayed
-        slots = Slot.objects.none()
+        day_slots = Slot.objects.none()
+
+    # Free slots can be booked; booked ones can be waitlisted
+    day_slots = list(day_slots.select_related("sport").order_by("time"))
+    prices = quote_slots(day_slots, active_plan_name(request.user, request))
+    for slot in day_slots:
+        slot.price = prices[slot.pk]
+    slots = [slot for slot in day_slots if not slot.is_booked]
+    full_slots = [slot for slot in day_slots if slot.is_booked]
 
     # Redirect if no slots are available
-    if not slots.exists():
+    if not day_slots:
         messages.info(request, f"No slots available on {selected_date}. Please choose another date.")
         return redirect("choose_date", location_id=location_id, sport_id=sport_id)
 
     if request.method == "POST":
-        slot_id = request.POST.get("slot")
-        if slot_id:
+        slot_ids = request.POST.getlist("slot")
+        if len(slot_ids) == 1:
             # Redirect to confirm_booking with the selected slot_id
-            return redirect("confirm_booking", slot_id=slot_id)
+            return redirect("confirm_booking", slot_id=slot_ids[0])
+        elif slot_ids:
+            # Several slots go through the cart so they are booked and paid for together
+            return redirect(reverse("confirm_cart") + "?" + urlencode({"slot": slot_ids}, doseq=True))
         else:
             messages.error(request, "Please select a slot.")
 
     context = {
         "slots": slots,
+        "full_slots": full_slots,
         "date": selected_date,
         "location": location,
         "sport": sport,
@@ -234,20 +228,12 @@ def confirm_booking(request, slot_id):
 
     # Process POST request for confirming booking
     if request.method == "POST":
-        # Create the booking, ensuring the booking date matches the slot's date
-        booking = Booking.objects.create(
-            user=request.user,
-            sport=slot.sport,
-            slot=slot,
-            location=slot.location,
-            status="Pending",
-            time_slot=slot_time,  # Set the booking's time from slot's time
-            date=slot_date,       # Set the booking's date from slot's date
-        )
-
-        # Mark the slot as booked
-        slot.is_booked = True
-        slot.save()
+        # Claim the slot and create the booking; the booking's date and time come from the slot
+        try:
+            booking = reserve_slot(request.user, slot, status="Pending", hold=True)
+        except BookingConflict:
+            messages.error(request, "This slot is no longer available. Please select another slot.")
+            return redirect("choose_date", location_id=slot.location_id, sport_id=slot.sport_id)
 
         # Redirect to the payment page before finalizing booking
         return redirect("payments_page", booking_id=booking.booking_id)
@@ -261,6 +247,124 @@ def confirm_booking(request, slot_id):
 
 
 
+@login_required
+def confirm_cart(request):
+    """
+    Confirms several slots (and optional equipment) as one cart: they are claimed
+    together and paid for with a single checkout.
+    """
+    slot_ids = [slot_id for slot_id in request.GET.getlist("slot") if slot_id.isdigit()]
+    slots = list(
+        Slot.objects.select_related("sport", "location")
+        .filter(pk__in=slot_ids, is_booked=False)
+        .order_by("date", "time")
+    )
+    if not slots or len(slots) != len(set(slot_ids)):
+        messages.error(request, "Some of the selected slots are no longer available. Please select again.")
+        return redirect("choose_location")
+    if len(slots) > MAX_CART_SLOTS:
+        messages.error(request, f"You can book at most {MAX_CART_SLOTS} slots at once.")
+        return redirect("choose_date", location_id=slots[0].location_id, sport_id=slots[0].sport_id)
+
+    location = slots[0].location
+    equipment_list = Equipment.objects.filter(location=location, quantity__gt=0)
+    equipment, quantity = None, None
+
+    if request.method == "POST":
+        equipment_id = request.POST.get("equipment")
+        if equipment_id:
+            equipment = get_object_or_404(equipment_list, pk=equipment_id)
+            try:
+                quantity = max(1, int(request.POST.get("quantity") or 1))
+            except ValueError:
+                messages.error(request, "Please enter a valid equipment quantity.")
+                return redirect(request.get_full_path())
+        try:
+            cart = reserve_slots(request.user, [slot.pk for slot in slots], equipment, quantity)
+        except BookingConflict as exc:
+            messages.error(request, f"{exc} Please select other slots.")
+            return redirect("choose_date", location_id=location.pk, sport_id=slots[0].sport_id)
+        logger.info("User %s reserved cart %s with %d slots", request.user.username, cart.pk, len(slots))
+        return redirect("cart_checkout", cart_id=cart.pk)
+
+    line_items, total = cart_line_items(slots, plan_name=active_plan_name(request.user, request))
+    return render(request, "confirm_cart.html", {
+        "slots": slots,
+        "location": location,
+        "line_items": line_items,
+        "total": total,
+        "equipment_list": equipment_list,
+    })
+
+
+@login_required
+def join_slot_waitlist(request, slot_id):
+    """Queues the user for a booked slot; they get a hold on it if it is cancelled."""
+    slot = get_object_or_404(Slot, pk=slot_id)
+    if request.method == "POST":
+        if not slot.is_booked:
+            messages.info(request, "This slot is free again - you can book it right away.")
+        else:
+            entry, created = join_waitlist(request.user, slot)
+            position = waitlist_position(entry)
+            if created:
+                messages.success(request, f"You joined the waitlist at position {position}. We will notify you if the slot opens up.")
+            else:
+                messages.info(request, f"You are already on the waitlist at position {position}.")
+    return redirect("list_slots", location_id=slot.location_id, sport_id=slot.sport_id, date=slot.date.isoformat())
+
+
+@login_required
+def book_series(request, location_id, sport_id):
+    """
+    Books the same weekday and time for several weeks. "Check availability" lists the
+    conflicts of the whole series at once; "Book series" holds every free occurrence
+    and sends the user to a single checkout.
+    """
+    location = get_object_or_404(Location, pk=location_id)
+    sport = get_object_or_404(Sport, pk=sport_id, location=location)
+    form = BookingSeriesForm(request.POST or None)
+    free, conflicts = None, None
+
+    if request.method == "POST" and form.is_valid():
+        rule = form.cleaned_data
+        if request.POST.get("action") == "reserve":
+            try:
+                series, cart, conflicts = reserve_series(
+                    request.user, location.pk, sport.pk, rule["weekday"], rule["time"],
+                    rule["occurrences"], rule["start_date"],
+                )
+            except BookingConflict as exc:
+                messages.error(request, str(exc))
+            else:
+                if conflicts:
+                    messages.warning(request, f"{len(conflicts)} occurrence(s) could not be booked and were skipped.")
+                logger.info("User %s reserved series %s (%d bookings)", request.user.username, series.pk, cart.bookings.count())
+                return redirect("cart_checkout", cart_id=cart.pk)
+        free, conflicts = plan_series(
+            location.pk, sport.pk, rule["weekday"], rule["time"], rule["occurrences"], rule["start_date"]
+        )
+
+    return render(request, "book_series.html", {
+        "form": form,
+        "location": location,
+        "sport": sport,
+        "free": free,
+        "conflicts": sorted(conflicts.items()) if conflicts else [],
+    })
+
+
+@login_required
+def cancel_booking_series(request, series_id):
+    """Cancels every upcoming booking of one of the user's series."""
+    series = get_object_or_404(BookingSeries, series_id=series_id, user=request.user)
+    if request.method == "POST":
+        cancelled = cancel_series(series)
+        messages.success(request, f"Series cancelled: {cancelled} upcoming booking(s) released.")
+        logger.info("User %s cancelled series %s (%d bookings)", request.user.username, series.pk, cancelled)
+    return redirect("my_bookings")
+
+
 def booking_success(request):
     # Get the latest booking for the user
     booking = Booking.objects.filter(user=request.user).last()
@@ -272,7 +376,7 @@ def booking_success(request):
     return render(request, "booking_success.html", {"booking": booking})
 @login_required
 def my_bookings(request):
-    bookings = Booking.objects.filter(user=request.user).order_by('-booking_date')
+    bookings = Booking.objects.filter(user=request.user).select_related("sport", "slot", "series").order_by('-booking_date')
     logger.info("User %s accessed their bookings. Total: %d", request.user.username, bookings.count())
     return render(request, "my_bookings.html", {"bookings": bookings})
 
@@ -295,12 +399,9 @@ def cancel_booking(request, booking_id):
 
     if request.method == "POST":
         if booking.status.lower() in ["booked", "Booked"]:  # Ensure status check works regardless of case
-            booking.status = "Cancelled"
-            booking.cancellation_time = now()  # Record cancellation timestamp
-            booking.save()
-
-            booking.slot.is_booked = False  # Free up the slot
-            booking.slot.save()
+            with transaction.atomic():
+                cancel_reservation(booking)
+                schedule_promotion(booking.slot_id)  # Offer the freed slot to the waitlist
 
             messages.success(request, "Your booking has been cancelled.")
             logger.info("User %s cancelled booking ID %s", request.user.username, booking_id)
@@ -324,7 +425,9 @@ def add_slot(request):
             slot = form.save(commit=False)
             # Ensure is_booked is set to False by default
             slot.is_booked = False
-            slot.save()
+            with transaction.atomic():
+                slot.save()
+                refresh_slot_keys(slot)
             messages.success(request, "Slot added successfully!")
             logger.info("Slot id %s added by admin %s", slot.pk, request.user.username)
             # Redirect to a custom list page for slots if you have one,
@@ -356,22 +459,96 @@ def admin_dashboard(request):
         },
     )
 
+ADMIN_LIST_PAGE_SIZE = 50
+ADMIN_LIST_MAX_PAGE_SIZE = 200
+
+
+def _int_param(request, name):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def _admin_list_filters(request):
+    """Reads the status/date/location filters shared by the admin booking and slot lists."""
+    filters = {
+        "status": request.GET.get("status", ""),
+        "date": parse_date(request.GET.get("date", "")),
+        "location": _int_param(request, "location"),
+    }
+    per_page = _int_param(request, "per_page") or ADMIN_LIST_PAGE_SIZE
+    return filters, max(1, min(per_page, ADMIN_LIST_MAX_PAGE_SIZE))
+
+
+def _admin_list_context(request, rows, key, filters, per_page, next_after, prev_before):
+    query = request.GET.copy()
+    for cursor in ("after", "before"):
+        query.pop(cursor, None)
+    return {
+        key: rows,
+        "filters": filters,
+        "per_page": per_page,
+        "next_after": next_after,
+        "prev_before": prev_before,
+        "filter_query": query.urlencode(),
+        "locations": Location.objects.only("location_id", "name"),
+    }
+
+
 def admin_list_bookings(request):
-    """Displays a list of all bookings for admins."""
-    bookings = Booking.objects.all()
-    return render(request, "admin_list_bookings.html", {"bookings": bookings})
+    """Displays bookings for admins, newest first, one keyset page at a time with optional filters."""
+    filters, per_page = _admin_list_filters(request)
+    bookings = Booking.objects.select_related(
+        "user", "sport", "slot__location", "equipment", "location"
+    ).only(
+        "booking_id", "status", "quantity", "date", "time_slot",
+        "user__username", "sport__name", "equipment__name", "location__name",
+        "slot__date", "slot__time", "slot__slot_type", "slot__location__name",
+    )
+    if filters["status"]:
+        bookings = bookings.filter(status__iexact=filters["status"])
+    if filters["date"]:
+        bookings = bookings.filter(date=filters["date"])
+    if filters["location"]:
+        bookings = bookings.filter(location_id=filters["location"])
+
+    rows, next_after, prev_before = keyset_page(
+        bookings, "booking_id", _int_param(request, "after"), _int_param(request, "before"), per_page
+    )
+    context = _admin_list_context(request, rows, "bookings", filters, per_page, next_after, prev_before)
+    context["status_choices"] = Booking.STATUS_CHOICES
+    return render(request, "admin_list_bookings.html", context)
 
 def admin_list_slots(request):
-    """Displays a list of all slots for admins."""
-    slots = Slot.objects.all()
-    return render(request, "admin_list_slots.html", {"slots": slots})
+    """Displays slots for admins, newest first, one keyset page at a time with optional filters."""
+    filters, per_page = _admin_list_filters(request)
+    slots = Slot.objects.select_related("location", "sport").only(
+        "slot_id", "date", "time", "slot_type", "is_booked", "location__name", "sport__name"
+    )
+    if filters["status"] == "booked":
+        slots = slots.filter(is_booked=True)
+    elif filters["status"] == "available":
+        slots = slots.filter(is_booked=False)
+    if filters["date"]:
+        slots = slots.filter(date=filters["date"])
+    if filters["location"]:
+        slots = slots.filter(location_id=filters["location"])
+
+    rows, next_after, prev_before = keyset_page(
+        slots, "slot_id", _int_param(request, "after"), _int_param(request, "before"), per_page
+    )
+    context = _admin_list_context(request, rows, "slots", filters, per_page, next_after, prev_before)
+    return render(request, "admin_list_slots.html", context)
 
 def admin_add_slot(request):
     """Allows admins to add new slots."""
     if request.method == "POST":
         form = SlotForm(request.POST)
         if form.is_valid():
-            slot = form.save()
+            with transaction.atomic():
+                slot = form.save()
+                refresh_slot_keys(slot)
             return redirect("admin_list_slots")
     else:
         form = SlotForm()
@@ -381,9 +558,12 @@ def admin_update_slot(request, slot_id):
     """Allows admins to update slot details."""
     slot = get_object_or_404(Slot, slot_id=slot_id)
     if request.method == "POST":
+        previous = Slot(location_id=slot.location_id, sport_id=slot.sport_id, date=slot.date)
         form = SlotForm(request.POST, instance=slot)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                refresh_slot_keys(previous, slot)
             return redirect("admin_list_slots")
     else:
         form = SlotForm(instance=slot)
@@ -397,10 +577,11 @@ def approve_booking(request, booking_id):
     return redirect("admin_list_bookings")
 
 def admin_cancel_booking(request, booking_id):
-    """Allows admins to cancel bookings."""
-    booking = Booking.objects.get(pk=booking_id)
-    booking.status = "Cancelled"
-    booking.save()
+    """Allows admins to cancel bookings; the freed slot is offered to its waitlist."""
+    booking = get_object_or_404(Booking, pk=booking_id)
+    with transaction.atomic():
+        if cancel_reservation(booking):
+            schedule_promotion(booking.slot_id)
     return redirect("admin_list_bookings")
 
 # def admin_add_booking(request):
@@ -468,7 +649,9 @@ def admin_delete_slot(request, slot_id):
 
     if request.method == 'POST':
         # Allow deletion regardless of bookings
-        slot.delete()
+        with transaction.atomic():
+            slot.delete()
+            refresh_slot_keys(slot)
         messages.success(request, f"Slot {slot_id} deleted successfully, even if it was booked.")
         return redirect('admin_list_slots')  # Adjust this route name if needed
 
@@ -518,17 +701,64 @@ def admin_slot_calendar(request):
         {"selected_date": selected_date, "slots": slots},
     )
 
-def get_slot_data(request):
-    """Returns slot data in JSON format for FullCalendar."""
+def _slot_feed_window(request):
+    """
+    The [start, end) window FullCalendar sends with every fetch. Both parameters are
+    ISO dates or datetimes; only the date part is used.
+    """
+    return parse_date((request.GET.get("start") or "")[:10]), parse_date((request.GET.get("end") or "")[:10])
+
+
+def _slot_feed_queryset(request):
+    """Slots inside the requested window."""
     slots = Slot.objects.all()
-    data = [
-    {
-        "title": f"{slot.location} - {slot.sport}",
-        "start": slot.date.isoformat(),
-        "url": f"/bookings/admin/slots/update/{slot.slot_id}/",  # Replace with your custom URL
-    }
-    for slot in slots
-    ]
-    return JsonResponse(data, safe=False)
+    start, end = _slot_feed_window(request)
+    if start:
+        slots = slots.filter(date__gte=start)
+    if end:
+        slots = slots.filter(date__lt=end)
+    return slots
+
+
+def slot_data_last_modified(request):
+    """
+    Latest write to a slot in the requested window. A deleted slot leaves no row
+    behind, so the feed stamps of the window's months (bumped whenever a day's
+    slots are recounted) are included too.
+    """
+    slot_stamp = _slot_feed_queryset(request).aggregate(stamp=Max("updated_at"))["stamp"]
+    feed_stamp = slot_feed_changed_at(*_slot_feed_window(request))
+    stamps = [stamp for stamp in (slot_stamp, feed_stamp) if stamp is not None]
+    return max(stamps) if stamps else None
+
+
+@condition(last_modified_func=slot_data_last_modified)
+def get_slot_data(request):
+    """Streams slot data in JSON format for FullCalendar, limited to the requested start/end window."""
+    rows = (
+        _slot_feed_queryset(request)
+        .order_by("date", "time")
+        .values_list("slot_id", "date", "location__name", "sport__name")
+        .iterator(chunk_size=2000)
+    )
+
+    def stream():
+        yield "["
+        separator = ""
+        for slot_id, slot_date, location_name, sport_name in rows:
+            yield separator + json.dumps({
+                "title": f"{location_name} - {sport_name}",
+                "start": slot_date.isoformat(),
+                "url": f"/bookings/admin/slots/update/{slot_id}/",  # Replace with your custom URL
+            })
+            separator = ","
+        yield "]"
+
+    return StreamingHttpResponse(stream(), content_type="application/json")
+
+
+def calendar_cache_status(request):
+    """Returns the availability calendar cache hit/miss counters as JSON for monitoring."""
+    return JsonResponse(calendar_cache_stats())
 
 
@@ -0,0 +1,109 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from bookings.models import Slot, WaitlistEntry
+from bookings.services import BookingConflict, reserve_slot
+from notifications.models import Notification
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+# ------------------------------------------------------------------------------
+# Joining: one FIFO queue per slot.
+# ------------------------------------------------------------------------------
+def join_waitlist(user, slot):
+    """Queues `user` for `slot`; returns (entry, created). Joining twice keeps the original place."""
+    return WaitlistEntry.objects.get_or_create(slot=slot, user=user, status="Waiting")
+
+
+def waitlist_position(entry):
+    """1-based position of a waiting entry in its slot's queue."""
+    return WaitlistEntry.objects.filter(slot_id=entry.slot_id, status="Waiting", id__lte=entry.id).count()
+
+
+# ------------------------------------------------------------------------------
+# Promotion: the head of the queue gets a time-limited hold on the freed slot.
+# ------------------------------------------------------------------------------
+def promote_next(slot_id):
+    """
+    Promotes the oldest waiting user of a free slot into a held booking and notifies them.
+
+    The entry is locked with SKIP LOCKED, so concurrent workers never promote the same
+    user twice. Returns the new Booking, or None when the slot is taken or nobody waits.
+    """
+    with transaction.atomic():
+        entry = (
+            WaitlistEntry.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("user", "slot__sport", "slot__location")
+            .filter(slot_id=slot_id, status="Waiting")
+            .order_by("created_at", "id")
+            .first()
+        )
+        if entry is None:
+            return None
+        try:
+            booking = reserve_slot(entry.user, entry.slot, status="Booked", hold=True)
+        except BookingConflict:
+            return None
+
+        entry.status, entry.booking, entry.promoted_at = "Promoted", booking, timezone.now()
+        entry.save(update_fields=["status", "booking", "promoted_at"])
+        slot = entry.slot
+        Notification.objects.create(
+            user=entry.user,
+            notification_type="Received",
+            recipient_email=entry.user.emailid,
+            subject="A waitlisted slot is now yours",
+            message=(
+                f"The {slot.sport.name} slot at {slot.location.name} on {slot.date} at {slot.time:%H:%M} "
+                f"opened up and is held for you until {booking.hold_expires_at:%H:%M}. "
+                f"Complete payment for booking {booking.booking_id} to keep it."
+            ),
+        )
+    logger.info("Promoted waitlist entry %s into booking %s", entry.pk, booking.pk)
+    return booking
+
+
+def promote_waiting(limit=500):
+    """
+    Catch-up pass: promotes the queue head of every free slot that still has waiters,
+    e.g. slots freed by expired holds or while a background promotion failed.
+    Returns the number of bookings created.
+    """
+    slot_ids = list(
+        Slot.objects.filter(is_booked=False, date__gte=timezone.localdate(), waitlist__status="Waiting")
+        .values_list("slot_id", flat=True)
+        .distinct()[:limit]
+    )
+    return sum(1 for slot_id in slot_ids if promote_next(slot_id))
+
+
+def _promote_in_background(slot_id):
+    try:
+        promote_next(slot_id)
+    except Exception:
+        logger.exception("Waitlist promotion failed for slot %s", slot_id)
+    finally:
+        connection.close()  # worker threads hold their own connection
+
+
+def schedule_promotion(slot_id):
+    """
+    Promotes the slot's waitlist once the current transaction commits, on a background
+    thread so the cancelling request does not wait for it. With WAITLIST_PROMOTE_ASYNC
+    off the promotion runs inline after commit instead.
+    """
+    global _executor
+
+    if not settings.WAITLIST_PROMOTE_ASYNC:
+        transaction.on_commit(lambda: promote_next(slot_id))
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.WAITLIST_WORKERS, thread_name_prefix="waitlist")
+    transaction.on_commit(lambda: _executor.submit(_promote_in_background, slot_id))
@@ -16,6 +16,7 @@ from django.utils.timezone import now
 from datetime import datetime, timedelta
 from sports.models import Sport
 from bookings.models import Slot
+from bookings.services import EquipmentUnavailable, SlotUnavailable, reserve_slot
 
 # View to show equipment based on location
 @login_required
@@ -85,40 +86,19 @@ def select_equipment(request, location_id, slot_id):
                 slot = get_object_or_404(Slot, slot_id=slot_id)  # The selected slot should exist
                 quantity = int(quantity)
 
-                if equipment.quantity >= quantity:
-                    # Deduct the equipment quantity
-                    equipment.quantity -= quantity
-                    equipment.save()
-
-                    # Mark the slot as booked
-                    slot.is_booked = True
-                    slot.save()
-
-                    # Determine price based on peak hours, handle None values
-                    current_time = datetime.now().time()
-                    price = sport.price
-                    if sport.peak_hours_start and sport.peak_hours_end:
-                        if sport.peak_hours_start <= current_time <= sport.peak_hours_end:
-                            price = sport.peak_price
-
-                    total_price = price * quantity
-
-                    # Create a Booking object
-                    booking = Booking.objects.create(
-                        user=request.user,
-                        location=location,
-                        equipment=equipment,
-                        quantity=quantity,
-                        sport=sport,
-                        slot=slot,
-                        time_slot=slot.time,  # Use `time` in Slot properly
-                    )
-
-                    # Redirect to the payment page with the booking ID
-                    messages.success(request, f"Successfully booked {quantity} {equipment.name}(s)!")
-                    return redirect('process_payment', booking_id=booking.booking_id)
-                else:
-                    messages.error(request, f"Not enough stock. Only {equipment.quantity} {equipment.name}(s) available.")
+                # Claim the slot, deduct the equipment stock and create the Booking together
+                booking = reserve_slot(
+                    request.user, slot, status="Booked", equipment=equipment, quantity=quantity, hold=True
+                )
+
+                # Redirect to the payment page with the booking ID
+                messages.success(request, f"Successfully booked {quantity} {equipment.name}(s)!")
+                return redirect('process_payment', booking_id=booking.booking_id)
+            except SlotUnavailable:
+                messages.error(request, "This slot is no longer available. Please select another slot.")
+            except EquipmentUnavailable:
+                equipment.refresh_from_db(fields=["quantity"])
+                messages.error(request, f"Not enough stock. Only {equipment.quantity} {equipment.name}(s) available.")
             except Equipment.DoesNotExist:
                 messages.error(request, "Selected equipment not found.")
             except ValueError:
@@ -124,6 +124,9 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+# Batch mail (e.g. refund confirmations) is queued and delivered by send_queued_emails.
+EMAIL_QUEUE_BATCH_SIZE = int(os.getenv("EMAIL_QUEUE_BATCH_SIZE", "100"))
+EMAIL_QUEUE_MAX_ATTEMPTS = int(os.getenv("EMAIL_QUEUE_MAX_ATTEMPTS", "5"))
 
 # ========================== SESSION MANAGEMENT ========================== #
 SESSION_ENGINE = "django.contrib.sessions.backends.db"
@@ -132,6 +135,54 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 SESSION_COOKIE_SECURE = not DEBUG
 SESSION_SAVE_EVERY_REQUEST = True
 
+# ========================== SLOT HOLDS ========================== #
+# Minutes an unpaid booking keeps its slot before release_expired_holds frees it.
+SLOT_HOLD_TTL_MINUTES = int(os.getenv("SLOT_HOLD_TTL_MINUTES", "15"))
+# Waitlist promotion runs on background threads after a cancellation commits;
+# set WAITLIST_PROMOTE_ASYNC=False to promote inline (tests, single-threaded servers).
+WAITLIST_PROMOTE_ASYNC = os.getenv("WAITLIST_PROMOTE_ASYNC", "True").lower() == "true"
+WAITLIST_WORKERS = int(os.getenv("WAITLIST_WORKERS", "2"))
+
+# ========================== PRICING ========================== #
+# Slot times and sport peak hours are wall-clock times in this zone.
+VENUE_TIME_ZONE = os.getenv("VENUE_TIME_ZONE", "America/New_York")
+# Percentage off slot and equipment prices per MembershipPlan.name.
+MEMBERSHIP_DISCOUNTS = {"Silver": 5, "Gold": 10, "Platinum": 15}
+# How long a user's active membership is memoized for pricing (seconds); purchases and cancellations invalidate it.
+MEMBERSHIP_CACHE_TIMEOUT = int(os.getenv("MEMBERSHIP_CACHE_TIMEOUT", "3600"))
+
+# ========================== CACHE ========================== #
+# Per-process memory cache; point CACHES at Redis/Memcached to share rendered calendars across workers.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "indoor-sports",
+    }
+}
+# Upper bound on how long a rendered availability calendar stays cached (seconds).
+CALENDAR_CACHE_TIMEOUT = int(os.getenv("CALENDAR_CACHE_TIMEOUT", "3600"))
+
+# ========================== REPORTS ========================== #
+# Rendered report charts, one PNG per content hash of the chart's data; share the
+# directory between app servers so each chart is drawn once.
+REPORT_CHART_CACHE_DIR = Path(os.getenv("REPORT_CHART_CACHE_DIR", MEDIA_ROOT / "report_charts"))
+# Chart URLs change whenever the data does, so browsers may keep them (seconds).
+REPORT_CHART_MAX_AGE = int(os.getenv("REPORT_CHART_MAX_AGE", str(365 * 24 * 3600)))
+# Charts are drawn in a process pool of REPORT_CHART_WORKERS per web process, sized
+# apart from the web workers; at most REPORT_CHART_MAX_QUEUE charts wait at once.
+# With REPORT_CHARTS_ASYNC=False charts are drawn inline (tests, single-process servers).
+REPORT_CHARTS_ASYNC = os.getenv("REPORT_CHARTS_ASYNC", "True").lower() == "true"
+REPORT_CHART_WORKERS = int(os.getenv("REPORT_CHART_WORKERS", "2"))
+REPORT_CHART_MAX_QUEUE = int(os.getenv("REPORT_CHART_MAX_QUEUE", "64"))
+# Data exports fetch EXPORT_CHUNK_SIZE rows per database round trip and write Parquet
+# row groups of EXPORT_PARQUET_ROW_GROUP_SIZE rows (Parquet export needs pyarrow).
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+EXPORT_PARQUET_ROW_GROUP_SIZE = int(os.getenv("EXPORT_PARQUET_ROW_GROUP_SIZE", "50000"))
+# sync_booking_reports applies booking changes in transactions of REPORT_ETL_BATCH_SIZE
+# rows, skipping changes younger than REPORT_ETL_SETTLE_SECONDS (still-open transactions).
+REPORT_ETL_BATCH_SIZE = int(os.getenv("REPORT_ETL_BATCH_SIZE", "1000"))
+REPORT_ETL_SETTLE_SECONDS = int(os.getenv("REPORT_ETL_SETTLE_SECONDS", "5"))
+
 # ========================== CUSTOM USER MODEL ========================== #
 AUTH_USER_MODEL = "accounts.User"
 
@@ -141,6 +192,36 @@ STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_WEEKLY_PRICE = os.getenv("STRIPE_WEEKLY_PRICE", "price_weekly")
 STRIPE_MONTHLY_PRICE = os.getenv("STRIPE_MONTHLY_PRICE", "price_monthly")
 STRIPE_YEARLY_PRICE = os.getenv("STRIPE_YEARLY_PRICE", "price_yearly")
+# Signing secret of the Stripe webhook endpoint (payments/webhook/stripe/).
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+# Webhook events are applied on background threads after they are logged; with
+# STRIPE_EVENTS_PROCESS_ASYNC=False they are applied inline after commit instead.
+STRIPE_EVENTS_PROCESS_ASYNC = os.getenv("STRIPE_EVENTS_PROCESS_ASYNC", "True").lower() == "true"
+STRIPE_EVENT_WORKERS = int(os.getenv("STRIPE_EVENT_WORKERS", "2"))
+STRIPE_EVENT_MAX_ATTEMPTS = int(os.getenv("STRIPE_EVENT_MAX_ATTEMPTS", "5"))
+# Provider client for checkouts, payments and refunds; "payments.gateway.FakeGateway"
+# keeps everything local (tests, load tests with FAKE_GATEWAY_LATENCY_MS of simulated latency).
+PAYMENT_GATEWAY = os.getenv("PAYMENT_GATEWAY", "payments.gateway.StripeGateway")
+FAKE_GATEWAY_LATENCY_MS = int(os.getenv("FAKE_GATEWAY_LATENCY_MS", "0"))
+# Keep-alive connections to Stripe per process, shared by all request threads.
+STRIPE_POOL_SIZE = int(os.getenv("STRIPE_POOL_SIZE", "10"))
+# (connect, read) timeouts in seconds per gateway operation, so a slow Stripe call
+# cannot hold a worker for the client library's 80-second default.
+STRIPE_TIMEOUTS = {
+    "default": (3.05, 10),
+    "checkout": (3.05, 10),
+    "payment_intent": (3.05, 20),
+    "refund": (3.05, 20),
+}
+# Transient failures (timeouts, 429, 5xx) are retried up to STRIPE_MAX_RETRIES times per
+# call, but retries overall are capped at STRIPE_RETRY_BUDGET_RATIO of calls (token bucket).
+STRIPE_MAX_RETRIES = int(os.getenv("STRIPE_MAX_RETRIES", "2"))
+STRIPE_RETRY_BUDGET_RATIO = float(os.getenv("STRIPE_RETRY_BUDGET_RATIO", "0.1"))
+STRIPE_RETRY_BUDGET_MIN = 10
+STRIPE_RETRY_BUDGET_MAX = 100
+# Refund calls in flight at once during a bulk refund, and payments locked per batch.
+REFUND_WORKERS = int(os.getenv("REFUND_WORKERS", "4"))
+REFUND_BATCH_SIZE = int(os.getenv("REFUND_BATCH_SIZE", "100"))
 
 AUTHENTICATION_BACKENDS = [
     'accounts.authentication.MultiModelBackend',  # Your custom backend
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Membership
+
+REQUEST_ATTR = "_active_membership_plans"
+
+
+# ------------------------------------------------------------------------------
+# Active membership lookup for pricing: one query per user until the membership
+# changes, and at most one cache read per request.
+# ------------------------------------------------------------------------------
+def _cache_key(user_id):
+    return f"membership:active-plan:{user_id}"
+
+
+def _request_memo(request):
+    """{user_id: plan_name} memo of the current request; a throwaway dict without one."""
+    if request is None:
+        return {}
+    if not hasattr(request, REQUEST_ATTR):
+        setattr(request, REQUEST_ATTR, {})
+    return getattr(request, REQUEST_ATTR)
+
+
+def active_plan_name(user, request=None):
+    """
+    Returns the plan name of the user's active membership ("Silver", "Gold", ...) or None.
+
+    The answer is memoized on `request` per user for the rest of the request and in
+    the cache across requests; invalidate_active_plan() drops both when a membership
+    is bought or cancelled.
+    """
+    if user is None or not user.is_authenticated:
+        return None
+    memo = _request_memo(request)
+    if user.pk in memo:
+        return memo[user.pk]
+
+    today = timezone.localdate()
+    cached = cache.get(_cache_key(user.pk))
+    if cached is not None and (cached[1] is None or cached[1] >= today):
+        plan_name = cached[0]
+    else:
+        membership = (
+            Membership.objects.filter(user=user, status="Active", start_date__lte=today, end_date__gte=today)
+            .order_by("-end_date")
+            .values_list("plan__name", "end_date")
+            .first()
+        )
+        # Non-members are cached too, so the common case never queries.
+        plan_name, end_date = membership or (None, None)
+        cache.set(_cache_key(user.pk), (plan_name, end_date), timeout=settings.MEMBERSHIP_CACHE_TIMEOUT)
+
+    memo[user.pk] = plan_name
+    return plan_name
+
+
+def invalidate_active_plan(user, request=None):
+    """Forgets the memoized membership of `user` after a membership write."""
+    cache.delete(_cache_key(user.pk))
+    _request_memo(request).pop(user.pk, None)
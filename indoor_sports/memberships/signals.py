@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .discounts import invalidate_active_plan
+from .models import Membership
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def invalidate_membership_discount(sender, instance, **kwargs):
+    """
+    Drops the cached active plan of the membership's user after any write (renewals,
+    admin edits), on top of the explicit invalidation in the purchase and cancel views.
+    """
+    invalidate_active_plan(instance.user)
@@ -18,9 +18,11 @@ from accounts.models import Admin  # import your custom Admin model
 
 
 from .models import Membership, MembershipPlan
+from .discounts import invalidate_active_plan
 from .forms import MembershipForm
 from .forms import MembershipPlanForm
 from django.http import HttpResponse
+from payments.gateway import get_gateway
 from payments.models import MembershipPayment
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
@@ -145,6 +147,7 @@ def cancel_membership_view(request, membership_id):
     if request.method == 'POST':
         membership.status = 'Cancelled'
         membership.save()
+        invalidate_active_plan(request.user, request)
         return redirect('membership_dashboard')
 
     return render(request, 'membership_cancel.html', {'membership': membership})
@@ -165,204 +168,55 @@ def create_checkout_session(request, plan):
         return redirect('membership_dashboard')
 
     try:
-        session = stripe.checkout.Session.create(
+        session = get_gateway().create_checkout_session(dict(
             payment_method_types=['card'],
             line_items=[{
                 'price': stripe_price_id,
                 'quantity': 1,
             }],
             mode='subscription',
+            # Read by the webhook (payments.fulfillment), which activates the membership
+            metadata={'kind': 'membership', 'user_id': request.user.pk, 'plan': plan},
             success_url=request.build_absolute_uri(
                 reverse('subscription_payment_success', kwargs={'plan_duration': plan})
             ) + '?session_id={CHECKOUT_SESSION_ID}',
             cancel_url=request.build_absolute_uri(reverse('subscription_payment_cancel')),
-        )
+        ))
         return redirect(session.url, code=303)
     except stripe.error.StripeError as e:
         messages.error(request, f"Error: {str(e)}")
         return redirect('membership_dashboard')
 
 
-DURATION_MAPPING = {
-    'Weekly': 7,
-    'Monthly': 30,
-    'Yearly': 365,
-}
-
-
-
 @login_required
-
 def subscription_payment_success(request, plan_duration):
-
     """
-
-    Handles successful subscription payments and activates the membership.
-
+    Landing page after a subscription payment. The membership is activated by the
+    Stripe webhook (payments.fulfillment), so this page only shows what has been applied.
     """
+    membership_plan = get_object_or_404(MembershipPlan, name=plan_duration)
+    payment = (
+        MembershipPayment.objects.select_related("membership")
+        .filter(user=request.user, stripe_payment_id=request.GET.get("session_id"))
+        .first()
+    )
+    membership = payment.membership if payment else None
+    if membership is None:
+        messages.info(request, "We are confirming your payment with Stripe. Your membership will be active in a moment.")
+    return render(request, 'mem_payment_success.html', {
+        'plan': membership_plan.name,
+        'plan_name': membership_plan.name,
+        'start_date': membership.start_date if membership else None,
+        'end_date': membership.end_date if membership else None,
+        'price': payment.amount if payment else membership_plan.price,
+    })
 
-    try:
-
-        # Get the MembershipPlan by name (e.g., "Gold", "Silver", "Platinum")
-
-        membership_plan = get_object_or_404(MembershipPlan, name=plan_duration)
- 
-        # Map duration (e.g., "Weekly") to integer day count
-
-        duration_in_days = DURATION_MAPPING.get(membership_plan.duration)
-
-        if not duration_in_days:
-
-            messages.error(request, f"Invalid duration '{membership_plan.duration}' specified for the plan.")
-
-            return redirect('membership_dashboard')
- 
-        # Calculate start and end dates
-
-        start_date = now().date()
-
-        end_date = start_date + timedelta(days=duration_in_days)
- 
-        # Create the membership
-
-        membership = Membership.objects.create(
-
-            user=request.user,
-
-            plan=membership_plan,
-
-            start_date=start_date,
-
-            end_date=end_date,
-
-            price=membership_plan.price,
-
-            status='Active',
-
-        )
- 
-        # **New Logic: Store Membership Payment**
-
-        try:
-
-            payment = MembershipPayment.objects.create(
-
-                user=request.user,
-
-                plan=membership_plan,
-
-                membership=membership,
-
-                amount=membership_plan.price,
-
-                payment_status='Success',
-
-                stripe_payment_id=f"stripe_{membership.id}_{int(now().timestamp())}"  # Example Stripe ID
-
-            )
-
-            # Log the successful payment storage
-
-            logger.info(f"Payment stored successfully: {payment}")
-
-        except Exception as payment_error:
-
-            logger.error(f"Failed to store payment: {payment_error}")
- 
-        # Send confirmation email
-
-        subscription_send_payment_email(
-
-            user=request.user,
-
-            plan=membership_plan.name,
-
-            start_date=start_date,
-
-            end_date=end_date,
-
-            price=membership_plan.price
-
-        )
- 
-        # Create a notification
-
-        Notification.objects.create(
-
-            notification_type="Received",
-
-            recipient_email=request.user.emailid,
-
-            subject="Subscription Payment Confirmation",
-
-            message=f"We have received your payment for the {membership_plan.name} subscription. "
-
-                    f"Your subscription is active from {start_date} to {end_date}.",
-
-            status="Sent",
-
-            created_at=now(),
-
-            updated_at=now(),
-
-            user_id=request.user.userid
-
-        )
- 
-        # Display success message
-
-        messages.success(request, f"Your {membership_plan.name} subscription has been successfully activated!")
-
-        return render(request, 'mem_payment_success.html', {
-
-            'plan': membership_plan.name,
-
-            'start_date': start_date,
-
-            'end_date': end_date,
-
-            'price': membership_plan.price,
-
-        })
- 
-    except Exception as e:
-
-        # Log any exceptions that occur during the process
-
-        logger.error(f"An error occurred during subscription payment processing: {str(e)}")
- 
-        # Display an error message to the user
-
-        messages.error(request, "An error occurred while processing your subscription. Please try again.")
-
-        return redirect('membership_dashboard')
- 
-
-
- 
 
 def subscription_payment_cancel(request):
     """Handles failed payments"""
     return render(request, 'mem_payment_failed.html')
 
 
-def subscription_send_payment_email(user, plan, start_date, end_date, price):
-    subject = f"Subscription Payment Successful for {plan} Plan"
-    message = (
-        f"Dear {user.username},\n\n"
-        f"Your payment for the {plan} subscription plan has been successfully processed.\n\n"
-        f"Plan: {plan}\n"
-        f"Start Date: {start_date}\n"
-        f"End Date: {end_date}\n"
-        f"Amount: ${price}\n\n"
-        f"Thank you for subscribing!\n\n"
-        f"Best Regards,\nThe Team"
-    )
-    from_email = settings.DEFAULT_FROM_EMAIL
-    recipient_list = [user.emailid]
-    send_mail(subject, message, from_email, recipient_list)
-
-
 def view_user_memberships(request):
     """
     Loads and displays all memberships without admin session validation.
@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import PointsTransaction
+
+
+@admin.register(PointsTransaction)
+class PointsTransactionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'kind', 'points', 'booking', 'reference', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('user__username', 'reference')
+    ordering = ('-id',)
+    raw_id_fields = ('user', 'booking')
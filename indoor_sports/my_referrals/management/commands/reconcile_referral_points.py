@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from my_referrals.points import drifted_balances, reconcile_balances
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every user's referral-points balance from the points ledger and "
+        "fixes the ones that drifted. Use --dry-run to only list them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="List drifted balances without fixing them.")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            drifted = drifted_balances()
+            for user_id, stored, ledger in drifted:
+                self.stdout.write(f"User {user_id}: balance {stored}, ledger {ledger}")
+            self.stdout.write(f"{len(drifted)} balance(s) differ from the ledger.")
+            return
+
+        fixed = reconcile_balances()
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {fixed} referral-points balance(s)."))
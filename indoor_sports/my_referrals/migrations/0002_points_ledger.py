@@ -0,0 +1,48 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_opening_balances(apps, schema_editor):
+    # Existing balances become one opening entry each, so the ledger sums to them.
+    User = apps.get_model('accounts', 'User')
+    PointsTransaction = apps.get_model('my_referrals', 'PointsTransaction')
+    PointsTransaction.objects.bulk_create(
+        [
+            PointsTransaction(user_id=user_id, points=points, kind='Opening Balance', reference=f'opening:{user_id}')
+            for user_id, points in User.objects.exclude(referral_points=0).values_list('pk', 'referral_points')
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_waitlist'),
+        ('my_referrals', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointsTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.IntegerField(help_text='Positive for credits, negative for debits')),
+                ('kind', models.CharField(choices=[('Opening Balance', 'Opening Balance'), ('Signup Bonus', 'Signup Bonus'), ('Referral Credit', 'Referral Credit'), ('Booking Payment', 'Booking Payment'), ('Adjustment', 'Adjustment')], max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=100, null=True, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='points_transactions', to='bookings.booking')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_ledger', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'points_ledger',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['user', '-id'], name='points_ledger_user_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_opening_balances, migrations.RunPython.noop),
+    ]
@@ -29,3 +29,47 @@ class Referral(models.Model):
             return f"Referral from {self.referrer_user.username} to {self.referred_user.username}"
         else:
             return f"Pending referral from {self.referrer_user.username} to {self.friend_email or 'N/A'}"
+
+
+class PointsTransaction(models.Model):
+    """
+    Append-only ledger of referral-point movements. User.referral_points is the
+    running balance of these rows, kept in step by my_referrals.points.
+    """
+    OPENING_BALANCE = 'Opening Balance'
+    SIGNUP_BONUS = 'Signup Bonus'
+    REFERRAL_CREDIT = 'Referral Credit'
+    BOOKING_PAYMENT = 'Booking Payment'
+    ADJUSTMENT = 'Adjustment'
+
+    KIND_CHOICES = [
+        (OPENING_BALANCE, 'Opening Balance'),
+        (SIGNUP_BONUS, 'Signup Bonus'),
+        (REFERRAL_CREDIT, 'Referral Credit'),
+        (BOOKING_PAYMENT, 'Booking Payment'),
+        (ADJUSTMENT, 'Adjustment'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='points_ledger')
+    points = models.IntegerField(help_text="Positive for credits, negative for debits")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Natural key of the business event (e.g. "payment:pi_..."), so it is never posted twice.
+    reference = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    booking = models.ForeignKey(
+        'bookings.Booking',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='points_transactions'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind}: {self.points:+d} points for {self.user_id}"
+
+    class Meta:
+        db_table = 'points_ledger'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['user', '-id'], name='points_ledger_user_idx'),
+        ]
@@ -0,0 +1,90 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from accounts.models import User
+
+from .models import PointsTransaction
+
+REFERRAL_BONUS_POINTS = 10
+
+
+class InsufficientPoints(Exception):
+    """The user's balance does not cover a debit."""
+
+
+# ------------------------------------------------------------------------------
+# Posting: every balance change is a ledger row plus an atomic F() update.
+# ------------------------------------------------------------------------------
+def _post(user_id, points, kind, reference=None, booking=None):
+    """
+    Appends one ledger entry and moves the balance by `points` in the same
+    transaction. Debits never take the balance below zero. Returns False when an
+    entry with this `reference` was already posted, True otherwise.
+    """
+    try:
+        with transaction.atomic():
+            balance = User.objects.filter(pk=user_id)
+            if points < 0:
+                balance = balance.filter(referral_points__gte=-points)
+            if not balance.update(referral_points=F("referral_points") + points):
+                raise InsufficientPoints(f"user {user_id} cannot spend {-points} points")
+            PointsTransaction.objects.create(
+                user_id=user_id, points=points, kind=kind, reference=reference, booking=booking
+            )
+    except IntegrityError:
+        if reference and PointsTransaction.objects.filter(reference=reference).exists():
+            return False
+        raise
+    return True
+
+
+def credit_points(user_id, points, kind, reference=None, booking=None):
+    return _post(user_id, points, kind, reference, booking) if points > 0 else False
+
+
+def debit_points(user_id, points, kind=PointsTransaction.BOOKING_PAYMENT, reference=None, booking=None):
+    """Spends points; raises InsufficientPoints if the balance no longer covers them."""
+    return _post(user_id, -points, kind, reference, booking) if points > 0 else False
+
+
+def credit_referral(new_user, referred_by):
+    """Signup bonus for a referred user and the matching credit for their referrer."""
+    credit_points(new_user.pk, REFERRAL_BONUS_POINTS, PointsTransaction.SIGNUP_BONUS, f"signup:{new_user.pk}")
+    credit_points(referred_by.pk, REFERRAL_BONUS_POINTS, PointsTransaction.REFERRAL_CREDIT, f"referral:{new_user.pk}")
+
+
+# ------------------------------------------------------------------------------
+# Reconciliation: the ledger is the source of truth for balances.
+# ------------------------------------------------------------------------------
+def _ledger_total():
+    return Coalesce(
+        Subquery(
+            PointsTransaction.objects.filter(user=OuterRef("pk"))
+            .order_by()
+            .values("user")
+            .annotate(total=Sum("points"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def drifted_balances():
+    """(user_id, stored balance, ledger balance) for every user whose balance disagrees with the ledger."""
+    return list(
+        User.objects.annotate(ledger_points=_ledger_total())
+        .exclude(referral_points=F("ledger_points"))
+        .values_list("pk", "referral_points", "ledger_points")
+    )
+
+
+def reconcile_balances():
+    """Resets every drifted balance to its ledger sum in one UPDATE; returns the number of users fixed."""
+    with transaction.atomic():
+        return (
+            User.objects.annotate(ledger_points=_ledger_total())
+            .exclude(referral_points=F("ledger_points"))
+            .update(referral_points=_ledger_total())
+        )
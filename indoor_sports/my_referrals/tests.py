@@ -1,3 +1,49 @@
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import User
+from my_referrals.models import PointsTransaction
+from my_referrals.points import (
+    InsufficientPoints, credit_referral, debit_points, drifted_balances, reconcile_balances,
+)
+
+
+class PointsLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.referrer, cls.friend = [
+            User.objects.create_user(
+                username=name, emailid=f"{name}@example.com", firstname=name.title(), lastname="Test",
+                password="password123", gender="Male",
+            )
+            for name in ("referrer", "friend")
+        ]
+
+    def balance(self, user):
+        return User.objects.values_list("referral_points", flat=True).get(pk=user.pk)
+
+    def test_referral_credits_both_users_once(self):
+        credit_referral(self.friend, self.referrer)
+        credit_referral(self.friend, self.referrer)
+
+        self.assertEqual((self.balance(self.referrer), self.balance(self.friend)), (10, 10))
+        self.assertEqual(PointsTransaction.objects.count(), 2)
+
+    def test_debits_never_overdraw_or_repeat(self):
+        credit_referral(self.friend, self.referrer)
+
+        with self.assertRaises(InsufficientPoints):
+            debit_points(self.friend.pk, 11, reference="payment:pi_big")
+        self.assertTrue(debit_points(self.friend.pk, 4, reference="payment:pi_1"))
+        self.assertFalse(debit_points(self.friend.pk, 4, reference="payment:pi_1"))
+
+        self.assertEqual(self.balance(self.friend), 6)
+        self.assertFalse(PointsTransaction.objects.filter(reference="payment:pi_big").exists())
+
+    def test_reconcile_restores_balances_from_the_ledger(self):
+        credit_referral(self.friend, self.referrer)
+        User.objects.filter(pk=self.referrer.pk).update(referral_points=999)
+
+        self.assertEqual(drifted_balances(), [(self.referrer.pk, 999, 10)])
+        self.assertEqual(reconcile_balances(), 1)
+        self.assertEqual(self.balance(self.referrer), 10)
+        self.assertEqual(drifted_balances(), [])
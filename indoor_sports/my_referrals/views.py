@@ -8,11 +8,14 @@ from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from notifications.models import Notification
 from accounts.models import User
+from .models import PointsTransaction
 from django.utils.timezone import now
 import logging
 
 logger = logging.getLogger(__name__)
 
+POINTS_HISTORY_LENGTH = 20
+
 # @login_required(login_url="loginpage")
 def my_referrals(request):
     """
@@ -88,6 +91,8 @@ def my_referrals(request):
         "referral_code": referral_code,
         "referral_link": referral_link,
         "referrals": referrals,
+        "points_balance": request.user.referral_points,
+        "points_history": PointsTransaction.objects.filter(user=request.user)[:POINTS_HISTORY_LENGTH],
     })
 
 @login_required(login_url="loginpage")
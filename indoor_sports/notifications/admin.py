@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, QueuedEmail
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
@@ -7,3 +7,11 @@ class NotificationAdmin(admin.ModelAdmin):
     list_filter = ('status', 'created_at')  # Removed invalid 'notification_type'
     search_fields = ('notification_type', 'message')  # Adjusted to valid fields
     ordering = ('-created_at',)
+
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'recipient_email', 'subject', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipient_email', 'subject')
+    ordering = ('-created_at',)
@@ -0,0 +1,92 @@
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------
+# Queueing: callers store the email and move on; send_queued_emails delivers it.
+# ------------------------------------------------------------------------------
+def queue_emails(emails):
+    """Queues (recipient_email, subject, message) tuples with a single INSERT."""
+    return QueuedEmail.objects.bulk_create(
+        QueuedEmail(recipient_email=recipient, subject=subject, message=message)
+        for recipient, subject, message in emails
+    )
+
+
+def queue_email(recipient_email, subject, message):
+    return queue_emails([(recipient_email, subject, message)])[0]
+
+
+# ------------------------------------------------------------------------------
+# Delivery
+# ------------------------------------------------------------------------------
+def send_queued_emails(batch_size=None, max_attempts=None):
+    """
+    Sends pending emails in batches over one SMTP connection per batch.
+
+    Rows are claimed with SKIP LOCKED so several workers can drain the queue at once.
+    An email that fails is retried on later runs until it has been tried
+    max_attempts times, then marked Failed. Returns (sent, failed).
+    """
+    batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+    max_attempts = max_attempts or settings.EMAIL_QUEUE_MAX_ATTEMPTS
+    sent = failed = 0
+    retry_later = set()
+    while True:
+        with transaction.atomic():
+            batch = list(
+                QueuedEmail.objects.select_for_update(skip_locked=True)
+                .filter(status="Pending")
+                .exclude(id__in=retry_later)
+                .order_by("id")[:batch_size]
+            )
+            if not batch:
+                return sent, failed
+
+            delivered, errors = [], {}
+            connection = get_connection(fail_silently=False)
+            try:
+                connection.open()
+            except Exception as e:
+                # Mail server unreachable: the whole batch counts as one failed attempt.
+                logger.warning("Could not connect to the mail server: %s", e)
+                errors = {email.id: str(e) for email in batch}
+            else:
+                try:
+                    for email in batch:
+                        message = EmailMessage(
+                            email.subject, email.message, settings.DEFAULT_FROM_EMAIL, [email.recipient_email],
+                            connection=connection,
+                        )
+                        try:
+                            message.send()
+                            delivered.append(email.id)
+                        except Exception as e:
+                            logger.warning("Could not send queued email %s: %s", email.id, e)
+                            errors[email.id] = str(e)
+                finally:
+                    connection.close()
+
+            QueuedEmail.objects.filter(id__in=delivered).update(
+                status="Sent", attempts=F("attempts") + 1, sent_at=timezone.now(), last_error=""
+            )
+            for email in batch:
+                if email.id in errors:
+                    gave_up = email.attempts + 1 >= max_attempts
+                    QueuedEmail.objects.filter(id=email.id).update(
+                        status="Failed" if gave_up else "Pending",
+                        attempts=F("attempts") + 1,
+                        last_error=errors[email.id],
+                    )
+                    failed += gave_up
+                    retry_later.add(email.id)
+            sent += len(delivered)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from notifications.mail import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = (
+        "Delivers queued emails (refund confirmations and other batch mail). "
+        "Meant to run periodically, e.g. every minute from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Emails sent per SMTP connection.")
+        parser.add_argument("--max-attempts", type=int, default=None, help="Tries before an email is marked Failed.")
+
+    def handle(self, *args, **options):
+        sent, failed = send_queued_emails(options["batch_size"], options["max_attempts"])
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} queued email(s); {failed} gave up."))
@@ -79,3 +79,35 @@ class Notification(models.Model):
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
         ordering = ['-created_at']
+
+
+class QueuedEmail(models.Model):
+    """
+    An outgoing email waiting for the send_queued_emails job, so requests and batch
+    jobs never block on SMTP.
+    """
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+
+    recipient_email = models.EmailField(verbose_name="Recipient Email")
+    subject = models.CharField(max_length=255, verbose_name="Subject")
+    message = models.TextField(verbose_name="Message Body")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Sent At")
+
+    def __str__(self):
+        return f"Email to {self.recipient_email} - {self.subject} ({self.status})"
+
+    class Meta:
+        verbose_name = "Queued Email"
+        verbose_name_plural = "Queued Emails"
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='queued_email_status_idx'),
+        ]
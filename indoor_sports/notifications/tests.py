@@ -1,3 +1,28 @@
-from django.test import TestCase
+from django.core import mail
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from notifications.mail import queue_emails, send_queued_emails
+from notifications.models import QueuedEmail
+
+
+class QueuedEmailTests(TestCase):
+    def test_queued_emails_are_sent_once(self):
+        queue_emails([
+            ("a@example.com", "Refund Processed", "Your refund is on its way."),
+            ("b@example.com", "Refund Processed", "Your refund is on its way."),
+        ])
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(send_queued_emails(batch_size=1), (2, 0))
+        self.assertEqual(send_queued_emails(), (0, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ["a@example.com", "b@example.com"])
+        self.assertFalse(QueuedEmail.objects.exclude(status="Sent").exists())
+
+    @override_settings(EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend", EMAIL_HOST="localhost", EMAIL_PORT=1)
+    def test_failed_email_gives_up_after_max_attempts(self):
+        queue_emails([("a@example.com", "Refund Processed", "Your refund is on its way.")])
+
+        self.assertEqual(send_queued_emails(max_attempts=2), (0, 0))
+        self.assertEqual(send_queued_emails(max_attempts=2), (0, 1))
+        email = QueuedEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ("Failed", 2))
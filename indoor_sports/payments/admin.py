@@ -1,3 +1,46 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from .models import Payment, Refund, StripeEvent
+from .refunds import refund_payments, with_refund_eligibility
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'booking', 'amount', 'payment_method', 'payment_status', 'payment_date')
+    list_filter = ('payment_status', 'payment_method')
+    search_fields = ('user__username', 'stripe_payment_id')
+    ordering = ('-id',)
+    actions = ['refund_selected']
+
+    @admin.action(description="Refund selected payments (eligible ones only)")
+    def refund_selected(self, request, queryset):
+        eligible = (
+            with_refund_eligibility(queryset)
+            .filter(refund_eligible=True)
+            .select_related("booking__user", "booking__sport", "booking__location")
+        )
+        # processed_by holds accounts.Admin ids (the refund views); a Django admin-site user is
+        # not one, so these refunds leave it empty and the admin log records who ran them.
+        refunded, errors = refund_payments(eligible)
+        for payment in refunded:
+            self.log_change(request, payment, "Refunded through the admin action.")
+        self.message_user(request, f"Refunded {len(refunded)} payment(s); confirmation emails are queued.")
+        if errors:
+            self.message_user(request, f"{len(errors)} refund(s) failed: {errors}", level=messages.ERROR)
+
+
+@admin.register(Refund)
+class RefundAdmin(admin.ModelAdmin):
+    list_display = ('refund_id', 'booking_id', 'payment', 'refund_amount', 'refund_status', 'stripe_refund_id', 'processed_at')
+    list_filter = ('refund_status',)
+    search_fields = ('stripe_refund_id', 'idempotency_key')
+    ordering = ('-refund_id',)
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event_id', 'event_type', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('event_id',)
+    ordering = ('-id',)
+    readonly_fields = ('event_id', 'event_type', 'payload', 'received_at')
@@ -0,0 +1,270 @@
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from bookings.models import Booking, BookingCart
+from bookings.services import cart_line_items, confirm_cart, confirm_hold
+from memberships.discounts import active_plan_name, invalidate_active_plan
+from memberships.models import Membership, MembershipPlan
+from my_referrals.points import InsufficientPoints, debit_points
+from notifications.mail import queue_emails
+from notifications.models import Notification
+
+from .models import MembershipPayment, Payment
+from .pricing import to_cents
+
+logger = logging.getLogger(__name__)
+
+MEMBERSHIP_DURATION_DAYS = {
+    'Weekly': 7,
+    'Monthly': 30,
+    'Yearly': 365,
+}
+
+
+# ------------------------------------------------------------------------------
+# Fulfillment: turns a settled Stripe payment into Payment / Booking /
+# MembershipPayment state. Every function is idempotent, keyed on the Stripe
+# reference, so webhook redeliveries and event-log replays are harmless.
+# ------------------------------------------------------------------------------
+def cart_pricing(cart, request=None):
+    """Returns (bookings, line_items, total) for a cart, priced from its slots in one pass."""
+    bookings = list(
+        cart.bookings.select_related("user", "sport", "location", "slot__sport", "equipment").order_by("date", "time_slot")
+    )
+    rental = next((booking for booking in bookings if booking.equipment_id), None)
+    line_items, total = cart_line_items(
+        [booking.slot for booking in bookings],
+        rental.equipment if rental else None,
+        rental.quantity if rental else None,
+        active_plan_name(cart.user, request),
+    )
+    return bookings, line_items, total
+
+
+def cart_amounts(bookings, line_items):
+    """
+    Splits a cart's line items into {booking_id: amount}: each booking carries its own
+    slot price and the equipment rental is paid with the first booking.
+    """
+    amounts = {booking.booking_id: price for booking, (_, price) in zip(bookings, line_items)}
+    if len(line_items) > len(bookings):
+        amounts[bookings[0].booking_id] += line_items[-1][1]
+    return amounts
+
+
+def encode_cart_amounts(amounts):
+    """Packs {booking_id: amount} into one Checkout metadata value, e.g. "12:2000,13:3000" (cents)."""
+    return ",".join(f"{booking_id}:{to_cents(amount)}" for booking_id, amount in amounts.items())
+
+
+def decode_cart_amounts(value):
+    return {
+        int(booking_id): Decimal(int(cents)) / 100
+        for booking_id, cents in (pair.split(":") for pair in value.split(","))
+    }
+
+
+def allocate_charge(cart_id, amounts, charged):
+    """
+    Returns `amounts` scaled so they add up to `charged`, the amount Stripe took; the
+    last booking absorbs the rounding. A difference means the cart was priced
+    differently from what was charged, so it is logged.
+    """
+    cents = {booking_id: to_cents(amount) for booking_id, amount in amounts.items()}
+    total, charged_cents = sum(cents.values()), to_cents(charged)
+    if total == charged_cents or not cents:
+        return amounts
+    logger.error("Cart %s was charged %s but its bookings add up to %s", cart_id, charged, Decimal(total) / 100)
+    *rest, last = cents
+    allocated = {booking_id: cents[booking_id] * charged_cents // total if total else 0 for booking_id in rest}
+    allocated[last] = charged_cents - sum(allocated.values())
+    return {booking_id: Decimal(value) / 100 for booking_id, value in allocated.items()}
+
+
+def payment_email(booking):
+    """Returns (recipient, subject, message) of the payment confirmation for a booking."""
+    subject = f"Payment Successful for Booking {booking.booking_id}"
+    message = f"Dear {booking.user.firstname},\n\nYour payment for the booking of {booking.sport.name} at {booking.location.name} on {booking.date} has been successfully processed.\n\nBooking ID: {booking.booking_id}\nSlot: {booking.time_slot}\n\nThank you for using our service!\n\nBest Regards,\nIndoor Sports Team"
+    return booking.user.emailid, subject, message
+
+
+def _notify(user, subject, message):
+    Notification.objects.create(
+        user=user,
+        notification_type="Received",
+        recipient_email=user.emailid,
+        subject=subject,
+        message=message,
+        status="sent",
+    )
+
+
+def spend_checkout_points(booking, points, payment_intent):
+    """
+    Debits the referral points a paid checkout used, at most once per PaymentIntent.
+    The discount was already granted, so a balance spent elsewhere meanwhile is only logged.
+    """
+    try:
+        debit_points(booking.user_id, points, reference=f"payment:{payment_intent}", booking=booking)
+    except InsufficientPoints:
+        logger.error("User %s no longer had %s points for booking %s", booking.user_id, points, booking.booking_id)
+
+
+def fulfill_booking(metadata, payment_intent, amount):
+    """
+    Records the payment of a single booking (Checkout or direct card payment) and
+    confirms its slot hold. Returns False when the payment was already recorded.
+    """
+    booking = Booking.objects.select_related("user", "sport", "location", "slot").get(pk=metadata["booking_id"])
+    with transaction.atomic():
+        payment, created = Payment.objects.get_or_create(
+            stripe_payment_id=payment_intent,
+            defaults={
+                "user": booking.user,
+                "booking": booking,
+                "amount": amount,
+                "payment_method": "Card",
+                "payment_status": "Success",
+                "stripe_payment_intent": payment_intent,
+            },
+        )
+        if not created:
+            return False
+        if not confirm_hold(booking):
+            logger.error("Booking %s was paid after its hold expired and the slot was taken", booking.booking_id)
+        spend_checkout_points(booking, int(metadata.get("referral_points_used") or 0), payment_intent)
+        _notify(
+            booking.user,
+            "Slot Booking Payment Confirmation",
+            f"Your payment for booking ID {booking.booking_id} has been received. Amount paid: {amount:.2f} USD.",
+        )
+        queue_emails([payment_email(booking)])
+    return True
+
+
+def fulfill_cart(metadata, payment_intent, amount):
+    """
+    Confirms every held booking of a paid cart and records one payment per booking.
+    The per-booking amounts come from the checkout's metadata, priced when the
+    session was created, so replaying an old event records what was charged then.
+    Returns False when the cart's payments were already recorded.
+    """
+    with transaction.atomic():
+        cart = BookingCart.objects.select_for_update().select_related("user").get(pk=metadata["cart_id"])
+        if Payment.objects.filter(booking__cart=cart, payment_status__in=("Success", "Refunded")).exists():
+            return False
+
+        if metadata.get("amounts"):
+            bookings = list(
+                cart.bookings.select_related("user", "sport", "location").order_by("date", "time_slot")
+            )
+            amounts = decode_cart_amounts(metadata["amounts"])
+        else:
+            # Sessions created before amounts were stored in the metadata: priced as of now
+            bookings, line_items, _ = cart_pricing(cart)
+            amounts = cart_amounts(bookings, line_items)
+        amounts = allocate_charge(cart.cart_id, amounts, amount)
+
+        lost = confirm_cart(cart) or []
+        if lost:
+            logger.error("Cart %s was paid after its hold expired; lost bookings %s",
+                         cart.cart_id, [booking.booking_id for booking in lost])
+
+        Payment.objects.bulk_create([
+            Payment(
+                user=cart.user,
+                booking=booking,
+                amount=amounts.get(booking.booking_id, Decimal(0)),
+                payment_method="Card",
+                payment_status="Success",
+                stripe_payment_intent=payment_intent,
+            )
+            for booking in bookings
+        ])
+        _notify(
+            cart.user,
+            "Slot Booking Payment Confirmation",
+            f"Your payment of {amount:.2f} USD for {len(bookings)} slots (cart {cart.cart_id}) has been received.",
+        )
+        queue_emails(payment_email(booking) for booking in bookings)
+    return True
+
+
+def fulfill_membership(metadata, session_id, amount, invoice_id=None):
+    """
+    Activates the membership bought with a subscription Checkout session, paid
+    through `invoice_id`. Returns False when the session was already recorded.
+    """
+    if MembershipPayment.objects.filter(stripe_payment_id=session_id).exists():
+        return False
+    user = User.objects.get(pk=metadata["user_id"])
+    plan = MembershipPlan.objects.get(name=metadata["plan"])
+    start_date = timezone.localdate()
+    end_date = start_date + timedelta(days=MEMBERSHIP_DURATION_DAYS[plan.duration])
+    with transaction.atomic():
+        membership = Membership.objects.create(
+            user=user, plan=plan, start_date=start_date, end_date=end_date, price=plan.price, status='Active',
+        )
+        MembershipPayment.objects.create(
+            user=user,
+            plan=plan,
+            membership=membership,
+            amount=amount,
+            payment_status='Success',
+            stripe_payment_id=session_id,
+            stripe_invoice_id=invoice_id,
+        )
+        invalidate_active_plan(user)
+        _notify(
+            user,
+            "Subscription Payment Confirmation",
+            f"We have received your payment for the {plan.name} subscription. "
+            f"Your subscription is active from {start_date} to {end_date}.",
+        )
+        queue_emails([(
+            user.emailid,
+            f"Subscription Payment Successful for {plan.name} Plan",
+            f"Dear {user.username},\n\n"
+            f"Your payment for the {plan.name} subscription plan has been successfully processed.\n\n"
+            f"Plan: {plan.name}\nStart Date: {start_date}\nEnd Date: {end_date}\nAmount: ${amount}\n\n"
+            f"Thank you for subscribing!\n\nBest Regards,\nThe Team",
+        )])
+    return True
+
+
+# ------------------------------------------------------------------------------
+# Stripe objects -> fulfillment
+# ------------------------------------------------------------------------------
+def _amount(cents):
+    return Decimal(cents or 0) / 100
+
+
+def apply_checkout_session(session):
+    """Applies a completed Checkout session; returns False for sessions this app did not create or that are unpaid."""
+    if session.get("payment_status") not in ("paid", "no_payment_required"):
+        return False  # delayed payment methods settle with checkout.session.async_payment_succeeded
+    metadata = session.get("metadata") or {}
+    kind = metadata.get("kind")
+    if kind == "booking":
+        fulfill_booking(metadata, session.get("payment_intent") or session["id"], _amount(session.get("amount_total")))
+    elif kind == "cart":
+        fulfill_cart(metadata, session.get("payment_intent"), _amount(session.get("amount_total")))
+    elif kind == "membership":
+        fulfill_membership(metadata, session["id"], _amount(session.get("amount_total")), session.get("invoice"))
+    else:
+        return False
+    return True
+
+
+def apply_payment_intent(intent):
+    """Applies a succeeded direct card PaymentIntent; Checkout intents are handled through their session."""
+    metadata = intent.get("metadata") or {}
+    if metadata.get("kind") != "booking":
+        return False
+    fulfill_booking(metadata, intent["id"], _amount(intent.get("amount_received")))
+    return True
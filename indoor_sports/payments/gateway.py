@@ -0,0 +1,241 @@
+import bisect
+import logging
+import random
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import requests
+import stripe
+from django.conf import settings
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+# Upper bounds (ms) of the latency histogram buckets; slower calls land in "+Inf".
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class GatewayError(Exception):
+    """A payment provider call failed; the message is safe to show to admins."""
+
+
+# ------------------------------------------------------------------------------
+# Instrumentation: retry budget and per-operation latency histograms.
+# ------------------------------------------------------------------------------
+class RetryBudget:
+    """
+    Caps retries at a fraction of recent calls. Every call deposits `ratio` of a
+    token and every retry spends a whole one, so when the provider is down the
+    gateway stops multiplying load on it instead of retrying every call.
+    """
+    def __init__(self, ratio, min_tokens, max_tokens):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = float(min_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class LatencyStats:
+    """Thread-safe call counters and latency histograms, one per gateway operation."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = {}
+
+    def record(self, operation, elapsed_ms, error=False, retries=0):
+        with self._lock:
+            stats = self._operations.setdefault(operation, {
+                "calls": 0, "errors": 0, "retries": 0, "total_ms": 0.0,
+                "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            })
+            stats["calls"] += 1
+            stats["errors"] += error
+            stats["retries"] += retries
+            stats["total_ms"] += elapsed_ms
+            stats["buckets"][bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def snapshot(self):
+        """Returns {operation: {calls, errors, retries, avg_ms, histogram}} for this process."""
+        with self._lock:
+            labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["+Inf"]
+            return {
+                operation: {
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "retries": stats["retries"],
+                    "avg_ms": round(stats["total_ms"] / stats["calls"], 1),
+                    "histogram": dict(zip(labels, stats["buckets"])),
+                }
+                for operation, stats in self._operations.items()
+            }
+
+
+# ------------------------------------------------------------------------------
+# Gateways: the only code that talks to the payment provider. Pick one with
+# settings.PAYMENT_GATEWAY (a dotted path).
+# ------------------------------------------------------------------------------
+class BaseGateway:
+    """Times every call and retries transient failures within the retry budget."""
+    def __init__(self):
+        self.stats = LatencyStats()
+        self.retry_budget = RetryBudget(
+            settings.STRIPE_RETRY_BUDGET_RATIO, settings.STRIPE_RETRY_BUDGET_MIN, settings.STRIPE_RETRY_BUDGET_MAX,
+        )
+
+    def is_retryable(self, error):
+        return False
+
+    def _call(self, operation, request):
+        """Runs `request()`, retrying up to STRIPE_MAX_RETRIES times while the budget allows."""
+        self.retry_budget.deposit()
+        started, retries = time.monotonic(), 0
+        while True:
+            try:
+                result = request()
+            except Exception as e:
+                if retries < settings.STRIPE_MAX_RETRIES and self.is_retryable(e) and self.retry_budget.withdraw():
+                    retries += 1
+                    # Exponential backoff with full jitter: 0-250ms, 0-500ms, ...
+                    time.sleep(random.uniform(0, 0.25 * 2 ** (retries - 1)))
+                    continue
+                self.stats.record(operation, (time.monotonic() - started) * 1000, error=True, retries=retries)
+                raise
+            self.stats.record(operation, (time.monotonic() - started) * 1000, retries=retries)
+            return result
+
+
+class StripeGateway(BaseGateway):
+    """
+    Stripe over one pooled HTTP session shared by all threads of the process.
+    Connect/read timeouts come from STRIPE_TIMEOUTS, per operation.
+    """
+    def __init__(self):
+        super().__init__()
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=settings.STRIPE_POOL_SIZE))
+        self._clients = {}
+
+    def _client(self, operation):
+        """The StripeClient for `operation`'s timeouts, created on first use over the shared pool."""
+        timeout = settings.STRIPE_TIMEOUTS.get(operation) or settings.STRIPE_TIMEOUTS["default"]
+        client = self._clients.get(timeout)
+        if client is None:
+            http_client = stripe.RequestsClient(timeout=tuple(timeout), session=self._session)
+            # The gateway does its own retrying, within the retry budget.
+            client = self._clients[timeout] = stripe.StripeClient(
+                settings.STRIPE_SECRET_KEY, http_client=http_client, max_network_retries=0,
+            )
+        return client
+
+    def is_retryable(self, error):
+        if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+            return True
+        return isinstance(error, stripe.error.APIError) and (error.http_status or 500) >= 500
+
+    def create_checkout_session(self, params, idempotency_key=None):
+        # Retries reuse one idempotency key, so a retried create never makes two sessions.
+        options = {"idempotency_key": idempotency_key or str(uuid.uuid4())}
+        return self._call(
+            "checkout", lambda: self._client("checkout").checkout.sessions.create(params=params, options=options)
+        )
+
+    def create_payment_intent(self, params, idempotency_key=None):
+        options = {"idempotency_key": idempotency_key or str(uuid.uuid4())}
+        return self._call(
+            "payment_intent", lambda: self._client("payment_intent").payment_intents.create(params=params, options=options)
+        )
+
+    def refund(self, payment_reference, amount_cents, idempotency_key):
+        """
+        Refunds `amount_cents` of a Stripe PaymentIntent and returns the refund id.
+        Retrying with the same idempotency key returns the original refund instead of
+        refunding twice.
+        """
+        if not payment_reference:
+            raise GatewayError("payment has no Stripe reference to refund")
+        params = {"payment_intent": payment_reference, "amount": amount_cents}
+        options = {"idempotency_key": idempotency_key}
+        try:
+            refund = self._call("refund", lambda: self._client("refund").refunds.create(params=params, options=options))
+        except stripe.error.StripeError as e:
+            raise GatewayError(e.user_message or str(e)) from e
+        return refund.id
+
+
+class FakeGateway(BaseGateway):
+    """
+    In-memory gateway for tests, local development and load tests. Honors
+    idempotency keys like Stripe does; references listed in `failing` raise
+    GatewayError, and FAKE_GATEWAY_LATENCY_MS adds a simulated round trip.
+    """
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+        self.refunds = {}
+        self.objects = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        latency_ms = getattr(settings, "FAKE_GATEWAY_LATENCY_MS", 0)
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+
+    def _create(self, operation, prefix, idempotency_key, build):
+        def request():
+            self._round_trip()
+            with self._lock:
+                self.calls += 1
+                key = (operation, idempotency_key or uuid.uuid4().hex)
+                if key not in self.objects:
+                    self.objects[key] = build(f"{prefix}_fake_{uuid.uuid4().hex[:16]}")
+                return self.objects[key]
+        return self._call(operation, request)
+
+    def create_checkout_session(self, params, idempotency_key=None):
+        return self._create("checkout", "cs", idempotency_key, lambda object_id: SimpleNamespace(
+            id=object_id, url=f"https://checkout.stripe.test/{object_id}", metadata=params.get("metadata", {}),
+        ))
+
+    def create_payment_intent(self, params, idempotency_key=None):
+        return self._create("payment_intent", "pi", idempotency_key, lambda object_id: SimpleNamespace(
+            id=object_id, client_secret=f"{object_id}_secret", status="succeeded", amount=params.get("amount"),
+        ))
+
+    def refund(self, payment_reference, amount_cents, idempotency_key):
+        def request():
+            self._round_trip()
+            with self._lock:
+                self.calls += 1
+                if payment_reference in self.failing:
+                    raise GatewayError(f"refund of {payment_reference} declined")
+                if idempotency_key not in self.refunds:
+                    self.refunds[idempotency_key] = (f"re_fake_{uuid.uuid4().hex[:16]}", payment_reference, amount_cents)
+                return self.refunds[idempotency_key][0]
+        return self._call("refund", request)
+
+
+def get_gateway():
+    """Returns the process-wide gateway configured by settings.PAYMENT_GATEWAY."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = import_string(settings.PAYMENT_GATEWAY)()
+    return _gateway
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from payments.models import Payment
+from payments.refunds import refund_eligible_payments, with_refund_eligibility
+
+
+class Command(BaseCommand):
+    help = (
+        "Refunds every refund-eligible payment through the payment gateway, records the "
+        "Refund rows and queues the confirmation emails (sent by send_queued_emails)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many payments.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Payments locked and refunded per batch.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the eligible payments.")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            count = with_refund_eligibility(Payment.objects.all()).filter(refund_eligible=True).count()
+            self.stdout.write(f"{count} payment(s) are eligible for a refund.")
+            return
+
+        refunded, errors = refund_eligible_payments(limit=options["limit"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Refunded {refunded} payment(s)."))
+        for payment_id, error in errors.items():
+            self.stderr.write(f"Payment {payment_id}: {error}")
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_datetime
+
+from payments.webhooks import process_pending_events, replay_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Applies pending Stripe webhook events from the event log. Run it periodically "
+        "(or with --loop) to pick up events a background thread missed; --replay "
+        "re-applies the whole log to rebuild payment state."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Events applied per pass.")
+        parser.add_argument("--loop", type=float, default=None, metavar="SECONDS",
+                            help="Keep running, polling for pending events every SECONDS.")
+        parser.add_argument("--replay", action="store_true", help="Re-apply already processed events.")
+        parser.add_argument("--since", default=None, help="With --replay: only events received at or after this ISO datetime.")
+
+    def handle(self, *args, **options):
+        if options["replay"]:
+            since = parse_datetime(options["since"]) if options["since"] else None
+            replayed = replay_events(since)
+            self.stdout.write(self.style.SUCCESS(f"Replayed {replayed} Stripe event(s)."))
+            return
+
+        while True:
+            processed = process_pending_events(options["limit"])
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} Stripe event(s)."))
+            if options["loop"] is None:
+                return
+            time.sleep(options["loop"])
@@ -0,0 +1,43 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from payments.reconciliation import MISMATCH_FIELDS, ReconciliationError, build_index, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks Payment and MembershipPayment rows against a Stripe balance-transaction CSV "
+        "export and writes one CSV line per mismatch (missing, amount drift, status drift). "
+        "The export is streamed, so its size does not matter."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("export", help="Path of the Stripe balance-transaction CSV export.")
+        parser.add_argument("--since", default=None, help="Only local payments made on or after this date (YYYY-MM-DD).")
+        parser.add_argument("--until", default=None, help="Only local payments made on or before this date (YYYY-MM-DD).")
+        parser.add_argument("--output", default=None, help="Write mismatches to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        since = parse_date(options["since"]) if options["since"] else None
+        until = parse_date(options["until"]) if options["until"] else None
+        index = build_index(since, until)
+
+        output = open(options["output"], "w", newline="") if options["output"] else self.stdout
+        counts = {}
+        try:
+            writer = csv.DictWriter(output, fieldnames=MISMATCH_FIELDS)
+            writer.writeheader()
+            with open(options["export"], newline="", encoding="utf-8-sig") as export:
+                for mismatch in reconcile(export, index):
+                    writer.writerow(mismatch)
+                    counts[mismatch["mismatch"]] = counts.get(mismatch["mismatch"], 0) + 1
+        except (OSError, ReconciliationError) as e:
+            raise CommandError(str(e))
+        finally:
+            if options["output"]:
+                output.close()
+
+        summary = ", ".join(f"{count} {kind}" for kind, count in sorted(counts.items())) or "no mismatches"
+        self.stderr.write(f"Checked {len(index)} local payment reference(s): {summary}.")
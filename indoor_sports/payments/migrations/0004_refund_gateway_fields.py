@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_membershippayment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refund',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='refund',
+            name='payment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='refunds', to='payments.payment'),
+        ),
+        migrations.AddField(
+            model_name='refund',
+            name='stripe_refund_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+    ]
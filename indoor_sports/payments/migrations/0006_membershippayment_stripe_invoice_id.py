@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_stripe_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membershippayment',
+            name='stripe_invoice_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+    ]
@@ -15,6 +15,8 @@ class Payment(models.Model):
     payment_date = models.DateTimeField(auto_now_add=True)
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='Pending')
     stripe_payment_id = models.CharField(max_length=100, unique=True, blank=True, null=True)
+    # PaymentIntent the money came from; the payments of one cart checkout share it.
+    stripe_payment_intent = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -59,6 +61,8 @@ class MembershipPayment(models.Model):
         blank=True, 
         null=True
     )
+    # Invoice the subscription was charged through; Stripe balance exports reference it, not the Checkout session.
+    stripe_invoice_id = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -86,8 +90,45 @@ class Refund(models.Model):
     booking_id = models.BigIntegerField()
     refund_amount = models.DecimalField(max_digits=10, decimal_places=2)
     refund_status = models.CharField(max_length=10, choices=REFUND_STATUS_CHOICES, default=PENDING)
+    # accounts.Admin.adminid of the admin who refunded; empty for automatic and admin-site refunds.
     processed_by = models.IntegerField(null=True, blank=True)
     processed_at = models.DateTimeField(null=True, blank=True)
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='refunds')
+    stripe_refund_id = models.CharField(max_length=100, blank=True, null=True)
+    # One refund per key: a retried job cannot record (or be charged for) the same refund twice.
+    idempotency_key = models.CharField(max_length=100, unique=True, blank=True, null=True)
 
     def __str__(self):
-        return f"Refund {self.refund_id} - {self.refund_status}"
\ No newline at end of file
+        return f"Refund {self.refund_id} - {self.refund_status}"
+
+
+class StripeEvent(models.Model):
+    """
+    Append-only log of verified Stripe webhook events. Events are applied by
+    payments.webhooks; replaying the log re-applies them idempotently.
+    """
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Processed', 'Processed'),
+        ('Ignored', 'Ignored'),
+        ('Failed', 'Failed'),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"StripeEvent {self.event_id} ({self.event_type}) - {self.status}"
+
+    class Meta:
+        db_table = 'stripe_events'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='stripe_event_status_idx'),
+        ]
@@ -0,0 +1,104 @@
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+
+CENTS = Decimal("0.01")
+REFERRAL_POINTS_PER_DOLLAR = 10
+
+
+# ------------------------------------------------------------------------------
+# Pricing engine: the one place that turns a slot (plus extras) into an amount.
+# Peak/non-peak comes from the slot's own time, never from the time of the request.
+# ------------------------------------------------------------------------------
+def venue_now():
+    """Current wall-clock time at the venues, in which slot and peak-hour times are expressed."""
+    return datetime.now(ZoneInfo(settings.VENUE_TIME_ZONE))
+
+
+def slot_type_of(slot):
+    """
+    Peak or Non-Peak for a slot: decided by the sport's peak window when it has one,
+    otherwise by the slot's stored slot_type (slots tagged by hand).
+    """
+    sport = slot.sport
+    if sport.peak_hours_start and sport.peak_hours_end:
+        return "Peak" if sport.is_peak(slot.time) else "Non-Peak"
+    return slot.slot_type
+
+
+def membership_discount_rate(plan_name):
+    """Fraction taken off slot and equipment prices for a membership plan name (0 for non-members)."""
+    return Decimal(settings.MEMBERSHIP_DISCOUNTS.get(plan_name, 0)) / 100
+
+
+@lru_cache(maxsize=1024)
+def _unit_price(sport_id, price, peak_price, slot_type, plan_name):
+    # The sport's prices are part of the key, so editing a sport never serves a stale quote.
+    base = peak_price if slot_type == "Peak" and peak_price is not None else price
+    base = Decimal(base)
+    discount = (base * membership_discount_rate(plan_name)).quantize(CENTS, ROUND_HALF_UP)
+    return base, discount
+
+
+def unit_price(sport, slot_type, plan_name=None):
+    """
+    Returns (base_price, membership_discount) for one slot of `sport`, memoized per
+    (sport, slot_type, plan).
+    """
+    return _unit_price(sport.pk, sport.price, sport.peak_price, slot_type, plan_name)
+
+
+def quote_booking(slot, equipment=None, quantity=None, referral_points=0, plan_name=None):
+    """
+    Prices one booking in a single call. Returns a dict with the slot price, the
+    equipment price, the membership and referral discounts and the total to charge.
+    `plan_name` is the user's active plan (memberships.discounts.active_plan_name).
+    `referral_points` is what the user may spend; `referral_points_used` is what the
+    quote actually spends (10 points = $1, never more than the amount due).
+    """
+    slot_type = slot_type_of(slot)
+    slot_price, membership_discount = unit_price(slot.sport, slot_type, plan_name)
+    equipment_price = Decimal(0)
+    if equipment is not None and quantity:
+        equipment_price = Decimal(equipment.price) * quantity
+        membership_discount += equipment_discount(equipment_price, plan_name)
+
+    subtotal = slot_price + equipment_price
+    due = subtotal - membership_discount
+    points_used = min(int(referral_points or 0), int(due * REFERRAL_POINTS_PER_DOLLAR))
+    referral_discount = Decimal(points_used) / REFERRAL_POINTS_PER_DOLLAR
+    return {
+        "slot_type": slot_type,
+        "slot_price": slot_price,
+        "equipment_price": equipment_price,
+        "subtotal": subtotal,
+        "membership_discount": membership_discount,
+        "referral_points_used": points_used,
+        "referral_discount": referral_discount,
+        "total": max(due - referral_discount, Decimal(0)).quantize(CENTS, ROUND_HALF_UP),
+    }
+
+
+def equipment_discount(equipment_price, plan_name=None):
+    """Membership discount on an equipment rental total."""
+    return (equipment_price * membership_discount_rate(plan_name)).quantize(CENTS, ROUND_HALF_UP)
+
+
+def quote_slots(slots, plan_name=None):
+    """
+    Batch API: prices a list of slots (with their sport loaded) in one pass.
+    Returns {slot_id: price after membership discount}.
+    """
+    prices = {}
+    for slot in slots:
+        base, discount = unit_price(slot.sport, slot_type_of(slot), plan_name)
+        prices[slot.pk] = base - discount
+    return prices
+
+
+def to_cents(amount):
+    """Stripe amounts are integer cents."""
+    return int((Decimal(amount) * 100).quantize(Decimal(1), ROUND_HALF_UP))
@@ -0,0 +1,145 @@
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from .models import MembershipPayment, Payment
+
+# Column names differ between the Dashboard "Balance" export and the itemized
+# balance-change reports. Every reference column present in the file is tried:
+# booking payments match on the PaymentIntent, memberships on the invoice.
+REFERENCE_COLUMNS = ("payment_intent_id", "invoice_id", "source_id", "Source", "charge_id")
+CATEGORY_COLUMNS = ("reporting_category", "Type", "type")
+AMOUNT_COLUMNS = ("gross", "Amount", "amount")
+
+CHARGE_CATEGORIES = {"charge", "payment"}
+REFUND_CATEGORIES = {"refund", "payment_refund"}
+
+# Local statuses that mean money was taken; Pending/Failed payments never reach Stripe's balance.
+CHARGED_STATUSES = ("Success", "Completed", "Refunded")
+
+MISMATCH_FIELDS = ["mismatch", "reference", "table", "local_ids", "local_amount", "stripe_amount", "local_status", "stripe_status"]
+
+
+class ReconciliationError(Exception):
+    """The export is not a Stripe balance-transaction CSV this command understands."""
+
+
+def _money(cents):
+    return "" if cents is None else f"{Decimal(cents) / 100:.2f}"
+
+
+def _cents(value):
+    try:
+        return int((Decimal(value.replace(",", "")) * 100).to_integral_value())
+    except (AttributeError, InvalidOperation) as e:
+        raise ReconciliationError(f"invalid amount {value!r}") from e
+
+
+# ------------------------------------------------------------------------------
+# Local index: one compact entry per Stripe reference, built from both tables.
+# ------------------------------------------------------------------------------
+def build_index(since=None, until=None):
+    """
+    Returns {reference: [table, ids, local_cents, statuses, charged_cents, refunded_cents, seen]}
+    for every charged Payment (keyed by PaymentIntent) and MembershipPayment (keyed by
+    invoice). A cart checkout's payments share one PaymentIntent, so they collapse into
+    one entry with their amounts summed.
+    """
+    index = {}
+    sources = [
+        ("payments", Payment.objects.annotate(reference=Coalesce("stripe_payment_intent", "stripe_payment_id"))),
+        ("membership_payments", MembershipPayment.objects.annotate(reference=F("stripe_invoice_id"))),
+    ]
+    for table, queryset in sources:
+        queryset = queryset.filter(payment_status__in=CHARGED_STATUSES, reference__isnull=False)
+        if since:
+            queryset = queryset.filter(payment_date__date__gte=since)
+        if until:
+            queryset = queryset.filter(payment_date__date__lte=until)
+        rows = queryset.order_by().values_list("reference", "pk", "amount", "payment_status").iterator(chunk_size=5000)
+        for reference, pk, amount, status in rows:
+            entry = index.get(reference)
+            if entry is None:
+                index[reference] = [table, [pk], _cents(str(amount)), {status}, 0, 0, False]
+            else:
+                entry[1].append(pk)
+                entry[2] += _cents(str(amount))
+                entry[3].add(status)
+    return index
+
+
+def _column(header, candidates):
+    for name in candidates:
+        if name in header:
+            return name
+    raise ReconciliationError(f"export has none of the columns {', '.join(candidates)}")
+
+
+# ------------------------------------------------------------------------------
+# Reconciliation: stream the export once, then walk the index once.
+# ------------------------------------------------------------------------------
+def reconcile(export, index):
+    """
+    Streams a Stripe balance-transaction CSV (an open text file) against `index`
+    and yields mismatch dicts (keys MISMATCH_FIELDS):
+
+    - missing_locally: Stripe charged a reference neither table knows about.
+    - missing_in_stripe: a charged local payment has no charge in the export.
+    - amount_drift: Stripe's charged amount differs from the local amount.
+    - status_drift: refunded in Stripe but not locally, or the other way round.
+
+    Memory is bounded by the size of the index, never by the size of the export.
+    """
+    reader = csv.DictReader(export)
+    header = reader.fieldnames or []
+    reference_columns = [name for name in REFERENCE_COLUMNS if name in header]
+    if not reference_columns:
+        raise ReconciliationError(f"export has none of the columns {', '.join(REFERENCE_COLUMNS)}")
+    category_column = _column(header, CATEGORY_COLUMNS)
+    amount_column = _column(header, AMOUNT_COLUMNS)
+
+    for row in reader:
+        category = (row[category_column] or "").strip().lower()
+        if category not in CHARGE_CATEGORIES and category not in REFUND_CATEGORIES:
+            continue  # payouts, fees, adjustments
+        references = [row[name] for name in reference_columns if row[name]]
+        entry = next((index[reference] for reference in references if reference in index), None)
+        cents = _cents(row[amount_column])
+        if entry is None:
+            if category in CHARGE_CATEGORIES:
+                yield _mismatch("missing_locally", references[0] if references else "", stripe_amount=cents)
+            continue
+        entry[6] = True
+        if category in CHARGE_CATEGORIES:
+            entry[4] += cents
+        else:
+            entry[5] += -cents  # refunds are negative balance transactions
+
+    for reference, (table, ids, local_cents, statuses, charged, refunded, seen) in index.items():
+        local_status = "/".join(sorted(statuses))
+        stripe_status = "refunded" if charged and refunded >= charged else "charged"
+        details = dict(table=table, local_ids=ids, local_amount=local_cents, local_status=local_status)
+        if not seen or not charged:
+            yield _mismatch("missing_in_stripe", reference, **details)
+            continue
+        details.update(stripe_amount=charged, stripe_status=stripe_status)
+        if charged != local_cents:
+            yield _mismatch("amount_drift", reference, **details)
+        if (stripe_status == "refunded") != (statuses == {"Refunded"}):
+            yield _mismatch("status_drift", reference, **details)
+
+
+def _mismatch(kind, reference, table="", local_ids=(), local_amount=None, stripe_amount=None,
+              local_status="", stripe_status=""):
+    return {
+        "mismatch": kind,
+        "reference": reference,
+        "table": table,
+        "local_ids": " ".join(str(pk) for pk in local_ids),
+        "local_amount": _money(local_amount),
+        "stripe_amount": _money(stripe_amount),
+        "local_status": local_status,
+        "stripe_status": stripe_status,
+    }
@@ -0,0 +1,171 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, Case, DateTimeField, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import TruncDate, TruncTime
+from django.utils import timezone
+
+from notifications.mail import queue_emails
+
+from .gateway import GatewayError, get_gateway
+from .models import Payment, Refund
+from .pricing import to_cents
+
+logger = logging.getLogger(__name__)
+
+REFUND_WINDOW = timedelta(hours=24)
+REFUNDABLE_PAYMENT_STATUSES = ("Success", "Completed")
+
+
+# ------------------------------------------------------------------------------
+# Refund eligibility, computed by the database for a whole queryset of payments.
+# ------------------------------------------------------------------------------
+def refund_eligible_q():
+    """
+    A payment is refundable when it succeeded, its booking is cancelled and the
+    cancellation came at least REFUND_WINDOW before the slot's date + time_slot.
+
+    Requires the `refund_deadline_date` / `refund_deadline_time` annotations added by
+    with_refund_eligibility(): the cancellation time shifted by the window, split into
+    date and time in the current time zone so it compares column-to-column with the
+    booking's date and time_slot on every backend.
+    """
+    return (
+        Q(payment_status__in=REFUNDABLE_PAYMENT_STATUSES, booking__status="Cancelled")
+        & (
+            Q(refund_deadline_date__lt=F("booking__date"))
+            | Q(refund_deadline_date=F("booking__date"), refund_deadline_time__lte=F("booking__time_slot"))
+        )
+    )
+
+
+def with_refund_eligibility(payments):
+    """Annotates `payments` with a boolean `refund_eligible`, in the same query."""
+    deadline = ExpressionWrapper(F("booking__cancellation_time") + REFUND_WINDOW, output_field=DateTimeField())
+    return payments.annotate(
+        refund_deadline_date=TruncDate(deadline),
+        refund_deadline_time=TruncTime(deadline),
+    ).annotate(
+        refund_eligible=Case(
+            When(refund_eligible_q(), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+    )
+
+
+# ------------------------------------------------------------------------------
+# Refund processing: provider calls run concurrently, database writes in bulk.
+# ------------------------------------------------------------------------------
+def refund_idempotency_key(payment):
+    """Stable per payment, so a retried refund is never issued twice by the provider."""
+    return f"refund-payment-{payment.pk}"
+
+
+def refund_email(booking, payment):
+    """Returns (recipient, subject, message) of the refund confirmation for a booking."""
+    subject = f"Refund Processed for Booking {booking.booking_id}"
+    message = f"""Dear {booking.user.firstname},
+
+Your refund for the booking of {booking.sport.name} at {booking.location.name} on {booking.date} has been approved.
+You will receive the amount of ${payment.amount} within 3 business days.
+
+Booking ID: {booking.booking_id}
+Slot: {booking.time_slot}
+
+Thank you for using our service, and we hope to serve you again in the future!
+
+Best Regards,
+Indoor Sports Team
+"""
+    return booking.user.emailid, subject, message
+
+
+def _call_gateway(gateway, payment):
+    try:
+        reference = payment.stripe_payment_intent or payment.stripe_payment_id
+        refund_id = gateway.refund(reference, to_cents(payment.amount), refund_idempotency_key(payment))
+        return payment, refund_id, None
+    except GatewayError as e:
+        return payment, None, str(e)
+
+
+def refund_payments(payments, processed_by=None, gateway=None, workers=None):
+    """
+    Refunds already-vetted payments (with booking, user, sport and location loaded).
+
+    Provider calls run on up to `workers` threads; the Refund rows, the payment status
+    change and the confirmation emails are then written with one statement each.
+    Returns (refunded_payments, {payment_id: error}).
+    """
+    gateway = gateway or get_gateway()
+    workers = workers or settings.REFUND_WORKERS
+    payments = list(payments)
+    if not payments:
+        return [], {}
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(payments)), thread_name_prefix="refund") as pool:
+        outcomes = list(pool.map(lambda payment: _call_gateway(gateway, payment), payments))
+
+    refunded = [(payment, refund_id) for payment, refund_id, error in outcomes if error is None]
+    errors = {payment.pk: error for payment, _, error in outcomes if error is not None}
+    for payment_id, error in errors.items():
+        logger.warning("Refund of payment %s failed: %s", payment_id, error)
+
+    processed_at = timezone.now()
+    with transaction.atomic():
+        Refund.objects.bulk_create(
+            [
+                Refund(
+                    booking_id=payment.booking_id,
+                    payment=payment,
+                    refund_amount=payment.amount,
+                    refund_status=Refund.APPROVED,
+                    processed_by=processed_by,
+                    processed_at=processed_at,
+                    stripe_refund_id=refund_id,
+                    idempotency_key=refund_idempotency_key(payment),
+                )
+                for payment, refund_id in refunded
+            ],
+            ignore_conflicts=True,
+        )
+        Payment.objects.filter(
+            id__in=[payment.pk for payment, _ in refunded], payment_status__in=REFUNDABLE_PAYMENT_STATUSES
+        ).update(payment_status="Refunded", updated_at=processed_at)
+        queue_emails(refund_email(payment.booking, payment) for payment, _ in refunded)
+
+    for payment, _ in refunded:
+        payment.payment_status = "Refunded"
+    return [payment for payment, _ in refunded], errors
+
+
+def refund_eligible_payments(processed_by=None, limit=None, gateway=None, batch_size=None):
+    """
+    Refunds every payment that is currently refund-eligible, a batch at a time.
+
+    Each batch is locked with SKIP LOCKED so two runs (or a run and an admin click)
+    never work on the same payments; payments whose refund failed are left for a later
+    run. Returns (refunded_count, {payment_id: error}).
+    """
+    batch_size = batch_size or settings.REFUND_BATCH_SIZE
+    refunded, errors = 0, {}
+    while limit is None or refunded + len(errors) < limit:
+        size = batch_size if limit is None else min(batch_size, limit - refunded - len(errors))
+        with transaction.atomic():
+            batch = list(
+                with_refund_eligibility(Payment.objects.select_for_update(skip_locked=True, of=("self",)))
+                .filter(refund_eligible=True)
+                .exclude(id__in=list(errors))
+                .select_related("booking__user", "booking__sport", "booking__location")
+                .order_by("id")[:size]
+            )
+            if not batch:
+                break
+            done, failed = refund_payments(batch, processed_by=processed_by, gateway=gateway)
+        refunded += len(done)
+        errors.update(failed)
+    return refunded, errors
@@ -1,3 +1,521 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import io
+import json
+import time as clock
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+from unittest import mock
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.admin.models import LogEntry
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Admin, User
+from bookings.models import Booking, Slot
+from bookings.services import reserve_slot, reserve_slots
+from equipment.models import Equipment
+from memberships.discounts import active_plan_name, invalidate_active_plan
+from memberships.models import Membership, MembershipPlan
+from notifications.models import Notification, QueuedEmail
+from payments.fulfillment import apply_checkout_session, apply_payment_intent
+from payments.gateway import BaseGateway, FakeGateway, RetryBudget
+from payments.models import MembershipPayment, Payment, Refund, StripeEvent
+from payments.pricing import quote_booking, quote_slots
+from payments.reconciliation import build_index, reconcile
+from payments.refunds import refund_eligible_payments, with_refund_eligibility
+from payments.webhooks import replay_events
+from sports.models import Location, Sport
+
+
+class PricingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.location = Location.objects.create(name="Denton Downtown", city="Denton", state="TX", zip_code="76201")
+        cls.sport = Sport.objects.create(
+            name="Badminton", location=cls.location, price=Decimal("20.00"), peak_price=Decimal("30.00"),
+            peak_hours_start=time(17), peak_hours_end=time(21),
+        )
+        day = date.today() + timedelta(days=1)
+        cls.morning = Slot.objects.create(date=day, time=time(9), location=cls.location, sport=cls.sport)
+        cls.evening = Slot.objects.create(date=day, time=time(21), location=cls.location, sport=cls.sport)
+        cls.racket = Equipment.objects.create(name="Racket", quantity=10, price="2.50", location=cls.location)
+
+    def test_peak_follows_the_slot_time_not_the_clock(self):
+        self.assertEqual(quote_booking(self.morning)["slot_price"], Decimal("20.00"))
+        self.assertEqual(quote_booking(self.evening)["slot_type"], "Peak")
+        self.assertEqual(self.evening.get_price(), Decimal("30.00"))
+        self.assertEqual(self.sport.get_current_price(time(18)), Decimal("30.00"))
+
+    def test_quote_combines_equipment_membership_and_referral_points(self):
+        quote = quote_booking(self.evening, self.racket, 2, referral_points=25, plan_name="Gold")
+
+        self.assertEqual(quote["subtotal"], Decimal("35.00"))
+        self.assertEqual(quote["membership_discount"], Decimal("3.50"))
+        self.assertEqual(quote["referral_points_used"], 25)
+        self.assertEqual(quote["total"], Decimal("29.00"))
+
+    def test_referral_points_never_push_the_total_below_zero(self):
+        quote = quote_booking(self.morning, referral_points=10_000)
+        self.assertEqual(quote["referral_points_used"], 200)
+        self.assertEqual(quote["total"], Decimal("0.00"))
+
+    def test_batch_quote_prices_every_slot_without_queries(self):
+        slots = list(Slot.objects.select_related("sport"))
+        with self.assertNumQueries(0):
+            prices = quote_slots(slots)
+        self.assertEqual(prices, {self.morning.pk: Decimal("20.00"), self.evening.pk: Decimal("30.00")})
+
+
+class MembershipDiscountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="member", emailid="member@example.com", firstname="Mo", lastname="Member",
+            password="password123", gender="Male",
+        )
+        cls.plan = MembershipPlan.objects.create(name="Gold", price="49.00", duration="Monthly")
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.request = RequestFactory().get("/")
+
+    def test_active_plan_is_looked_up_once_per_request(self):
+        today = timezone.localdate()
+        Membership.objects.create(
+            user=self.user, plan=self.plan, start_date=today, end_date=today + timedelta(days=30)
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(active_plan_name(self.user, self.request), "Gold")
+            self.assertEqual(active_plan_name(self.user, self.request), "Gold")
+        with self.assertNumQueries(0):
+            self.assertEqual(active_plan_name(self.user, RequestFactory().get("/")), "Gold")
+
+    def test_request_memo_is_kept_per_user(self):
+        other = User.objects.create_user(
+            username="guest", emailid="guest@example.com", firstname="Gus", lastname="Guest",
+            password="password123", gender="Male",
+        )
+        today = timezone.localdate()
+        Membership.objects.create(
+            user=self.user, plan=self.plan, start_date=today, end_date=today + timedelta(days=30)
+        )
+        self.assertEqual(active_plan_name(self.user, self.request), "Gold")
+        self.assertIsNone(active_plan_name(other, self.request))
+        self.assertEqual(active_plan_name(self.user, self.request), "Gold")
+
+    def test_cancelling_invalidates_the_memo(self):
+        today = timezone.localdate()
+        membership = Membership.objects.create(
+            user=self.user, plan=self.plan, start_date=today, end_date=today + timedelta(days=30)
+        )
+        self.assertEqual(active_plan_name(self.user, self.request), "Gold")
+
+        membership.status = "Cancelled"
+        membership.save()
+        invalidate_active_plan(self.user, self.request)
+
+        self.assertIsNone(active_plan_name(self.user, self.request))
+
+
+class RefundEligibilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="payer", emailid="payer@example.com", firstname="Pat", lastname="Payer",
+            password="password123", gender="Male",
+        )
+        cls.location = Location.objects.create(name="Denton Downtown", city="Denton", state="TX", zip_code="76201")
+        cls.sport = Sport.objects.create(name="Squash", location=cls.location, price=Decimal("20.00"))
+        cls.day = date.today() + timedelta(days=5)
+        slot_start = timezone.make_aware(datetime.combine(cls.day, time(18)))
+        cls.payments = {
+            label: cls.paid_booking(status, cancelled_at)
+            for label, status, cancelled_at in [
+                ("early", "Cancelled", slot_start - timedelta(hours=30)),
+                ("exactly_24h", "Cancelled", slot_start - timedelta(hours=24)),
+                ("late", "Cancelled", slot_start - timedelta(hours=23, minutes=59)),
+                ("not_cancelled", "Booked", None),
+                ("no_cancel_time", "Cancelled", None),
+            ]
+        }
+
+    @classmethod
+    def paid_booking(cls, status, cancelled_at):
+        # Only the booking's date/time_slot matter; the slots just need distinct times.
+        hour = Slot.objects.count() + 6
+        slot = Slot.objects.create(date=cls.day, time=time(hour), location=cls.location, sport=cls.sport)
+        booking = Booking.objects.create(
+            user=cls.user, sport=cls.sport, slot=slot, location=cls.location, status=status,
+            date=cls.day, time_slot=time(18), cancellation_time=cancelled_at,
+        )
+        return Payment.objects.create(
+            user=cls.user, booking=booking, amount="20.00", payment_status="Success",
+            stripe_payment_id=f"pi_{booking.pk}",
+        )
+
+    def test_eligibility_follows_the_24_hour_rule(self):
+        eligible = dict(with_refund_eligibility(Payment.objects.all()).values_list("id", "refund_eligible"))
+        self.assertEqual(
+            {label for label, payment in self.payments.items() if eligible[payment.id]},
+            {"early", "exactly_24h"},
+        )
+
+    def test_admin_page_is_one_query_and_filters_eligible(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("admin_view_payments"), {"eligible": "1"})
+        self.assertEqual(
+            [payment.id for payment in response.context["payments"]],
+            [self.payments["exactly_24h"].id, self.payments["early"].id],
+        )
+
+    def test_bulk_refund_records_refunds_and_queues_emails(self):
+        declined = self.payments["exactly_24h"]
+        gateway = FakeGateway(failing={declined.stripe_payment_id})
+
+        refunded, errors = refund_eligible_payments(gateway=gateway, batch_size=1)
+
+        self.assertEqual((refunded, list(errors)), (1, [declined.id]))
+        refund = Refund.objects.get()
+        self.assertEqual(refund.payment_id, self.payments["early"].id)
+        self.assertEqual(refund.stripe_refund_id, gateway.refunds[f"refund-payment-{refund.payment_id}"][0])
+        self.assertEqual(Payment.objects.get(pk=self.payments["early"].pk).payment_status, "Refunded")
+        self.assertEqual(list(QueuedEmail.objects.values_list("recipient_email", flat=True)), ["payer@example.com"])
+
+        # The declined payment stays eligible; a retry refunds it once and nothing else.
+        gateway.failing.clear()
+        self.assertEqual(refund_eligible_payments(gateway=gateway), (1, {}))
+        self.assertEqual(refund_eligible_payments(gateway=gateway), (0, {}))
+        self.assertEqual(Refund.objects.count(), 2)
+
+    def test_refund_views_are_admin_only_and_record_the_admin(self):
+        early = self.payments["early"]
+        with mock.patch("payments.views.refund_payments") as refund_one, \
+                mock.patch("payments.views.refund_eligible_payments", return_value=(0, {})) as refund_all:
+            self.assertRedirects(
+                self.client.get(reverse("process_refund", args=[early.id])), reverse("loginpage"),
+                fetch_redirect_response=False,
+            )
+            self.assertRedirects(
+                self.client.post(reverse("refund_all_eligible")), reverse("loginpage"), fetch_redirect_response=False,
+            )
+            refund_one.assert_not_called()
+            refund_all.assert_not_called()
+
+            admin = Admin.objects.create(firstname="Ada", lastname="Min", emailid="ada@example.com", is_verified=True)
+            session = self.client.session
+            session.update({"role": "admin", "admin_id": admin.adminid})
+            session.save()
+            refund_one.return_value = (1, {})
+            self.client.get(reverse("process_refund", args=[early.id]))
+            self.client.post(reverse("refund_all_eligible"))
+
+        self.assertEqual(refund_one.call_args.kwargs["processed_by"], admin.adminid)
+        refund_all.assert_called_once_with(processed_by=admin.adminid)
+
+    def test_admin_site_refunds_are_logged_not_attributed(self):
+        staff = User.objects.create_superuser(
+            username="staff", emailid="staff@example.com", firstname="Stef", lastname="Staff", password="password123",
+        )
+        self.client.force_login(staff, backend="django.contrib.auth.backends.ModelBackend")
+        early = self.payments["early"]
+        with mock.patch("payments.refunds.get_gateway", return_value=FakeGateway()):
+            self.client.post(reverse("admin:payments_payment_changelist"), {
+                "action": "refund_selected", "_selected_action": [early.pk],
+            })
+
+        self.assertIsNone(Refund.objects.get(payment=early).processed_by)
+        self.assertTrue(LogEntry.objects.filter(user=staff, object_id=str(early.pk)).exists())
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET="whsec_test", STRIPE_EVENTS_PROCESS_ASYNC=False)
+class StripeWebhookTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="hooked", emailid="hooked@example.com", firstname="Hu", lastname="Hook",
+            password="password123", gender="Male",
+        )
+        cls.location = Location.objects.create(name="Denton Downtown", city="Denton", state="TX", zip_code="76201")
+        cls.sport = Sport.objects.create(name="Squash", location=cls.location, price=Decimal("20.00"))
+        cls.slot = Slot.objects.create(
+            date=date.today() + timedelta(days=3), time=time(9), location=cls.location, sport=cls.sport
+        )
+
+    def setUp(self):
+        User.objects.filter(pk=self.user.pk).update(referral_points=50)
+        self.booking = reserve_slot(self.user, self.slot, status="Pending", hold=True)
+
+    def post_event(self, event_id, secret="whsec_test"):
+        payload = json.dumps({
+            "id": event_id,
+            "type": "checkout.session.completed",
+            "data": {"object": {
+                "id": "cs_test_1",
+                "payment_status": "paid",
+                "payment_intent": "pi_test_1",
+                "amount_total": 1700,
+                "metadata": {"kind": "booking", "booking_id": self.booking.pk, "referral_points_used": 30},
+            }},
+        })
+        timestamp = int(clock.time())
+        signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse("stripe_webhook"), payload, content_type="application/json",
+                HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}",
+            )
+
+    def test_unsigned_events_are_rejected(self):
+        self.assertEqual(self.post_event("evt_forged", secret="whsec_wrong").status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_checkout_event_is_applied_once(self):
+        self.assertEqual(self.post_event("evt_1").status_code, 200)
+        self.assertEqual(self.post_event("evt_1").status_code, 200)  # Stripe redelivery
+        replay_events()
+
+        payment = Payment.objects.get()
+        self.assertEqual((payment.booking_id, payment.amount), (self.booking.pk, Decimal("17.00")))
+        self.assertEqual(payment.stripe_payment_intent, "pi_test_1")
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.status, self.booking.hold_expires_at), ("Booked", None))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.referral_points, 20)
+        self.assertEqual(StripeEvent.objects.get().status, "Processed")
+
+    def test_card_payment_is_fulfilled_like_the_webhook(self):
+        with mock.patch("payments.views.get_gateway", return_value=FakeGateway()):
+            response = self.client.post(
+                reverse("process_card_payment", args=[self.booking.pk]),
+                json.dumps({"payment_method_id": "pm_card_visa"}), content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        payment = Payment.objects.get()
+        quote = quote_booking(self.slot, referral_points=50)
+        self.assertEqual((payment.booking_id, payment.amount), (self.booking.pk, quote["total"]))
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.status, self.booking.hold_expires_at), ("Booked", None))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.referral_points, 0)
+        self.assertTrue(Notification.objects.filter(user=self.user, subject="Slot Booking Payment Confirmation").exists())
+        self.assertEqual(list(QueuedEmail.objects.values_list("recipient_email", flat=True)), ["hooked@example.com"])
+
+    def test_card_payment_awaiting_3d_secure_is_left_to_the_webhook(self):
+        gateway = mock.Mock()
+        gateway.create_payment_intent.return_value = SimpleNamespace(
+            id="pi_3ds", client_secret="pi_3ds_secret", status="requires_action",
+        )
+        with mock.patch("payments.views.get_gateway", return_value=gateway):
+            response = self.client.post(
+                reverse("process_card_payment", args=[self.booking.pk]),
+                json.dumps({"payment_method_id": "pm_card_3ds"}), content_type="application/json",
+            )
+
+        self.assertEqual(response.json(), {"success": True, "requires_action": True, "client_secret": "pi_3ds_secret"})
+        self.assertFalse(Payment.objects.exists())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.referral_points, 50)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "Pending")
+
+        # The customer completes 3-D Secure; Stripe reports the intent as succeeded
+        params = gateway.create_payment_intent.call_args.args[0]
+        apply_payment_intent({"id": "pi_3ds", "amount_received": params["amount"], "metadata": params["metadata"]})
+
+        self.assertEqual(Payment.objects.get().stripe_payment_intent, "pi_3ds")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.referral_points, 0)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "Booked")
+
+    def test_success_page_changes_nothing(self):
+        self.client.force_login(self.user, backend="django.contrib.auth.backends.ModelBackend")
+        response = self.client.get(reverse("payment_success", args=[self.booking.pk]), {"session_id": "cs_test_1"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Payment.objects.exists())
+        self.user.refresh_from_db()
+        self.sport.refresh_from_db()
+        self.assertEqual((self.user.referral_points, self.sport.price), (50, Decimal("20.00")))
+
+
+class CartFulfillmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="carter", emailid="carter@example.com", firstname="Cy", lastname="Carter",
+            password="password123", gender="Male",
+        )
+        cls.location = Location.objects.create(name="Denton Downtown", city="Denton", state="TX", zip_code="76201")
+        cls.sport = Sport.objects.create(name="Squash", location=cls.location, price=Decimal("20.00"))
+        day = date.today() + timedelta(days=3)
+        cls.slots = [
+            Slot.objects.create(date=day, time=time(hour), location=cls.location, sport=cls.sport, slot_type="Non-Peak")
+            for hour in (9, 10)
+        ]
+
+    def setUp(self):
+        self.cart = reserve_slots(self.user, [slot.pk for slot in self.slots])
+
+    def session(self, metadata, amount_total):
+        return {
+            "id": "cs_cart", "payment_status": "paid", "payment_intent": "pi_cart",
+            "amount_total": amount_total, "metadata": metadata,
+        }
+
+    def test_records_the_amounts_priced_at_checkout(self):
+        gateway = FakeGateway()
+        self.client.force_login(self.user, backend="django.contrib.auth.backends.ModelBackend")
+        with mock.patch("payments.views.get_gateway", return_value=gateway), \
+                mock.patch.object(gateway, "create_checkout_session", wraps=gateway.create_checkout_session) as create:
+            self.client.post(reverse("cart_checkout", args=[self.cart.pk]))
+        metadata = create.call_args.args[0]["metadata"]
+
+        # The price changes before the webhook is applied (or the event is replayed later)
+        Sport.objects.filter(pk=self.sport.pk).update(price=Decimal("25.00"))
+        apply_checkout_session(self.session(metadata, 4000))
+
+        self.assertEqual(
+            list(Payment.objects.order_by("booking__time_slot").values_list("amount", flat=True)),
+            [Decimal("20.00"), Decimal("20.00")],
+        )
+
+    def test_sessions_without_amounts_are_allocated_the_charged_total(self):
+        Sport.objects.filter(pk=self.sport.pk).update(price=Decimal("25.00"))
+        with self.assertLogs("payments.fulfillment", "ERROR"):
+            apply_checkout_session(self.session({"kind": "cart", "cart_id": self.cart.pk}, 4000))
+
+        amounts = list(Payment.objects.values_list("amount", flat=True))
+        self.assertEqual(sum(amounts), Decimal("40.00"))
+        self.assertEqual(sorted(amounts), [Decimal("20.00"), Decimal("20.00")])
+
+
+class FlakyGateway(BaseGateway):
+    def is_retryable(self, error):
+        return isinstance(error, ConnectionError)
+
+
+@mock.patch("payments.gateway.time.sleep")
+class GatewayTests(TestCase):
+    def test_transient_failures_are_retried_and_timed(self, sleep):
+        gateway = FlakyGateway()
+        outcomes = iter([ConnectionError("reset"), ConnectionError("reset"), "ok"])
+
+        def request():
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.assertEqual(gateway._call("checkout", request), "ok")
+        stats = gateway.stats.snapshot()["checkout"]
+        self.assertEqual((stats["calls"], stats["retries"], stats["errors"]), (1, 2, 0))
+        self.assertEqual(sum(stats["histogram"].values()), 1)
+
+    def test_retry_budget_stops_retry_storms(self, sleep):
+        gateway = FlakyGateway()
+        gateway.retry_budget = RetryBudget(ratio=0, min_tokens=1, max_tokens=1)
+
+        def request():
+            raise ConnectionError("Stripe is down")
+
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                gateway._call("refund", request)
+        self.assertEqual(gateway.stats.snapshot()["refund"]["retries"], 1)
+
+    def test_fake_gateway_honors_idempotency_keys(self, sleep):
+        gateway = FakeGateway()
+        first = gateway.create_checkout_session({"mode": "payment"}, idempotency_key="checkout-1")
+        again = gateway.create_checkout_session({"mode": "payment"}, idempotency_key="checkout-1")
+        other = gateway.create_checkout_session({"mode": "payment"})
+
+        self.assertEqual(first.id, again.id)
+        self.assertNotEqual(first.id, other.id)
+        self.assertEqual(gateway.stats.snapshot()["checkout"]["calls"], 3)
+
+    def test_status_page_is_admin_only(self, sleep):
+        url = reverse("gateway_status")
+        self.assertRedirects(self.client.get(url), reverse("loginpage"), fetch_redirect_response=False)
+
+        admin = Admin.objects.create(firstname="Ada", lastname="Min", emailid="ada@example.com", is_verified=True)
+        session = self.client.session
+        session.update({"role": "admin", "admin_id": admin.adminid})
+        session.save()
+        with mock.patch("payments.views.get_gateway", return_value=FakeGateway()):
+            response = self.client.get(url)
+        self.assertEqual(response.json()["gateway"], "FakeGateway")
+
+
+class ReconciliationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(
+            username="recon", emailid="recon@example.com", firstname="Rae", lastname="Con",
+            password="password123", gender="Male",
+        )
+        location = Location.objects.create(name="Denton North", city="Denton", state="TX", zip_code="76205")
+        sport = Sport.objects.create(name="Badminton", location=location, price=Decimal("20.00"))
+        day = date.today() + timedelta(days=3)
+        payments = [
+            ("pi_ok", "20.00", "Success"),
+            ("pi_drift", "20.00", "Success"),
+            ("pi_refunded", "20.00", "Success"),
+            ("pi_unseen", "20.00", "Success"),
+            ("pi_pending", "20.00", "Pending"),
+        ]
+        for hour, (reference, amount, status) in enumerate(payments, start=8):
+            slot = Slot.objects.create(date=day, time=time(hour), location=location, sport=sport)
+            booking = Booking.objects.create(
+                user=user, sport=sport, slot=slot, location=location, date=day, time_slot=time(hour),
+            )
+            Payment.objects.create(
+                user=user, booking=booking, amount=amount, payment_status=status,
+                stripe_payment_id=reference, stripe_payment_intent=reference,
+            )
+        plan = MembershipPlan.objects.create(name="Gold", price=Decimal("30.00"), duration="Monthly")
+        MembershipPayment.objects.create(
+            user=user, plan=plan, amount="30.00", payment_status="Success",
+            stripe_payment_id="cs_member", stripe_invoice_id="in_member",
+        )
+
+    def test_reports_each_kind_of_mismatch(self):
+        export = io.StringIO(
+            "balance_transaction_id,reporting_category,source_id,charge_id,payment_intent_id,invoice_id,gross\n"
+            "txn_1,charge,ch_ok,ch_ok,pi_ok,,20.00\n"
+            "txn_2,charge,ch_drift,ch_drift,pi_drift,,25.00\n"
+            "txn_3,charge,ch_refunded,ch_refunded,pi_refunded,,20.00\n"
+            "txn_4,refund,re_refunded,ch_refunded,pi_refunded,,-20.00\n"
+            "txn_5,charge,ch_stranger,ch_stranger,pi_stranger,,9.00\n"
+            "txn_6,charge,ch_member,ch_member,pi_member,in_member,30.00\n"
+            "txn_7,payout,po_1,,,,-100.00\n"
+        )
+        mismatches = {(m["mismatch"], m["reference"]) for m in reconcile(export, build_index())}
+
+        self.assertEqual(mismatches, {
+            ("amount_drift", "pi_drift"),
+            ("status_drift", "pi_refunded"),
+            ("missing_in_stripe", "pi_unseen"),
+            ("missing_locally", "pi_stranger"),
+        })
+
+    def test_membership_checkout_is_indexed_by_its_invoice(self):
+        user = User.objects.get(username="recon")
+        applied = apply_checkout_session({
+            "id": "cs_gold",
+            "payment_status": "paid",
+            "payment_intent": None,
+            "invoice": "in_gold",
+            "amount_total": 3000,
+            "metadata": {"kind": "membership", "user_id": user.pk, "plan": "Gold"},
+        })
+
+        self.assertTrue(applied)
+        self.assertEqual(MembershipPayment.objects.get(stripe_payment_id="cs_gold").stripe_invoice_id, "in_gold")
+        self.assertEqual(build_index()["in_gold"][0], "membership_payments")
@@ -14,7 +14,10 @@ urlpatterns = [
     path('payments/<int:booking_id>/', views.payments_page, name='payments_page'),
     path('payment_success/<int:booking_id>/', views.payment_success, name='payment_success'),
     path('payment_failed/', views.payment_failed, name='payment_failed'),
+    path('cart/<int:cart_id>/', views.cart_checkout, name='cart_checkout'),
+    path('cart_success/<int:cart_id>/', views.cart_payment_success, name='cart_payment_success'),
     path('error/', views.error_page, name='error_page'),
+    path('webhook/stripe/', views.stripe_webhook, name='stripe_webhook'),
     # path("ref_cancel_booking/<int:booking_id>/", views.ref_cancel_booking, name="ref_cancel_booking"),
     # path("refunds/", views.admin_refunds, name="admin_refunds"),
     # path("approve_refund/<int:refund_id>/", views.approve_refund, name="approve_refund"),
@@ -22,6 +25,8 @@ urlpatterns = [
 
     path('admin/payments/', views.admin_view_payments, name='admin_view_payments'),
     path('admin/payments/refund/<int:id>/', views.process_refund, name='process_refund'),  # Use `id` here   
+    path('admin/payments/refund-eligible/', views.refund_all_eligible, name='refund_all_eligible'),
+    path('admin/payments/gateway/', views.gateway_status, name='gateway_status'),
 
 
 ]
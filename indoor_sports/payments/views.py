@@ -5,12 +5,22 @@ from venv import logger
 import stripe
 from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.core.mail import send_mail
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from .models import Payment, User
-from bookings.models import Booking, Slot
+from bookings.models import Booking, BookingCart, Slot
+from bookings.utils import keyset_page
+from bookings.services import BookingConflict, reserve_slot
+from dashboards.views import is_role_valid
+from .fulfillment import cart_amounts, cart_pricing, encode_cart_amounts, fulfill_booking
+from .gateway import get_gateway
+from .pricing import quote_booking, to_cents
+from .refunds import refund_eligible_payments, refund_payments, with_refund_eligibility
+from .webhooks import InvalidWebhook, record_event, schedule_processing
+from memberships.discounts import active_plan_name
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from notifications.models import Notification
@@ -32,16 +42,11 @@ def confirm_booking(request, slot_id):
     
     if request.method == "POST":
         # Create the booking without any equipment or quantity details.
-        booking = Booking.objects.create(
-            user=request.user,
-            sport=slot.sport,
-            slot=slot,
-            location=slot.location,
-            status="Booked",
-            time_slot=slot.time
-        )
-        slot.is_booked = True
-        slot.save()
+        try:
+            booking = reserve_slot(request.user, slot, status="Booked", hold=True)
+        except BookingConflict:
+            messages.error(request, "This slot is no longer available. Please select another slot.")
+            return redirect("choose_date", location_id=slot.location_id, sport_id=slot.sport_id)
         logger.info("User %s confirmed booking %s for slot %s", request.user.username, booking.booking_id, slot)
         messages.success(request, "Your booking has been confirmed! Please proceed with payment.")
         # Redirect to payment page where payment can be made
@@ -56,43 +61,28 @@ def process_payment(request, booking_id):
     Processes Stripe Checkout session for payment, dynamically adjusting for slot-only or equipment-based pricing,
     and applying referral point discounts.
     """
-    booking = get_object_or_404(Booking, booking_id=booking_id)
+    booking = get_object_or_404(
+        Booking.objects.select_related("user", "slot__sport", "equipment"), booking_id=booking_id
+    )
     user = booking.user
 
-    # Calculate the base price for the slot
-    current_time = datetime.now().time()
-    if booking.sport.peak_hours_start and booking.sport.peak_hours_end:
-        if booking.sport.peak_hours_start <= current_time <= booking.sport.peak_hours_end:
-            base_price = Decimal(booking.sport.peak_price)  # Peak price
-        else:
-            base_price = Decimal(booking.sport.price)  # Regular price
-    else:
-        base_price = Decimal(booking.sport.price)  # Default price
-
-    # Determine total cost (slot price + optional equipment price)
-    total_cost = base_price  # Start with slot price
-    equipment_price = Decimal(0)
-    if booking.equipment and booking.quantity:
-        equipment_price = Decimal(booking.equipment.price) * Decimal(booking.quantity)
-        total_cost += equipment_price  # Add equipment price if applicable
-
-    # Apply referral discount (10 referral points = $1)
-    points_used = min(user.referral_points, int(total_cost * 10))  # Max points usable
-    discount_amount = Decimal(points_used) / 10  # Convert points to dollar discount
-    final_price = max(total_cost - discount_amount, Decimal(0))  # Ensure non-negative price
-
-    # Deduct referral points
-    if points_used > 0:
-        user.referral_points -= points_used
-        user.save()
+    # Slot price by the slot's own time, plus equipment, minus the referral discount (10 points = $1)
+    quote = quote_booking(
+        booking.slot, booking.equipment, booking.quantity,
+        referral_points=user.referral_points, plan_name=active_plan_name(user, request),
+    )
+    equipment_price = quote["equipment_price"]
+    discount_amount = quote["referral_discount"]
+    final_price = quote["total"]
+    points_used = quote["referral_points_used"]
 
     # Convert final price to cents for Stripe
-    amount_in_cents = int(final_price * 100)
+    amount_in_cents = to_cents(final_price)
 
     if request.method == "POST":
         try:
             # Create Stripe Checkout session
-            session = stripe.checkout.Session.create(
+            session = get_gateway().create_checkout_session(dict(
                 customer_email=request.user.email if request.user.is_authenticated else None,
                 payment_method_types=["card", "apple_pay"],
                 line_items=[{
@@ -107,9 +97,11 @@ def process_payment(request, booking_id):
                     "quantity": 1,
                 }],
                 mode="payment",
+                # Read by the webhook (payments.fulfillment), which records the payment and debits the points
+                metadata={"kind": "booking", "booking_id": booking.booking_id, "referral_points_used": points_used},
                 success_url=request.build_absolute_uri(reverse('payment_success', kwargs={'booking_id': booking.booking_id})) + '?session_id={CHECKOUT_SESSION_ID}',
                 cancel_url=request.build_absolute_uri(reverse('payment_failed')),
-            )
+            ))
 
             # Return the session ID along with discount details
             return JsonResponse({
@@ -125,6 +117,8 @@ def process_payment(request, booking_id):
 
     return render(request, 'payments.html', {
         'booking': booking,
+        'slot_price': quote["slot_price"],
+        'membership_discount': quote["membership_discount"],
         'total_price': final_price,  # Final price displayed
         'equipment_price': equipment_price,  # Optional equipment price
         'discount': discount_amount,  # Discount applied
@@ -140,45 +134,56 @@ def process_card_payment(request, booking_id):
             data = json.loads(request.body)
             payment_method_id = data.get("payment_method_id")  # From frontend
 
-            # Retrieve booking and amount
-            booking = get_object_or_404(Booking, booking_id=booking_id)
+            # Retrieve booking and quote it: slot, equipment and referral discount (10 points = 1 USD)
+            booking = get_object_or_404(
+                Booking.objects.select_related("user", "slot__sport", "equipment"), booking_id=booking_id
+            )
             user = booking.user
-            total_cost = booking.sport.price  # Total cost of the booking
-
-            # Calculate referral points discount (10 points = 1 USD)
-            points_used = min(user.referral_points, total_cost * 10)  # Max discount possible
-            discount_amount = points_used / 10  # Convert points to USD
-            final_price = total_cost - Decimal(discount_amount)  # Final price after applying discount
-
-            # Deduct the referral points from the user's account
-            user.referral_points -= points_used
-            user.save()
+            quote = quote_booking(
+                booking.slot, booking.equipment, booking.quantity,
+                referral_points=user.referral_points, plan_name=active_plan_name(user, request),
+            )
+            points_used = quote["referral_points_used"]
+            final_price = quote["total"]
 
             # Ensure that the minimum payment is $0.50
             if final_price < 0.50:
                 return JsonResponse({'success': False, 'error': 'Minimum payment is $0.50'}, status=400)
 
             # Create PaymentIntent on Stripe for the final discounted price
-            payment_intent = stripe.PaymentIntent.create(
-                amount=int(final_price * 100),  # Convert final price to cents
+            payment_intent = get_gateway().create_payment_intent(dict(
+                amount=to_cents(final_price),  # Convert final price to cents
                 currency="usd",
                 payment_method=payment_method_id,
                 confirm=True,
+                # Fulfillment (here or in the payment_intent.succeeded webhook) debits the points once
+                metadata={"kind": "booking", "booking_id": booking.booking_id, "referral_points_used": points_used},
                 return_url=request.build_absolute_uri(reverse('payment_success', kwargs={'booking_id': booking.booking_id})),
+            ))
+
+            if payment_intent.status in ("requires_payment_method", "canceled"):
+                return JsonResponse({"success": False, "error": "Your card was declined."}, status=402)
+            if payment_intent.status != "succeeded":
+                # 3-D Secure or a delayed capture: nothing is charged yet, the webhook fulfills the booking
+                return JsonResponse({
+                    "success": True,
+                    "requires_action": payment_intent.status == "requires_action",
+                    "client_secret": payment_intent.client_secret,
+                })
+
+            # The card was charged: record the payment, spend the referral points, confirm the hold
+            # and notify the user, unless the webhook got there first
+            fulfill_booking(
+                {"booking_id": booking.booking_id, "referral_points_used": points_used}, payment_intent.id, final_price
             )
 
-            # Create a payment record in the database
-            Payment.objects.create(
-                user=request.user,
-                booking=booking,
-                amount=final_price,  # Store the discounted price
-                payment_method="Card",
-                payment_status="Success",
-                stripe_payment_id=payment_intent.id
-            )
+            # The hold had expired and the slot was taken before the payment landed
+            booking.refresh_from_db(fields=["status"])
+            if booking.status == "Cancelled":
+                return JsonResponse({"success": False, "error": "Your slot hold expired and the slot is no longer available. Please contact support for a refund."}, status=409)
 
             # Return the client_secret to the frontend for confirmation
-            return JsonResponse({"success": True, "client_secret": payment_intent.client_secret})
+            return JsonResponse({"success": True, "requires_action": False, "client_secret": payment_intent.client_secret})
 
         except stripe.error.CardError as e:
             return JsonResponse({"success": False, "error": str(e)}, status=400)
@@ -186,6 +191,11 @@ def process_card_payment(request, booking_id):
         except stripe.error.InvalidRequestError as e:
             return JsonResponse({"success": False, "error": "Stripe request error: " + str(e)}, status=400)
 
+        except stripe.error.StripeError as e:
+            # Timeouts and outages that outlasted the gateway's retries
+            logger.error("Stripe unavailable for booking %s: %s", booking_id, e)
+            return JsonResponse({"success": False, "error": "Payment service unavailable, please try again."}, status=503)
+
     return JsonResponse({"error": "Invalid request method"}, status=400)
 
 
@@ -193,51 +203,102 @@ def process_card_payment(request, booking_id):
 @login_required
 def payment_success(request, booking_id):
     """
-    Handles slot booking payment success, applies referral points discount, and updates notifications.
+    Landing page after a booking payment. The payment itself is recorded by the Stripe
+    webhook (payments.webhooks), so this page only reports what has been applied so far.
     """
-    booking = get_object_or_404(Booking, booking_id=booking_id)
-    user = booking.user
-    total_cost = booking.sport.price  # Assuming `price` field exists in Booking
-
-    # Calculate discount based on referral points (10 points = $1)
-    points_used = min(user.referral_points, (total_cost * 10))  # Max discount possible
-    discount_amount = points_used / 10
-    final_price = total_cost - Decimal(discount_amount)  # Use the final price after discount
-
-    # Deduct the referral points
-    user.referral_points -= points_used
-    user.save()
-
-    # Update booking status
-    booking.status = 'booked'
-    booking.sport.price = final_price  # Save the discounted price
-    booking.save()
-
-    # Send payment confirmation email (modify function if needed)
-    send_payment_email(booking)  # Pass final_price and discount_amount to the email function
-
-    # Insert Payment Notification
-    Notification.objects.create(
-        notification_type="Received",
-        recipient_email=user.emailid,
-        subject="Slot Booking Payment Confirmation",
-        message=f"Your payment for booking ID {booking_id} has been received. {discount_amount:.2f} USD discount applied using referral points. Final amount paid: {final_price:.2f} USD.",
-        status="sent",
-        created_at=now(),
-        updated_at=now(),
-        user_id=user.userid
+    booking = get_object_or_404(
+        Booking.objects.select_related("sport", "location", "slot"), booking_id=booking_id, user=request.user
     )
+    payment = booking.payments.filter(payment_status="Success").order_by("-id").first()
+    if payment is None:
+        messages.info(request, "We are confirming your payment with Stripe. Your booking will update in a moment.")
+    return render(request, "payment_success.html", {
+        "booking": booking,
+        "payment": payment,
+        "final_price": payment.amount if payment else None,
+    })
 
-    return render(request, "payment_success.html", {"booking": booking, "final_price": final_price, "discount": discount_amount})
 
+@login_required
+def cart_checkout(request, cart_id):
+    """
+    Renders the payment page for a multi-slot cart; a POST creates one Stripe Checkout
+    session with a line item per slot (and one for the equipment rental).
+    """
+    cart = get_object_or_404(BookingCart, cart_id=cart_id, user=request.user)
+    bookings, line_items, total = cart_pricing(cart, request)
+
+    if request.method == "POST":
+        if cart.status != "Held":
+            return JsonResponse({"error": "This cart has already been processed."}, status=409)
+        try:
+            session = get_gateway().create_checkout_session(dict(
+                customer_email=request.user.emailid,
+                payment_method_types=["card"],
+                line_items=[{
+                    "price_data": {
+                        "currency": "usd",
+                        "product_data": {"name": description},
+                        "unit_amount": to_cents(amount),
+                    },
+                    "quantity": 1,
+                } for description, amount in line_items],
+                mode="payment",
+                # The webhook records these per-booking amounts, not the prices at the time it runs
+                metadata={
+                    "kind": "cart",
+                    "cart_id": cart.cart_id,
+                    "amounts": encode_cart_amounts(cart_amounts(bookings, line_items)),
+                },
+                success_url=request.build_absolute_uri(reverse('cart_payment_success', kwargs={'cart_id': cart.cart_id})) + '?session_id={CHECKOUT_SESSION_ID}',
+                cancel_url=request.build_absolute_uri(reverse('payment_failed')),
+            ))
+        except stripe.error.StripeError as e:
+            logger.error("Error creating checkout session for cart %s: %s", cart.cart_id, e)
+            return JsonResponse({"error": "Payment processing failed", "details": str(e)}, status=400)
+
+        BookingCart.objects.filter(pk=cart.pk).update(stripe_session_id=session.id)
+        return JsonResponse({"id": session.id, "final_price": float(total)})
+
+    return render(request, "cart_payments.html", {
+        "cart": cart,
+        "bookings": bookings,
+        "line_items": line_items,
+        "total": total,
+        "hold_expires_at": bookings[0].hold_expires_at if bookings else None,
+        "STRIPE_PUBLIC_KEY": settings.STRIPE_PUBLIC_KEY,
+    })
+
+
+@login_required
+def cart_payment_success(request, cart_id):
+    """
+    Landing page after a cart payment; the webhook confirms the bookings and records
+    one payment per booking.
+    """
+    cart = get_object_or_404(BookingCart, cart_id=cart_id, user=request.user)
+    bookings, _, total = cart_pricing(cart, request)
+    if cart.status == "Held":
+        messages.info(request, "We are confirming your payment with Stripe. Your bookings will update in a moment.")
+    return render(request, "cart_payment_success.html", {"cart": cart, "bookings": bookings, "total": total})
 
-def send_payment_email(booking):
-    subject = f"Payment Successful for Booking {booking.booking_id}"
-    message = f"Dear {booking.user.firstname},\n\nYour payment for the booking of {booking.sport.name} at {booking.location.name} on {booking.date} has been successfully processed.\n\nBooking ID: {booking.booking_id}\nSlot: {booking.time_slot}\n\nThank you for using our service!\n\nBest Regards,\nIndoor Sports Team"
-    from_email = settings.DEFAULT_FROM_EMAIL  # This should be configured in your settings.py
-    recipient_list = [booking.user.emailid]
 
-    send_mail(subject, message, from_email, recipient_list)
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    """
+    Stripe webhook endpoint: verifies the signature, appends the event to the event
+    log and answers right away. Events are applied after the response, by a
+    background thread or the process_stripe_events worker.
+    """
+    try:
+        event, created = record_event(request.body, request.META.get("HTTP_STRIPE_SIGNATURE", ""))
+    except InvalidWebhook as e:
+        logger.warning("Rejected Stripe webhook: %s", e)
+        return HttpResponse(status=400)
+    if created and event.status == "Pending":
+        schedule_processing(event.pk)
+    return HttpResponse(status=200)
 
 
 # # Handles failed payments
@@ -255,88 +316,70 @@ def error_page(request):
 # Renders the payment selection page
 def payments_page(request, booking_id):
     """Renders the payment selection page"""
-    booking = get_object_or_404(Booking, booking_id=booking_id)
+    booking = get_object_or_404(
+        Booking.objects.select_related("user", "slot__sport", "equipment"), booking_id=booking_id
+    )
+    quote = quote_booking(
+        booking.slot, booking.equipment, booking.quantity,
+        referral_points=booking.user.referral_points, plan_name=active_plan_name(booking.user, request),
+    )
     return render(request, "payments.html", {
         "booking": booking,
+        "slot_price": quote["slot_price"],
+        "membership_discount": quote["membership_discount"],
+        "equipment_price": quote["equipment_price"],
+        "discount": quote["referral_discount"],
+        "total_price": quote["total"],
         "STRIPE_PUBLIC_KEY": settings.STRIPE_PUBLIC_KEY
     })
 
 
+ADMIN_PAYMENTS_PAGE_SIZE = 50
+ADMIN_PAYMENTS_MAX_PAGE_SIZE = 200
+
+
+def _int_param(request, name):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+
 def admin_view_payments(request):
     """
-    Admin view to display all payments and calculate refund eligibility.
+    Admin view to display payments, newest first, with their refund eligibility.
     Refunds are eligible only if:
     - Booking status is 'Cancelled'.
     - Payment status is 'Success'.
     - Cancellation time is at least 24 hours before slot time and date.
+    Eligibility is annotated by the database (payments.refunds), so a page costs one
+    query however many payments it shows; `?eligible=1` lists refundable payments only.
     """
-    payments = Payment.objects.all()  # Fetch all payments
-
-    for payment in payments:
-        try:
-            # Get booking details linked to the payment
-            booking = Booking.objects.get(booking_id=payment.booking_id)
-
-            # Check refund eligibility criteria
-            payment_status_valid = ["Success", "Completed"]
-            if payment.payment_status in payment_status_valid and booking.status == "Cancelled":
-                # Get slot date and time
-                slot_datetime = make_aware(datetime.combine(booking.date, booking.time_slot))
-                
-                # Get cancellation time
-                cancellation_time = booking.cancellation_time
-                
-                # Handle cases where cancellation_time is missing
-                if cancellation_time is None:
-                    payment.refund_eligible = False  # Refund not eligible
-                    continue
-
-                # Ensure timezone-awareness for cancellation time
-                if cancellation_time.tzinfo is None:
-                    cancellation_time = make_aware(cancellation_time)
-
-                # Calculate time difference in hours
-                time_diff = (slot_datetime - cancellation_time).total_seconds() / 3600
-
-                # Refund eligibility check (24 hours or more difference)
-                payment.refund_eligible = time_diff >= 24
-            else:
-                payment.refund_eligible = False  # Refund not eligible
-        except Booking.DoesNotExist:
-            payment.refund_eligible = False  # Refund not eligible if booking is missing
+    eligible_only = request.GET.get("eligible") == "1"
+    per_page = _int_param(request, "per_page") or ADMIN_PAYMENTS_PAGE_SIZE
+    per_page = max(1, min(per_page, ADMIN_PAYMENTS_MAX_PAGE_SIZE))
 
-    return render(request, 'admin_view_payments.html', {'payments': payments})
-
-
-
-
-def send_refund_email(booking, payment):
-    """
-    Sends a refund email to the user when the refund is processed.
-    """
-    try:
-        subject = f"Refund Processed for Booking {booking.booking_id}"
-        message = f"""Dear {booking.user.firstname},
-
-Your refund for the booking of {booking.sport.name} at {booking.location.name} on {booking.date} has been approved.
-You will receive the amount of ${payment.amount} within 3 business days.
-
-Booking ID: {booking.booking_id}
-Slot: {booking.time_slot}
-
-Thank you for using our service, and we hope to serve you again in the future!
+    payments = with_refund_eligibility(
+        Payment.objects.only("id", "amount", "payment_method", "payment_status", "booking_id")
+    )
+    if eligible_only:
+        payments = payments.filter(refund_eligible=True)
 
-Best Regards,
-Indoor Sports Team
-"""
-        from_email = settings.DEFAULT_FROM_EMAIL
-        recipient_list = [booking.user.emailid]  # Ensure 'emailid' is correctly set in your User model
+    rows, next_after, prev_before = keyset_page(
+        payments, "id", _int_param(request, "after"), _int_param(request, "before"), per_page
+    )
+    query = request.GET.copy()
+    for cursor in ("after", "before"):
+        query.pop(cursor, None)
+    return render(request, 'admin_view_payments.html', {
+        'payments': rows,
+        'eligible_only': eligible_only,
+        'per_page': per_page,
+        'next_after': next_after,
+        'prev_before': prev_before,
+        'filter_query': query.urlencode(),
+    })
 
-        # Send email
-        send_mail(subject, message, from_email, recipient_list)
-        print(f"Refund email successfully sent to {booking.user.emailid}")
-    except Exception as e:
-        print(f"Failed to send refund email: {e}")
 
 def process_refund(request, id):
     """
@@ -346,35 +389,28 @@ def process_refund(request, id):
     - Payment status is 'Success'.
     - Cancellation time is at least 24 hours before slot time and date.
     """
-    payment = get_object_or_404(Payment, id=id)
-    booking = get_object_or_404(Booking, booking_id=payment.booking_id)
+    if not is_role_valid(request, "admin"):
+        messages.warning(request, "You do not have permission to access this page.")
+        return redirect("loginpage")
+    payment = get_object_or_404(
+        with_refund_eligibility(Payment.objects.select_related("booking__user", "booking__sport", "booking__location")),
+        id=id,
+    )
+    booking = payment.booking
 
     if payment.payment_status in ["Success", "Completed"] and booking.status == "Cancelled":
-        # Combine slot date and time into a single datetime object
-        slot_datetime = make_aware(datetime.combine(booking.date, booking.time_slot))
-        
-        # Ensure cancellation time is present and timezone-aware
-        cancellation_time = booking.cancellation_time
-        if cancellation_time is None:
+        if booking.cancellation_time is None:
             messages.error(request, "Refund not possible as cancellation time is missing.")
             return redirect('admin_view_payments')
 
-        if cancellation_time.tzinfo is None:
-            cancellation_time = make_aware(cancellation_time)
-
-        # Calculate time difference in hours
-        time_diff = (slot_datetime - cancellation_time).total_seconds() / 3600
-
-        # Refund eligibility check
-        if time_diff >= 24:
-            payment.payment_status = "Refunded"
-            payment.save()
-
-            # Send refund email to the user
-            send_refund_email(booking, payment)
-
-            # Notify admin of successful refund
-            messages.success(request, f"Refund for Payment ID {payment.id} processed successfully.")
+        # Same 24-hour rule as the admin payments list (payments.refunds).
+        if payment.refund_eligible:
+            # Refunds through the payment gateway; the email to the user is queued
+            refunded, errors = refund_payments([payment], processed_by=request.session["admin_id"])
+            if refunded:
+                messages.success(request, f"Refund for Payment ID {payment.id} processed successfully.")
+            else:
+                messages.error(request, f"Refund for Payment ID {payment.id} failed: {errors[payment.id]}")
         else:
             messages.error(request, "Refund not eligible as cancellation did not occur 24 hours before the slot time.")
     else:
@@ -382,3 +418,28 @@ def process_refund(request, id):
 
     return redirect('admin_view_payments')
 
+
+@require_POST
+def refund_all_eligible(request):
+    """Refunds every refund-eligible payment in one go (see the process_refunds command)."""
+    if not is_role_valid(request, "admin"):
+        messages.warning(request, "You do not have permission to access this page.")
+        return redirect("loginpage")
+    refunded, errors = refund_eligible_payments(processed_by=request.session["admin_id"])
+    messages.success(request, f"Refunded {refunded} payment(s); confirmation emails are queued.")
+    if errors:
+        messages.error(request, f"{len(errors)} refund(s) failed and will be retried on the next run.")
+    return redirect('admin_view_payments')
+
+
+def gateway_status(request):
+    """Returns this process's payment gateway call counts, retries and latency histograms as JSON."""
+    if not is_role_valid(request, "admin"):
+        messages.warning(request, "You do not have permission to access this page.")
+        return redirect("loginpage")
+    gateway = get_gateway()
+    return JsonResponse({
+        "gateway": type(gateway).__name__,
+        "retry_budget_tokens": round(gateway.retry_budget.tokens, 2),
+        "operations": gateway.stats.snapshot(),
+    })
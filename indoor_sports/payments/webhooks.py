@@ -0,0 +1,129 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import stripe
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .fulfillment import apply_checkout_session, apply_payment_intent
+from .models import StripeEvent
+
+logger = logging.getLogger(__name__)
+
+EVENT_HANDLERS = {
+    "checkout.session.completed": apply_checkout_session,
+    "checkout.session.async_payment_succeeded": apply_checkout_session,
+    "payment_intent.succeeded": apply_payment_intent,
+}
+
+_executor = None
+
+
+class InvalidWebhook(Exception):
+    """The request body is not a Stripe event signed with STRIPE_WEBHOOK_SECRET."""
+
+
+# ------------------------------------------------------------------------------
+# Ingestion: verify, append to the event log, return. Nothing is applied here.
+# ------------------------------------------------------------------------------
+def record_event(payload, signature):
+    """
+    Verifies a webhook request and stores its event. Returns (event, created);
+    Stripe redelivers events, so `created` is False for one already in the log.
+    """
+    try:
+        stripe.Webhook.construct_event(payload, signature, settings.STRIPE_WEBHOOK_SECRET)
+    except (ValueError, stripe.error.SignatureVerificationError) as e:
+        raise InvalidWebhook(str(e)) from e
+
+    data = json.loads(payload)
+    return StripeEvent.objects.get_or_create(
+        event_id=data["id"],
+        defaults={
+            "event_type": data["type"],
+            "payload": data,
+            "status": "Pending" if data["type"] in EVENT_HANDLERS else "Ignored",
+        },
+    )
+
+
+# ------------------------------------------------------------------------------
+# Processing: apply pending events, each in its own transaction.
+# ------------------------------------------------------------------------------
+def process_event(event_id, max_attempts=None):
+    """
+    Applies one pending event. The row is locked with SKIP LOCKED, so a worker and a
+    background thread never apply the same event at once. Returns the event's new
+    status, or None when it was not pending (or is being processed elsewhere).
+    """
+    max_attempts = max_attempts or settings.STRIPE_EVENT_MAX_ATTEMPTS
+    with transaction.atomic():
+        event = StripeEvent.objects.select_for_update(skip_locked=True).filter(pk=event_id, status="Pending").first()
+        if event is None:
+            return None
+
+        event.attempts += 1
+        try:
+            with transaction.atomic():
+                applied = EVENT_HANDLERS[event.event_type](event.payload["data"]["object"])
+        except Exception as e:
+            logger.exception("Applying Stripe event %s failed", event.event_id)
+            event.last_error = f"{type(e).__name__}: {e}"
+            if event.attempts >= max_attempts:
+                event.status = "Failed"
+        else:
+            event.status = "Processed" if applied else "Ignored"
+            event.last_error = ""
+            event.processed_at = timezone.now()
+        event.save(update_fields=["status", "attempts", "last_error", "processed_at"])
+    return event.status
+
+
+def process_pending_events(limit=None):
+    """Applies pending events oldest first; returns the number that reached Processed."""
+    pending = StripeEvent.objects.filter(status="Pending").order_by("id").values_list("id", flat=True)
+    if limit:
+        pending = pending[:limit]
+    return sum(1 for event_id in list(pending) if process_event(event_id) == "Processed")
+
+
+def replay_events(since=None):
+    """
+    Re-applies the event log (from `since` on) in the order it was received. Handlers
+    are idempotent, so replaying over existing state changes nothing, and replaying
+    into an empty payments table rebuilds it. Returns the number of events re-applied.
+    """
+    events = StripeEvent.objects.filter(event_type__in=EVENT_HANDLERS)
+    if since is not None:
+        events = events.filter(received_at__gte=since)
+    event_ids = list(events.order_by("id").values_list("id", flat=True))
+    StripeEvent.objects.filter(id__in=event_ids).update(status="Pending", attempts=0, last_error="")
+    return sum(1 for event_id in event_ids if process_event(event_id) == "Processed")
+
+
+def _process_in_background(event_id):
+    try:
+        process_event(event_id)
+    except Exception:
+        logger.exception("Processing Stripe event %s failed", event_id)
+    finally:
+        connection.close()  # worker threads hold their own connection
+
+
+def schedule_processing(event_id):
+    """
+    Applies a freshly recorded event once the webhook's transaction commits, on a
+    background thread so Stripe gets its response immediately. With
+    STRIPE_EVENTS_PROCESS_ASYNC off the event is applied inline after commit instead.
+    Events a thread misses stay Pending for the process_stripe_events worker.
+    """
+    global _executor
+
+    if not settings.STRIPE_EVENTS_PROCESS_ASYNC:
+        transaction.on_commit(lambda: process_event(event_id))
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.STRIPE_EVENT_WORKERS, thread_name_prefix="stripe-events")
+    transaction.on_commit(lambda: _executor.submit(_process_in_background, event_id))
@@ -4,6 +4,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.hashers import make_password
 from accounts.models import Admin, User
+from my_referrals.points import credit_referral
 from django.core.mail import send_mail
 from django.urls import reverse
 from django.conf import settings
@@ -123,12 +124,10 @@ def register_user(request):
             return redirect("register_user")
 
         referred_by = None
-        referral_points = 0
         if referral_code_used:
             referred_by_user = User.objects.filter(referral_code=referral_code_used).first()
             if referred_by_user:
                 referred_by = referred_by_user
-                referral_points = 10
             else:
                 messages.warning(request, "Invalid referral code. Registration will continue without referral.")
 
@@ -146,7 +145,6 @@ def register_user(request):
             zip_code=zip_code,
             gender=gender,
             subscription="unsubscribed",
-            referral_points=referral_points,
             referred_by=referred_by
         )
 
@@ -154,9 +152,9 @@ def register_user(request):
         user.referral_code = generate_referral_code(user.userid)
         user.save()
 
+        # Both sides of the referral earn points, posted to the points ledger
         if referred_by:
-            referred_by.referral_points += 10
-            referred_by.save()
+            credit_referral(user, referred_by)
 
         send_mail(
             'Welcome to Indore Sports!',
@@ -427,12 +425,10 @@ def register_new_user(request):
             return redirect("register_new_user")
 
         referred_by = None
-        referral_points = 0
         if referral_code_used:
             referred_by_user = User.objects.filter(referral_code=referral_code_used).first()
             if referred_by_user:
                 referred_by = referred_by_user
-                referral_points = 10 
             else:
                 messages.warning(request, "Invalid referral code. Registration will continue without referral.")
 
@@ -452,16 +448,15 @@ def register_new_user(request):
                 gender=gender,
                 status="active",
                 subscription="unsubscribed",
-                referral_points=referral_points,
                 referred_by=referred_by
             )
             print("User created:", user)
             user.referral_code = generate_referral_code(user.userid)
             user.save()
 
+            # Both sides of the referral earn points, posted to the points ledger
             if referred_by:
-                referred_by.referral_points += 10
-                referred_by.save()
+                credit_referral(user, referred_by)
 
             send_mail(
                 'Welcome to Indore Sports!',
@@ -1,10 +1,23 @@
 from django.contrib import admin
 from bookings.models import BookingReport
+from .models import DailyBookingRollup, EtlWatermark
 
 @admin.register(BookingReport)
 class BookingReportAdmin(admin.ModelAdmin):
-    list_display = ('id', 'userid', 'sport', 'location', 'date', 'time', 'gender', 'status')  # User field is valid now
+    list_display = ('id', 'booking_id', 'userid', 'sport', 'location', 'date', 'time', 'gender', 'status')  # User field is valid now
     list_filter = ('sport', 'location', 'gender', 'status', 'date')
     search_fields = ('user__username', 'sport', 'location')  # No need for user__username because user is a ForeignKey now
     ordering = ('-date', '-time')
-    date_hierarchy = 'date'
\ No newline at end of file
+    date_hierarchy = 'date'
+
+@admin.register(DailyBookingRollup)
+class DailyBookingRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'sport', 'location', 'gender', 'status', 'bookings')
+    list_filter = ('sport', 'location', 'gender', 'status')
+    ordering = ('-date',)
+    date_hierarchy = 'date'
+
+
+@admin.register(EtlWatermark)
+class EtlWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('name', 'changed_at', 'last_id', 'rows_applied', 'last_run_rows', 'last_run_seconds', 'last_run_at')
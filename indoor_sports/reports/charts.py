@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+logger = logging.getLogger(__name__)
+
+# Bump when the drawing code changes, so charts cached under the old look are not reused.
+CHART_STYLE_VERSION = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+_in_flight = {}
+_stats = {"submitted": 0, "rendered": 0, "failed": 0, "rejected": 0, "render_ms": 0.0}
+
+
+# ------------------------------------------------------------------------------
+# Specs: a chart is fully described by a small JSON-able dict, and its cache key
+# is the hash of that dict. Same series, same key, same PNG.
+# ------------------------------------------------------------------------------
+def bar_chart(counts, title, xlabel, colors, rotate=True):
+    return {
+        'kind': 'bar', 'title': title, 'xlabel': xlabel, 'colors': colors, 'rotate': rotate,
+        'labels': [str(label) for label, _ in counts], 'values': [total for _, total in counts],
+    }
+
+
+def donut_chart(counts, title, colors):
+    return {
+        'kind': 'donut', 'title': title, 'colors': colors,
+        'labels': [str(label) for label, _ in counts], 'values': [total for _, total in counts],
+    }
+
+
+def chart_key(spec):
+    payload = json.dumps([CHART_STYLE_VERSION, spec], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def chart_path(key, suffix='.png'):
+    return settings.REPORT_CHART_CACHE_DIR / key[:2] / f"{key}{suffix}"
+
+
+def _write_atomically(path, data):
+    """Writes via a temp file and rename, so readers never see a half-written file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+# ------------------------------------------------------------------------------
+# Cache
+# ------------------------------------------------------------------------------
+def register_chart(spec):
+    """
+    Stores the spec of a chart under its content hash, queues its rendering unless
+    the PNG is already cached, and returns the key.
+    """
+    key = chart_key(spec)
+    path = chart_path(key, '.json')
+    if not path.exists():
+        _write_atomically(path, json.dumps(spec).encode())
+    schedule_render(key, spec)
+    return key
+
+
+def cached_chart(key):
+    """The path of the chart's PNG, or None while it is not rendered yet."""
+    png = chart_path(key)
+    return png if png.exists() else None
+
+
+def _load_spec(key):
+    try:
+        return json.loads(chart_path(key, '.json').read_bytes())
+    except FileNotFoundError:
+        return None
+
+
+# ------------------------------------------------------------------------------
+# Rendering pool: charts are drawn in worker processes, never in web workers.
+# ------------------------------------------------------------------------------
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Spawned, not forked: a fork of a threaded web worker can inherit held locks.
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.REPORT_CHART_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _pool
+
+
+def _finished(key, future):
+    global _pool
+    with _pool_lock:
+        _in_flight.pop(key, None)
+        error = future.exception()
+        if error is None:
+            _stats["rendered"] += 1
+            _stats["render_ms"] += future.result()
+            return
+        _stats["failed"] += 1
+        if isinstance(error, BrokenProcessPool):
+            _pool = None  # a worker died; start a fresh pool on the next submit
+    logger.error("Rendering report chart %s failed: %s", key, error)
+
+
+def schedule_render(key, spec=None):
+    """
+    Queues a chart for rendering in the pool. Returns False for an unknown key or when
+    REPORT_CHART_MAX_QUEUE charts are already queued (the client asks again later).
+    With REPORT_CHARTS_ASYNC off the chart is drawn inline instead.
+    """
+    png = chart_path(key)
+    if png.exists():
+        return True
+    spec = spec or _load_spec(key)
+    if spec is None:
+        return False
+    if not settings.REPORT_CHARTS_ASYNC:
+        render_to_file(spec, str(png))
+        return True
+    with _pool_lock:
+        if key in _in_flight:
+            return True
+        if len(_in_flight) >= settings.REPORT_CHART_MAX_QUEUE:
+            _stats["rejected"] += 1
+            return False
+        future = _in_flight[key] = _get_pool().submit(render_to_file, spec, str(png))
+        _stats["submitted"] += 1
+    future.add_done_callback(lambda done: _finished(key, done))
+    return True
+
+
+def pool_stats():
+    """Counters of this web process's chart pool, for monitoring."""
+    with _pool_lock:
+        rendered = _stats["rendered"]
+        return {
+            "workers": settings.REPORT_CHART_WORKERS,
+            "running": _pool is not None,
+            "in_flight": len(_in_flight),
+            "max_queue": settings.REPORT_CHART_MAX_QUEUE,
+            "submitted": _stats["submitted"],
+            "rendered": rendered,
+            "failed": _stats["failed"],
+            "rejected": _stats["rejected"],
+            "avg_render_ms": round(_stats["render_ms"] / rendered, 1) if rendered else None,
+        }
+
+
+# ------------------------------------------------------------------------------
+# Drawing: object-oriented Figure API only; pyplot's global state is not thread-safe.
+# ------------------------------------------------------------------------------
+def render_to_file(spec, path):
+    """Draws `spec` into the PNG at `path`; returns the milliseconds it took. Runs in pool workers."""
+    started = time.monotonic()
+    _write_atomically(Path(path), render_chart(spec))
+    return (time.monotonic() - started) * 1000
+
+
+def render_chart(spec):
+    """Draws a chart spec and returns the PNG bytes."""
+    figure = Figure(figsize=(6, 4))
+    axes = figure.add_subplot()
+    if spec['kind'] == 'donut':
+        axes.pie(spec['values'], labels=spec['labels'], autopct='%1.1f%%', startangle=140,
+                 colors=spec['colors'], wedgeprops={'width': 0.4})
+    else:
+        axes.bar(spec['labels'], spec['values'], color=spec['colors'])
+        axes.set_xlabel(spec['xlabel'])
+        axes.set_ylabel('Total Bookings')
+        if spec['rotate']:
+            axes.tick_params(axis='x', labelrotation=45)
+    axes.set_title(spec['title'])
+    buffer = BytesIO()
+    FigureCanvasAgg(figure).print_png(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,153 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from bookings.models import Booking, BookingReport
+
+from .models import EtlWatermark
+from .rollups import apply_deltas, rollup_key
+
+WATERMARK = "booking_report"
+
+# Booking columns read per change, with the user, sport and location joined in the same query.
+SOURCE_FIELDS = (
+    "booking_id", "user_id", "user__gender", "sport__name", "location__name",
+    "date", "time_slot", "slot__time", "status", "hold_expires_at", "updated_at",
+)
+REPORT_FIELDS = ["userid", "sport", "location", "date", "time", "gender", "status"]
+
+
+def report_status(status, hold_expires_at):
+    """Booking status -> BookingReport status. An unpaid hold counts as Pending."""
+    if status in ("Cancelled", "Pending"):
+        return status
+    return "Pending" if hold_expires_at is not None else "Confirmed"
+
+
+def _report_values(row):
+    _, user_id, gender, sport, location, day, time_slot, slot_time, status, hold_expires_at, _ = row
+    return {
+        "userid": user_id,
+        "sport": sport,
+        "location": location,
+        "date": day,
+        "time": time_slot or slot_time,
+        "gender": gender or "",
+        "status": report_status(status, hold_expires_at),
+    }
+
+
+def _changes_after(watermark):
+    changes = Booking.objects.all()
+    if watermark.changed_at is not None:
+        changes = changes.filter(
+            Q(updated_at__gt=watermark.changed_at) | Q(updated_at=watermark.changed_at, booking_id__gt=watermark.last_id)
+        )
+    return changes
+
+
+# ------------------------------------------------------------------------------
+# Load: upsert one batch of changed bookings and move the rollups with it.
+# ------------------------------------------------------------------------------
+def upsert_reports(rows):
+    """
+    Creates or updates the BookingReport row of every source row with one bulk INSERT
+    and one bulk UPDATE. Bulk writes skip the rollup signals, so the rollup deltas are
+    applied here. Returns (created, updated).
+    """
+    existing = BookingReport.objects.in_bulk([row[0] for row in rows], field_name="booking_id")
+    to_create, to_update, deltas = [], [], Counter()
+    for row in rows:
+        values = _report_values(row)
+        report = existing.get(row[0])
+        if report is None:
+            report = BookingReport(booking_id=row[0], **values)
+            to_create.append(report)
+            deltas[rollup_key(report)] += 1
+            continue
+        if all(getattr(report, field) == value for field, value in values.items()):
+            continue
+        deltas[rollup_key(report)] -= 1
+        for field, value in values.items():
+            setattr(report, field, value)
+        deltas[rollup_key(report)] += 1
+        to_update.append(report)
+
+    BookingReport.objects.bulk_create(to_create)
+    BookingReport.objects.bulk_update(to_update, REPORT_FIELDS)
+    apply_deltas(deltas)
+    return len(to_create), len(to_update)
+
+
+# ------------------------------------------------------------------------------
+# Incremental run
+# ------------------------------------------------------------------------------
+def sync_booking_reports(batch_size=None, max_batches=None):
+    """
+    Applies every Booking changed since the watermark to booking_report, oldest change
+    first, in batches of `batch_size`. Each batch commits together with the advanced
+    watermark, so an interrupted run resumes where it stopped and concurrent runs take
+    turns. Changes younger than REPORT_ETL_SETTLE_SECONDS are left for the next run, so
+    a transaction that commits late cannot slip behind the watermark.
+
+    Returns {rows, created, updated, batches, seconds, rows_per_second, lag_seconds}.
+    """
+    batch_size = batch_size or settings.REPORT_ETL_BATCH_SIZE
+    settled = timezone.now() - timedelta(seconds=settings.REPORT_ETL_SETTLE_SECONDS)
+    EtlWatermark.objects.get_or_create(name=WATERMARK)
+    started = time.monotonic()
+    stats = {"rows": 0, "created": 0, "updated": 0, "batches": 0}
+
+    while max_batches is None or stats["batches"] < max_batches:
+        with transaction.atomic():
+            watermark = EtlWatermark.objects.select_for_update().get(name=WATERMARK)
+            rows = list(
+                _changes_after(watermark).filter(updated_at__lte=settled)
+                .order_by("updated_at", "booking_id")
+                .values_list(*SOURCE_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            created, updated = upsert_reports(rows)
+            watermark.changed_at, watermark.last_id = rows[-1][-1], rows[-1][0]
+            watermark.rows_applied = F("rows_applied") + len(rows)
+            watermark.save(update_fields=["changed_at", "last_id", "rows_applied"])
+
+        stats["rows"] += len(rows)
+        stats["created"] += created
+        stats["updated"] += updated
+        stats["batches"] += 1
+
+    stats["seconds"] = round(time.monotonic() - started, 3)
+    stats["rows_per_second"] = round(stats["rows"] / stats["seconds"], 1) if stats["seconds"] else None
+    EtlWatermark.objects.filter(name=WATERMARK).update(
+        last_run_rows=stats["rows"], last_run_seconds=stats["seconds"], last_run_at=timezone.now(),
+    )
+    stats["lag_seconds"] = etl_lag()
+    return stats
+
+
+def etl_lag():
+    """Seconds since the oldest booking change the ETL has not applied yet; 0 when caught up."""
+    watermark = EtlWatermark.objects.filter(name=WATERMARK).first() or EtlWatermark(name=WATERMARK)
+    oldest = _changes_after(watermark).aggregate(oldest=Min("updated_at"))["oldest"]
+    return round((timezone.now() - oldest).total_seconds(), 1) if oldest else 0
+
+
+def etl_status():
+    """The watermark, counters of the last run and current lag, for monitoring."""
+    watermark = EtlWatermark.objects.filter(name=WATERMARK).first() or EtlWatermark(name=WATERMARK)
+    return {
+        "changed_at": watermark.changed_at,
+        "last_id": watermark.last_id,
+        "rows_applied": watermark.rows_applied,
+        "last_run_at": watermark.last_run_at,
+        "last_run_rows": watermark.last_run_rows,
+        "last_run_seconds": watermark.last_run_seconds,
+        "lag_seconds": etl_lag(),
+    }
@@ -0,0 +1,179 @@
+import csv
+import io
+
+from django.conf import settings
+
+from bookings.models import Booking, BookingReport
+from payments.models import Payment
+
+
+class ExportUnavailable(Exception):
+    """The requested export format needs an optional dependency that is not installed."""
+
+
+# ------------------------------------------------------------------------------
+# Datasets: (column, ORM lookup, type) per column. Rows are read with
+# values_list(...).iterator(), i.e. a server-side cursor on PostgreSQL, so no
+# export ever holds more than one chunk of rows.
+# ------------------------------------------------------------------------------
+DATASETS = {
+    "booking_reports": {
+        "queryset": lambda: BookingReport.objects.order_by("id"),
+        "date_field": "date",
+        "columns": [
+            ("id", "id", "int"),
+            ("userid", "userid", "int"),
+            ("sport", "sport", "str"),
+            ("location", "location", "str"),
+            ("date", "date", "date"),
+            ("time", "time", "time"),
+            ("gender", "gender", "str"),
+            ("status", "status", "str"),
+        ],
+    },
+    "bookings": {
+        "queryset": lambda: Booking.objects.order_by("booking_id"),
+        "date_field": "date",
+        "columns": [
+            ("booking_id", "booking_id", "int"),
+            ("user_id", "user_id", "int"),
+            ("sport", "sport__name", "str"),
+            ("location", "location__name", "str"),
+            ("date", "date", "date"),
+            ("time_slot", "time_slot", "time"),
+            ("status", "status", "str"),
+            ("equipment", "equipment__name", "str"),
+            ("quantity", "quantity", "int"),
+            ("booking_date", "booking_date", "datetime"),
+            ("cancellation_time", "cancellation_time", "datetime"),
+        ],
+    },
+    "payments": {
+        "queryset": lambda: Payment.objects.order_by("id"),
+        "date_field": "payment_date__date",
+        "columns": [
+            ("id", "id", "int"),
+            ("user_id", "user_id", "int"),
+            ("booking_id", "booking_id", "int"),
+            ("amount", "amount", "decimal"),
+            ("payment_method", "payment_method", "str"),
+            ("payment_status", "payment_status", "str"),
+            ("payment_date", "payment_date", "datetime"),
+            ("stripe_payment_intent", "stripe_payment_intent", "str"),
+        ],
+    },
+}
+
+
+def export_rows(dataset, start=None, end=None):
+    """Yields the dataset's rows as tuples in primary-key order, EXPORT_CHUNK_SIZE rows per fetch."""
+    spec = DATASETS[dataset]
+    rows = spec["queryset"]()
+    if start:
+        rows = rows.filter(**{f"{spec['date_field']}__gte": start})
+    if end:
+        rows = rows.filter(**{f"{spec['date_field']}__lte": end})
+    lookups = [lookup for _, lookup, _ in spec["columns"]]
+    return rows.values_list(*lookups).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def export_columns(dataset):
+    return [column for column, _, _ in DATASETS[dataset]["columns"]]
+
+
+# ------------------------------------------------------------------------------
+# CSV
+# ------------------------------------------------------------------------------
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+    def write(self, value):
+        return value
+
+
+def csv_lines(dataset, start=None, end=None):
+    """Yields the dataset as CSV text, one line at a time, header first."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(export_columns(dataset))
+    for row in export_rows(dataset, start, end):
+        yield writer.writerow(row)
+
+
+# ------------------------------------------------------------------------------
+# Parquet (optional: needs pyarrow)
+# ------------------------------------------------------------------------------
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ExportUnavailable("Parquet export needs the pyarrow package.") from e
+    return pyarrow
+
+
+def _arrow_schema(pa, dataset):
+    types = {
+        "int": pa.int64(),
+        "str": pa.string(),
+        "date": pa.date32(),
+        "time": pa.time64("us"),
+        "datetime": pa.timestamp("us", tz="UTC"),
+        "decimal": pa.decimal128(10, 2),
+    }
+    return pa.schema([(column, types[kind]) for column, _, kind in DATASETS[dataset]["columns"]])
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink that hands out what was written so far, so Parquet can be streamed."""
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parquet_chunks(dataset, start=None, end=None):
+    """
+    Yields the dataset as a Parquet file in pieces: one row group of
+    EXPORT_PARQUET_ROW_GROUP_SIZE rows is buffered, written and handed out at a time.
+    Raises ExportUnavailable up front when pyarrow is missing.
+    """
+    pa = _pyarrow()
+    schema = _arrow_schema(pa, dataset)
+
+    def generate():
+        sink = _Drain()
+        writer = pa.parquet.ParquetWriter(sink, schema)
+        group = []
+
+        def write_group():
+            columns = list(zip(*group))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema,
+            ))
+            group.clear()
+            return sink.drain()
+
+        for row in export_rows(dataset, start, end):
+            group.append(row)
+            if len(group) >= settings.EXPORT_PARQUET_ROW_GROUP_SIZE:
+                yield write_group()
+        if group:
+            yield write_group()
+        writer.close()
+        yield sink.drain()
+
+    return generate()
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from reports.exports import DATASETS, ExportUnavailable, csv_lines, parquet_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes BookingReport, Booking or Payment rows to a CSV or Parquet file, streaming "
+        "them in chunks so memory stays flat whatever the table size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(DATASETS))
+        parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+        parser.add_argument("--output", default=None, help="Destination file; default: stdout (CSV only).")
+        parser.add_argument("--start", default=None, help="First date to export (YYYY-MM-DD).")
+        parser.add_argument("--end", default=None, help="Last date to export (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        start = parse_date(options["start"]) if options["start"] else None
+        end = parse_date(options["end"]) if options["end"] else None
+        dataset, output = options["dataset"], options["output"]
+
+        if options["format"] == "parquet":
+            if not output:
+                raise CommandError("Parquet exports need --output.")
+            try:
+                chunks = parquet_chunks(dataset, start, end)
+            except ExportUnavailable as e:
+                raise CommandError(str(e))
+            with open(output, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        else:
+            f = open(output, "w", newline="", encoding="utf-8") if output else sys.stdout
+            try:
+                for line in csv_lines(dataset, start, end):
+                    f.write(line)
+            finally:
+                if output:
+                    f.close()
+        if output:
+            self.stderr.write(f"Exported {dataset} to {output}.")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from reports.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the daily booking rollups from BookingReport. Rollups are kept up to "
+        "date on every write; run this after bulk loads or to repair drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", default=None, help="First date to rebuild (YYYY-MM-DD); default: the beginning.")
+        parser.add_argument("--end", default=None, help="Last date to rebuild (YYYY-MM-DD); default: the end.")
+
+    def handle(self, *args, **options):
+        start = parse_date(options["start"]) if options["start"] else None
+        end = parse_date(options["end"]) if options["end"] else None
+        if start and end and start > end:
+            raise CommandError("--start must not be after --end")
+        written = rebuild_rollups(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup row(s)."))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reports.etl import etl_status, sync_booking_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Derives booking_report rows from bookings changed since the last run (incremental, "
+        "resumable) and keeps the daily rollups in step. Reports throughput and lag."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Bookings upserted per transaction.")
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches.")
+        parser.add_argument("--loop", type=float, default=None, metavar="SECONDS",
+                            help="Keep running, syncing every SECONDS.")
+        parser.add_argument("--status", action="store_true", help="Only print the watermark and lag.")
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            for name, value in etl_status().items():
+                self.stdout.write(f"{name}: {value}")
+            return
+
+        while True:
+            stats = sync_booking_reports(options["batch_size"], options["max_batches"])
+            self.stdout.write(
+                f"Applied {stats['rows']} booking change(s) in {stats['batches']} batch(es): "
+                f"{stats['created']} created, {stats['updated']} updated, "
+                f"{stats['rows_per_second'] or 0} rows/s, lag {stats['lag_seconds']}s."
+            )
+            if options["loop"] is None:
+                return
+            time.sleep(options["loop"])
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:51
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rollups(apps, schema_editor):
+    BookingReport = apps.get_model('bookings', 'BookingReport')
+    DailyBookingRollup = apps.get_model('reports', 'DailyBookingRollup')
+    groups = (
+        BookingReport.objects.order_by()
+        .values('date', 'sport', 'location', 'gender', 'status')
+        .annotate(bookings=Count('id'))
+    )
+    DailyBookingRollup.objects.bulk_create(
+        (DailyBookingRollup(**group) for group in groups.iterator(chunk_size=1000)), batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('bookings', '0011_waitlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBookingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('sport', models.CharField(max_length=100)),
+                ('location', models.CharField(max_length=255)),
+                ('gender', models.CharField(max_length=10)),
+                ('status', models.CharField(max_length=20)),
+                ('bookings', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'booking_daily_rollup',
+                'constraints': [models.UniqueConstraint(fields=('date', 'sport', 'location', 'gender', 'status'), name='booking_daily_rollup_key')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
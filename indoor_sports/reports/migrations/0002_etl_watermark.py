@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_daily_booking_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EtlWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('changed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('rows_applied', models.BigIntegerField(default=0)),
+                ('last_run_rows', models.IntegerField(default=0)),
+                ('last_run_seconds', models.FloatField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'etl_watermark',
+            },
+        ),
+    ]
@@ -44,3 +44,50 @@
 
 #     def __str__(self):
 #         return f"{self.sport.name} at {self.location.name} on {self.date} by {self.user.username}"
+
+
+from django.db import models
+
+
+class DailyBookingRollup(models.Model):
+    """
+    Booking counts per day and (sport, location, gender, status), derived from
+    BookingReport by reports.rollups. Reports read these rows, not the fact table.
+    """
+    date = models.DateField()
+    sport = models.CharField(max_length=100)
+    location = models.CharField(max_length=255)
+    gender = models.CharField(max_length=10)
+    status = models.CharField(max_length=20)
+    bookings = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'booking_daily_rollup'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'sport', 'location', 'gender', 'status'], name='booking_daily_rollup_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.sport} at {self.location} ({self.gender}, {self.status}): {self.bookings}"
+
+
+class EtlWatermark(models.Model):
+    """
+    How far an incremental ETL job has read its source: the (changed_at, id) of the
+    last row it applied, plus counters of its latest run for monitoring.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    changed_at = models.DateTimeField(null=True, blank=True)
+    last_id = models.BigIntegerField(default=0)
+    rows_applied = models.BigIntegerField(default=0)
+    last_run_rows = models.IntegerField(default=0)
+    last_run_seconds = models.FloatField(default=0)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'etl_watermark'
+
+    def __str__(self):
+        return f"{self.name} at {self.changed_at} / {self.last_id}"
@@ -0,0 +1,86 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from bookings.models import BookingReport
+
+from .models import DailyBookingRollup
+
+DIMENSIONS = ("date", "sport", "location", "gender", "status")
+
+
+def rollup_key(report):
+    """The (date, sport, location, gender, status) rollup row a BookingReport counts towards."""
+    return tuple(getattr(report, field) for field in DIMENSIONS)
+
+
+# ------------------------------------------------------------------------------
+# Incremental maintenance: every BookingReport write moves the affected counts.
+# ------------------------------------------------------------------------------
+def apply_deltas(deltas):
+    """
+    Adds {rollup key: change in bookings} to the rollup rows with F() updates,
+    creating missing rows and dropping rows that reach zero.
+    """
+    with transaction.atomic():
+        for key, delta in deltas.items():
+            if not delta:
+                continue
+            row = DailyBookingRollup.objects.filter(**dict(zip(DIMENSIONS, key)))
+            if not row.update(bookings=F("bookings") + delta):
+                try:
+                    with transaction.atomic():
+                        DailyBookingRollup.objects.create(bookings=delta, **dict(zip(DIMENSIONS, key)))
+                except IntegrityError:
+                    row.update(bookings=F("bookings") + delta)  # created concurrently
+            if delta < 0:
+                row.filter(bookings__lte=0).delete()
+
+
+def record_change(old_key=None, new_key=None):
+    """Moves one booking from `old_key` to `new_key`; either may be None (insert / delete)."""
+    if old_key == new_key:
+        return
+    deltas = Counter()
+    if old_key is not None:
+        deltas[old_key] -= 1
+    if new_key is not None:
+        deltas[new_key] += 1
+    apply_deltas(deltas)
+
+
+# ------------------------------------------------------------------------------
+# Backfill: recompute rollups from the fact table.
+# ------------------------------------------------------------------------------
+def rebuild_rollups(start=None, end=None, batch_size=1000):
+    """
+    Recomputes the rollups of [start, end] (every date when omitted) from BookingReport
+    with one GROUP BY, replacing the existing rows. Returns the number of rows written.
+    """
+    reports = BookingReport.objects.all()
+    rollups = DailyBookingRollup.objects.all()
+    if start:
+        reports, rollups = reports.filter(date__gte=start), rollups.filter(date__gte=start)
+    if end:
+        reports, rollups = reports.filter(date__lte=end), rollups.filter(date__lte=end)
+
+    groups = reports.order_by().values(*DIMENSIONS).annotate(bookings=Count("id"))
+    with transaction.atomic():
+        rollups.delete()
+        created = DailyBookingRollup.objects.bulk_create(
+            (DailyBookingRollup(**group) for group in groups.iterator(chunk_size=batch_size)),
+            batch_size=batch_size,
+        )
+    return len(created)
+
+
+# ------------------------------------------------------------------------------
+# Reading
+# ------------------------------------------------------------------------------
+def totals_by(rollups, dimension):
+    """[(value, bookings)] of `dimension` summed over already-fetched rollup rows, largest first."""
+    totals = Counter()
+    for row in rollups:
+        totals[getattr(row, dimension)] += row.bookings
+    return sorted(totals.items(), key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from bookings.models import BookingReport
+
+from .rollups import DIMENSIONS, record_change, rollup_key
+
+
+@receiver(pre_save, sender=BookingReport)
+def remember_rollup_key(sender, instance, **kwargs):
+    # The stored key, so the save knows which count to move the booking away from.
+    instance._rollup_key = None
+    if instance.pk and not instance._state.adding:
+        instance._rollup_key = BookingReport.objects.filter(pk=instance.pk).values_list(*DIMENSIONS).first()
+
+
+@receiver(post_save, sender=BookingReport)
+def update_rollup_on_save(sender, instance, **kwargs):
+    record_change(instance._rollup_key, rollup_key(instance))
+
+
+@receiver(post_delete, sender=BookingReport)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    record_change(rollup_key(instance), None)
@@ -1,3 +1,213 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import time as clock
+from datetime import date, time
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Admin, User
+from bookings.models import Booking, BookingReport, Slot
+from bookings.services import cancel_reservation
+from reports import charts
+from reports.etl import sync_booking_reports
+from reports.exports import ExportUnavailable, csv_lines, parquet_chunks
+from reports.models import DailyBookingRollup, EtlWatermark
+from reports.rollups import rebuild_rollups
+from sports.models import Location, Sport
+
+
+def report(**fields):
+    values = dict(userid=1, sport="Tennis", location="Denton", date=date(2026, 3, 2), time=time(10),
+                  gender="Female", status="Confirmed")
+    values.update(fields)
+    return BookingReport.objects.create(**values)
+
+
+class DailyBookingRollupTests(TestCase):
+    def setUp(self):
+        chart_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, chart_dir)
+        self.enterContext(override_settings(REPORT_CHART_CACHE_DIR=Path(chart_dir), REPORT_CHARTS_ASYNC=False))
+
+    def counts(self):
+        return {
+            (row.date, row.sport, row.status): row.bookings
+            for row in DailyBookingRollup.objects.all()
+        }
+
+    def test_rollups_follow_inserts_updates_and_deletes(self):
+        first = report()
+        report()
+        second_day = report(date=date(2026, 3, 3))
+        self.assertEqual(self.counts(), {
+            (date(2026, 3, 2), "Tennis", "Confirmed"): 2,
+            (date(2026, 3, 3), "Tennis", "Confirmed"): 1,
+        })
+
+        first.status = "Cancelled"
+        first.save()
+        second_day.delete()
+        self.assertEqual(self.counts(), {
+            (date(2026, 3, 2), "Tennis", "Confirmed"): 1,
+            (date(2026, 3, 2), "Tennis", "Cancelled"): 1,
+        })
+
+    def test_rebuild_matches_incremental_counts(self):
+        for sport in ("Tennis", "Tennis", "Cricket"):
+            report(sport=sport)
+        incremental = self.counts()
+        DailyBookingRollup.objects.update(bookings=99)  # simulate drift
+
+        self.assertEqual(rebuild_rollups(), 2)
+        self.assertEqual(self.counts(), incremental)
+
+    def test_report_reads_rollups(self):
+        for sport in ("Tennis", "Cricket"):
+            report(sport=sport)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("report_view", args=["all"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["total_bookings"], 2)
+        self.assertEqual(len(response.context["graphs"]), 4)
+
+
+class ChartCacheTests(TestCase):
+    def setUp(self):
+        chart_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, chart_dir)
+        self.enterContext(override_settings(REPORT_CHART_CACHE_DIR=Path(chart_dir), REPORT_CHARTS_ASYNC=False))
+        for sport in ("Tennis", "Cricket"):
+            report(sport=sport)
+
+    def chart_urls(self):
+        return [url for url, _ in self.client.get(reverse("report_view", args=["all"])).context["graphs"]]
+
+    def test_charts_are_drawn_once_per_distinct_data(self):
+        with mock.patch.object(charts, "render_chart", wraps=charts.render_chart) as render:
+            urls = self.chart_urls()
+            response = self.client.get(urls[0])
+            self.assertEqual(response["Content-Type"], "image/png")
+            self.assertIn("immutable", response["Cache-Control"])
+            self.assertEqual(self.chart_urls(), urls)
+            self.assertEqual(render.call_count, 4)
+
+            # Cancelling a booking only changes the status series: one new URL, one new drawing.
+            cancelled = BookingReport.objects.get(sport="Cricket")
+            cancelled.status = "Cancelled"
+            cancelled.save()
+            new_urls = self.chart_urls()
+            self.assertEqual(new_urls[:3], urls[:3])
+            self.assertNotEqual(new_urls[3], urls[3])
+            self.assertEqual(render.call_count, 5)
+
+    def test_etag_revalidation_and_unknown_charts(self):
+        url = self.chart_urls()[1]
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(reverse("report_chart", args=["0" * 64])).status_code, 404)
+
+    def test_charts_render_in_the_process_pool(self):
+        with override_settings(REPORT_CHARTS_ASYNC=True):
+            url = self.chart_urls()[0]
+            deadline = clock.monotonic() + 60
+            response = self.client.get(url)
+            while response.status_code == 202 and clock.monotonic() < deadline:
+                self.assertIn("Retry-After", response)
+                clock.sleep(0.2)
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(charts.pool_stats()["rendered"], 1)
+
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2, EXPORT_PARQUET_ROW_GROUP_SIZE=2)
+class ExportTests(TestCase):
+    def setUp(self):
+        for day in (1, 2, 3):
+            report(date=date(2026, 4, day))
+
+    def test_csv_export_streams_rows_in_chunks(self):
+        lines = list(csv_lines("booking_reports", start=date(2026, 4, 2)))
+        self.assertEqual(lines[0], "id,userid,sport,location,date,time,gender,status\r\n")
+        self.assertEqual([line.split(",")[4] for line in lines[1:]], ["2026-04-02", "2026-04-03"])
+
+    def test_export_view_requires_an_admin(self):
+        url = reverse("report_export", args=["booking_reports", "csv"])
+        self.assertRedirects(self.client.get(url), reverse("loginpage"), fetch_redirect_response=False)
+
+        admin = Admin.objects.create(firstname="Ada", lastname="Min", emailid="ada@example.com", is_verified=True)
+        session = self.client.session
+        session.update({"role": "admin", "admin_id": admin.adminid})
+        session.save()
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b"".join(response.streaming_content).count(b"\n"), 4)
+
+    def test_parquet_export_writes_row_groups(self):
+        try:
+            data = b"".join(parquet_chunks("booking_reports"))
+        except ExportUnavailable:
+            self.skipTest("pyarrow is not installed")
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(io.BytesIO(data))
+        self.assertEqual(parquet.metadata.num_rows, 3)
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        self.assertEqual(parquet.read().column("date").to_pylist(), [date(2026, 4, day) for day in (1, 2, 3)])
+
+
+@override_settings(REPORT_ETL_SETTLE_SECONDS=0)
+class BookingReportEtlTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="etl", emailid="etl@example.com", firstname="Eve", lastname="Tl",
+            password="password123", gender="Female",
+        )
+        cls.location = Location.objects.create(name="Denton East", city="Denton", state="TX", zip_code="76207")
+        cls.sport = Sport.objects.create(name="Tennis", location=cls.location, price=Decimal("20.00"))
+
+    def book(self, hour):
+        day = date(2026, 5, 4)
+        slot = Slot.objects.create(date=day, time=time(hour), location=self.location, sport=self.sport, is_booked=True)
+        return Booking.objects.create(
+            user=self.user, sport=self.sport, slot=slot, location=self.location, status="Booked",
+            date=day, time_slot=time(hour),
+        )
+
+    def rollups(self):
+        return {row.status: row.bookings for row in DailyBookingRollup.objects.filter(sport="Tennis")}
+
+    def test_sync_derives_reports_incrementally(self):
+        bookings = [self.book(hour) for hour in (9, 10, 11)]
+
+        stats = sync_booking_reports()
+        self.assertEqual((stats["rows"], stats["created"], stats["lag_seconds"]), (3, 3, 0))
+        report = BookingReport.objects.get(booking=bookings[0])
+        self.assertEqual(
+            (report.userid, report.sport, report.location, report.gender, report.status, report.time),
+            (self.user.pk, "Tennis", "Denton East", "Female", "Confirmed", time(9)),
+        )
+        self.assertEqual(self.rollups(), {"Confirmed": 3})
+
+        # Only the changed booking is read again, and the rollups move with it.
+        cancel_reservation(bookings[1])
+        stats = sync_booking_reports()
+        self.assertEqual((stats["rows"], stats["created"], stats["updated"]), (1, 0, 1))
+        self.assertEqual(self.rollups(), {"Confirmed": 2, "Cancelled": 1})
+        self.assertEqual(sync_booking_reports()["rows"], 0)
+
+    def test_sync_resumes_from_the_watermark(self):
+        for hour in (9, 10, 11):
+            self.book(hour)
+
+        self.assertEqual(sync_booking_reports(batch_size=2, max_batches=1)["rows"], 2)
+        self.assertEqual(BookingReport.objects.count(), 2)
+        self.assertEqual(EtlWatermark.objects.get().rows_applied, 2)
+
+        self.assertEqual(sync_booking_reports(batch_size=2)["rows"], 1)
+        self.assertEqual(BookingReport.objects.count(), 3)
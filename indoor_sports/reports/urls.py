@@ -10,9 +10,12 @@
 #     path("report-dashboard/", views.yearly_report, name="report_dashboard"),
 # ]
 
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 urlpatterns = [
     path('report/<str:period>/', views.report_view, name='report_view'),  # Unified reporting view
+    path('report/charts/status/', views.chart_pool_status, name='report_chart_pool_status'),  # Chart pool counters
+    re_path(r'^report/export/(?P<dataset>\w+)\.(?P<fmt>csv|parquet)$', views.export_data, name='report_export'),  # Streaming data exports
+    re_path(r'^report/chart/(?P<key>[0-9a-f]{64})\.png$', views.chart_image, name='report_chart'),  # Cached chart PNGs by content hash
 ]
@@ -1,115 +1,140 @@
-import matplotlib
-matplotlib.use('Agg')  # For server-side rendering
-import matplotlib.pyplot as plt
-import base64
-from io import BytesIO
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Count
-from bookings.models import BookingReport
+from django.utils.cache import add_never_cache_headers, get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 
-def generate_graphs(data):
+from dashboards.views import is_role_valid
+
+from .charts import bar_chart, cached_chart, chart_path, donut_chart, pool_stats, register_chart, schedule_render
+from .exports import DATASETS, ExportUnavailable, csv_lines, parquet_chunks
+from .models import DailyBookingRollup
+from .rollups import totals_by
+
+
+def generate_graphs(rollups):
+    """
+    Describe the report's graphs from the period's daily rollup rows and return them
+    as a list of (image url, description) tuples. Charts are drawn once per distinct
+    data, in the chart pool; the page does not wait for them.
+    """
+    specs = [
+        # Graph 1: Bookings by Sport
+        (bar_chart(totals_by(rollups, 'sport'), 'Bookings by Sport', 'Sport', ['#2a9d8f', '#e76f51', '#f4a261']),
+         'Number of bookings for each sport.'),
+        # Graph 2: Bookings by Location
+        (bar_chart(totals_by(rollups, 'location'), 'Bookings by Location', 'Location', ['#8ecae6', '#219ebc', '#023047', '#ffb703', '#fb8500']),
+         'Number of bookings for each location.'),
+        # Graph 3: Bookings by Gender
+        (bar_chart(totals_by(rollups, 'gender'), 'Bookings by Gender', 'Gender', ['#457b9d', '#1d3557', '#a8dadc'], rotate=False),
+         'Number of bookings by gender.'),
+        # Graph 4: Booking Status (Donut Chart)
+        (donut_chart(totals_by(rollups, 'status'), 'Booking Status Distribution', ['#2a9d8f', '#e76f51', '#f4a261']),
+         'Distribution of booking status (donut chart).'),
+    ]
+    return [(reverse('report_chart', args=[register_chart(spec)]), description) for spec, description in specs]
+
+
+def chart_image(request, key):
     """
-    Generate graphs and return them as a list of (image, description) tuples.
+    Serves a report chart by content hash. While the pool is still drawing it the
+    response is 202 with Retry-After, and the page's placeholder asks again. Once
+    drawn, the URL never changes content, so it is cacheable for good and
+    revalidates by ETag.
     """
-    graphs = []
-
-    # Graph 1: Bookings by Sport
-    sport_counts = data.values('sport').annotate(total=Count('sport'))
-    plt.figure(figsize=(6, 4))
-    plt.bar([item['sport'] for item in sport_counts], [item['total'] for item in sport_counts], color=['#2a9d8f', '#e76f51', '#f4a261'])
-    plt.title('Bookings by Sport')
-    plt.xlabel('Sport')
-    plt.ylabel('Total Bookings')
-    plt.xticks(rotation=45)
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    graphs.append((base64.b64encode(buffer.getvalue()).decode('utf-8'), 'Number of bookings for each sport.'))
-    buffer.close()
-    plt.close()
-
-    # Graph 2: Bookings by Location
-    location_counts = data.values('location').annotate(total=Count('location'))
-    plt.figure(figsize=(6, 4))
-    plt.bar([item['location'] for item in location_counts], [item['total'] for item in location_counts], color=['#8ecae6', '#219ebc', '#023047', '#ffb703', '#fb8500'])
-    plt.title('Bookings by Location')
-    plt.xlabel('Location')
-    plt.ylabel('Total Bookings')
-    plt.xticks(rotation=45)
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    graphs.append((base64.b64encode(buffer.getvalue()).decode('utf-8'), 'Number of bookings for each location.'))
-    buffer.close()
-    plt.close()
-
-    # Graph 3: Bookings by Gender
-    gender_counts = data.values('gender').annotate(total=Count('gender'))
-    plt.figure(figsize=(6, 4))
-    plt.bar([item['gender'] for item in gender_counts], [item['total'] for item in gender_counts], color=['#457b9d', '#1d3557', '#a8dadc'])
-    plt.title('Bookings by Gender')
-    plt.xlabel('Gender')
-    plt.ylabel('Total Bookings')
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    graphs.append((base64.b64encode(buffer.getvalue()).decode('utf-8'), 'Number of bookings by gender.'))
-    buffer.close()
-    plt.close()
-
-    # Graph 4: Booking Status (Donut Chart)
-    status_counts = data.values('status').annotate(total=Count('status'))
-    labels = [item['status'] for item in status_counts]
-    sizes = [item['total'] for item in status_counts]
-    plt.figure(figsize=(6, 4))
-    plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140, colors=['#2a9d8f', '#e76f51', '#f4a261'], wedgeprops={'width': 0.4})
-    plt.title('Booking Status Distribution')
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    graphs.append((base64.b64encode(buffer.getvalue()).decode('utf-8'), 'Distribution of booking status (donut chart).'))
-    buffer.close()
-    plt.close()
-
-    return graphs
+    png = cached_chart(key)
+    if png is None:
+        if not schedule_render(key):
+            if not chart_path(key, '.json').exists():
+                raise Http404("Unknown chart")
+        response = HttpResponse(status=202)
+        response['Retry-After'] = '1'
+        add_never_cache_headers(response)
+        return response
+
+    response = get_conditional_response(request, etag=quote_etag(key))
+    if response is None:
+        response = FileResponse(open(png, 'rb'), content_type='image/png')
+        response['ETag'] = quote_etag(key)
+    patch_cache_control(response, public=True, max_age=settings.REPORT_CHART_MAX_AGE, immutable=True)
+    return response
+
+
+def chart_pool_status(request):
+    """Returns this process's chart rendering pool counters as JSON."""
+    return JsonResponse(pool_stats())
+
 
 def report_view(request, period):
     """
     Unified view for displaying reports: weekly, monthly, yearly.
+    Reads the daily booking rollups, never the BookingReport fact table.
     """
     now = timezone.now()
     title = "Report"
 
     # Get data based on the requested period
     if period == 'weekly':
-        data = BookingReport.objects.filter(date__week=now.isocalendar()[1])
+        rollups = DailyBookingRollup.objects.filter(date__week=now.isocalendar()[1])
         title = "Weekly Report"
     elif period == 'monthly':
-        data = BookingReport.objects.filter(date__month=now.month)
+        rollups = DailyBookingRollup.objects.filter(date__month=now.month)
         title = "Monthly Report"
     elif period == 'yearly':
-        data = BookingReport.objects.filter(date__year=now.year)
+        rollups = DailyBookingRollup.objects.filter(date__year=now.year)
         title = "Yearly Report"
     elif period == 'all':  # Fix: Explicit condition for all bookings
-        data = BookingReport.objects.all()
+        rollups = DailyBookingRollup.objects.all()
         title = "All Bookings"
     else:
         messages.error(request, "Invalid report period requested.")
         return redirect("home")
 
+    rows = list(rollups.order_by('-date', 'sport', 'location', 'gender', 'status'))
+
     # Generate graphs based on retrieved data
-    graphs = generate_graphs(data)
+    graphs = generate_graphs(rows) if rows else []
 
     context = {
         'title': title,
         'graphs': graphs,
-        'bookings': data,  # Include bookings in context to display in the table
+        'rollups': rows,  # Daily totals per sport, location, gender and status for the table
+        'total_bookings': sum(row.bookings for row in rows),
     }
     return render(request, 'common_report.html', context)
 
+
+def export_data(request, dataset, fmt):
+    """
+    Streams BookingReport, Booking or Payment rows as CSV or Parquet, optionally limited
+    to ?start=YYYY-MM-DD&end=YYYY-MM-DD. Rows are fetched in chunks while the response is
+    sent, so memory use does not grow with the table.
+    """
+    if not is_role_valid(request, "admin"):
+        messages.warning(request, "You do not have permission to access this page.")
+        return redirect("loginpage")
+    if dataset not in DATASETS:
+        raise Http404("Unknown export")
+    start = parse_date(request.GET.get('start', ''))
+    end = parse_date(request.GET.get('end', ''))
+
+    if fmt == 'parquet':
+        try:
+            chunks = parquet_chunks(dataset, start, end)
+        except ExportUnavailable as e:
+            return HttpResponse(str(e), status=501, content_type='text/plain')
+        response = StreamingHttpResponse(chunks, content_type='application/vnd.apache.parquet')
+    else:
+        response = StreamingHttpResponse(csv_lines(dataset, start, end), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+    return response
+
+
 # import matplotlib
 # matplotlib.use('Agg')
 # from django.shortcuts import render, redirect
@@ -58,9 +58,6 @@ class Location(models.Model):
 #                 return self.peak_price if self.peak_price is not None else self.price
 #         return self.price
 
-from datetime import datetime, time
-import pytz
-
 class Sport(models.Model):
     sport_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100)  # Ensure this field name is consistent
@@ -85,19 +82,24 @@ class Sport(models.Model):
         return self.name
 
 
+    def is_peak(self, at_time):
+        """
+        True when at_time (a venue wall-clock time) falls inside the peak window, bounds included.
+        A window whose end is before its start wraps past midnight (e.g. 22:00 to 02:00).
+        """
+        if not (self.peak_hours_start and self.peak_hours_end):
+            return False
+        if self.peak_hours_start <= self.peak_hours_end:
+            return self.peak_hours_start <= at_time <= self.peak_hours_end
+        return at_time >= self.peak_hours_start or at_time <= self.peak_hours_end
+
     def get_current_price(self, current_time):
         """
         Returns peak price if current_time falls within peak hours, else normal price.
-        Assumes peak_hours_start < peak_hours_end (same-day peak window like 19:00 to 23:00)
         """
-    # Set the timezone to US timezone (e.g., New York)
-        timezone = pytz.timezone('America/New_York')  # Adjust this to the specific US timezone you need
-        current_time = datetime.now(timezone).time()  # Get current time in the selected timezone
-    
-        if self.peak_hours_start and self.peak_hours_end:
-            if self.peak_hours_start <= current_time <= self.peak_hours_end:
-                return self.peak_price if self.peak_price is not None else self.price
-            return self.price
+        if self.is_peak(current_time) and self.peak_price is not None:
+            return self.peak_price
+        return self.price
 
 # -------------------------------
 # Event Model